@@ -0,0 +1,123 @@
+"""
+Coalesces concurrent publishes to one platform into a single request.
+
+In batch mode several posts are published at once, and each post's worker calls
+the platform on its own. For platforms whose API can create many posts in one
+request (their module provides publish_batch(posts, config, logger)), a Batcher
+collects the posts that arrive within a short window and sends them together.
+Each post gets a Future for its own result, so the rest of the pipeline
+(deadlines, ledger, logging) is unchanged, and waiting for a batch to fill does
+not hold a worker thread. When given an executor, the Batcher sends its batches
+on it, so batched requests count towards the same concurrency limit as every
+other request.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future
+
+# Seconds the first call waits for others to join its batch.
+DEFAULT_LINGER = 0.2
+# Most posts sent in one request.
+DEFAULT_MAX_BATCH_SIZE = 10
+
+
+class Batcher:
+    """
+    Sends the posts published through it to one platform in batches.
+
+    Args:
+        publish_batch (callable): The platform's publish_batch(posts, config, logger); must
+                                  return one publish() result per post, in order.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance passed to publish_batch.
+        max_size (int): Most posts per batch. A full batch is sent without waiting.
+        linger (float): Seconds the first post of a batch waits for more posts.
+        executor (concurrent.futures.Executor): Executor batches are sent on. By default a
+                                  batch is sent by the call that fills it, or by the linger timer.
+    """
+
+    def __init__(self, publish_batch, config, logger, max_size=DEFAULT_MAX_BATCH_SIZE, linger=DEFAULT_LINGER,
+                 executor=None):
+        self._publish_batch = publish_batch
+        self._config = config
+        self._logger = logger
+        self.max_size = max_size
+        self.linger = linger
+        self.executor = executor
+        self._pending = []
+        self._timer = None
+        self._context = None
+        self._lock = threading.Lock()
+
+    def submit(self, post):
+        """
+        Adds a post to the next batch without waiting for it to be sent.
+
+        The batch is sent in the context of its first post, so context-bound settings
+        such as the platform's rate limit still apply. Cancelling the returned Future
+        before the batch is sent leaves the post out of it.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the post's publish() result.
+        """
+        future = Future()
+        with self._lock:
+            if not self._pending:
+                self._context = contextvars.copy_context()
+            self._pending.append((post, future))
+            if len(self._pending) >= self.max_size:
+                batch, context = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.linger, self._flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._dispatch(batch, context)
+        return future
+
+    def publish(self, post):
+        """
+        Publishes a post as part of the next batch and waits for its result.
+
+        Returns:
+            The post's publish() result: a dict with the remote 'id' and 'url', or False.
+        """
+        return self.submit(post).result()
+
+    def _take(self):
+        """Removes and returns the pending batch and its context. Must be called with the lock held."""
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch, self._context
+
+    def _flush(self):
+        with self._lock:
+            batch, context = self._take()
+        if batch:
+            self._dispatch(batch, context)
+
+    def _dispatch(self, batch, context):
+        if self.executor is not None:
+            self.executor.submit(context.run, self._send, batch)
+        else:
+            context.run(self._send, batch)
+
+    def _send(self, batch):
+        # Posts whose caller gave up on them (e.g. timed out) are not sent.
+        batch = [(post, future) for post, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            results = self._publish_batch([post for post, _ in batch], self._config, self._logger)
+            if len(results) != len(batch):
+                raise ValueError(f"publish_batch returned {len(results)} results for {len(batch)} posts")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,3 @@
+"""
+Benchmarks that run the publishers against a local stub of every platform API.
+"""
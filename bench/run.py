@@ -0,0 +1,173 @@
+"""
+Measures publishing throughput and latency against the local stub server.
+
+Generates synthetic markdown posts, points every platform at a StubServer and
+publishes the posts either one at a time (like a cron run per post) or as a
+batch, then reports posts per second and latency percentiles per post and per
+platform. No real platform is contacted and no real credentials are used.
+
+Usage:
+    python3 -m blog_poster.bench.run --posts 50 --mode batch --latency 0.1 --throttle-rate 0.05
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from blog_poster import main as blog_main
+from blog_poster import metrics
+from blog_poster import rendercache
+from blog_poster import transport
+from blog_poster.bench.stub_server import StubServer
+from blog_poster.ledger import Ledger
+
+# Credentials accepted by the stub; they only need to pass the publishers' checks.
+STUB_CREDENTIALS = {
+    "dev_to": {"api_key": "bench"},
+    "hashnode": {"api_key": "bench", "publication_id": "bench"},
+    "wordpress": {"site_id": "bench", "access_token": "bench"},
+    "write_as": {},
+    # Without refresh credentials Blogger uses the access token as is, so the
+    # benchmark never touches the real token store.
+    "blogger": {"access_token": "bench", "blog_id": "bench"},
+    "telegraph": {"access_token": "bench"},
+    "tumblr": {
+        "client_id": "bench", "client_secret": "bench", "access_token": "bench",
+        "refresh_token": "bench", "blog_hostname": "bench.tumblr.com",
+    },
+}
+PERCENTILES = (0.5, 0.95, 0.99)
+# A one-pixel PNG for posts with images.
+_PIXEL = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082'
+)
+
+
+def write_posts(directory, count, paragraphs=20, with_images=False):
+    """
+    Writes synthetic markdown posts.
+
+    Args:
+        directory (str): Directory to write the posts into.
+        count (int): Number of posts.
+        paragraphs (int): Paragraphs of body text per post.
+        with_images (bool): Give every post a local image, so image uploads are measured too.
+
+    Returns:
+        list: Absolute paths of the posts.
+    """
+    paths = []
+    if with_images:
+        with open(os.path.join(directory, 'pixel.png'), 'wb') as f:
+            f.write(_PIXEL)
+    for index in range(count):
+        body = [f"## Section {section}\n\n" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8
+                for section in range(paragraphs)]
+        if with_images:
+            body.insert(1, "![A pixel](pixel.png)")
+        path = os.path.join(directory, f"post-{index:04d}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(
+                f"---\ntitle: Benchmark post {index}\ntags: bench, python\n"
+                f"description: Synthetic post {index}\n---\n\n" + "\n\n".join(body) + "\n"
+            )
+        paths.append(path)
+    return paths
+
+
+def configure_platforms(server, selected=None):
+    """Points the enabled platforms at the stub server, replacing PLATFORM_CONFIGS in place."""
+    overrides = server.platform_overrides()
+    names = selected or sorted(STUB_CREDENTIALS)
+    blog_main.PLATFORM_CONFIGS.clear()
+    for name in names:
+        blog_main.PLATFORM_CONFIGS[name] = dict(STUB_CREDENTIALS.get(name, {}), **overrides.get(name, {}))
+
+
+def _format_seconds(value):
+    return "-" if value is None else f"{value * 1000:.0f}ms"
+
+
+def report(elapsed, post_count, selected=None):
+    """Returns the benchmark summary as a list of lines."""
+    lines = [f"{post_count} post(s) in {elapsed:.2f}s: {post_count / elapsed:.2f} posts/s"]
+    header = "  " + " ".join(f"p{int(q * 100):<6}" for q in PERCENTILES)
+    lines.append(f"{'stage':<24}{header}")
+    rows = [("post", {"stage": "post"})]
+    rows += [(f"publish:{name}", {"stage": "publish", "platform": name})
+             for name in sorted(selected or STUB_CREDENTIALS)]
+    for label, labels in rows:
+        histogram = metrics.get_histogram(metrics.STAGE_SECONDS, **labels)
+        if histogram is None:
+            continue
+        values = " ".join(f"{_format_seconds(histogram.quantile(q)):<7}" for q in PERCENTILES)
+        lines.append(f"{label:<24}  {values}")
+    retries = sum(entry["value"] for entry in metrics.snapshot()["counters"] if entry["name"] == metrics.HTTP_RETRIES)
+    lines.append(f"HTTP retries: {retries}")
+    return lines
+
+
+def run(args):
+    """Runs one benchmark and returns the summary lines."""
+    workdir = tempfile.mkdtemp(prefix='blog-poster-bench-')
+    logger = logging.getLogger("BlogPoster")
+    logger.setLevel(logging.INFO if args.verbose else logging.WARNING)
+    try:
+        paths = write_posts(workdir, args.posts, args.paragraphs, args.images)
+        with StubServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, retry_after=args.retry_after, seed=args.seed) as server:
+            configure_platforms(server, args.platforms)
+            if "hashnode" in blog_main.PLATFORM_CONFIGS:
+                # Keep resolved stub tags out of the real tag cache.
+                blog_main.PLATFORM_CONFIGS["hashnode"]["tag_cache_path"] = os.path.join(workdir, 'hashnode_tags.json')
+            # Every run starts with an empty render cache, so rendering is measured too.
+            rendercache.configure(os.path.join(workdir, 'render_cache.db'))
+            ledger = Ledger(os.path.join(workdir, 'bench.db'))
+            metrics.reset()
+            start = time.monotonic()
+            if args.mode == 'single':
+                for path in paths:
+                    blog_main.main(path, logger, ledger=ledger, selected=args.platforms)
+            else:
+                transport.configure(pool_maxsize=args.max_workers)
+                blog_main.run_batch(paths, logger, args.max_posts, args.max_workers, ledger=ledger,
+                                    selected=args.platforms)
+            elapsed = time.monotonic() - start
+            ledger.close()
+        return report(elapsed, len(paths), args.platforms)
+    finally:
+        rendercache.configure(None)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m blog_poster.bench.run",
+        description="Benchmark publishing against a local stub of every platform API."
+    )
+    parser.add_argument("--posts", type=int, default=20, help="Number of synthetic posts (default: 20).")
+    parser.add_argument("--paragraphs", type=int, default=20, help="Sections of text per post (default: 20).")
+    parser.add_argument("--images", action="store_true", help="Give every post a local image to upload.")
+    parser.add_argument("--mode", choices=("single", "batch"), default="batch",
+                        help="Publish posts one at a time, or as one batch (default: batch).")
+    parser.add_argument("--max-posts", type=int, default=4, help="Posts processed at once in batch mode (default: 4).")
+    parser.add_argument("--max-workers", type=int, default=8, help="Platform publishes in flight in batch mode (default: 8).")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response delay in seconds (default: 0.05).")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay of up to this many seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=0, help="Retry-After of 429 responses, in seconds.")
+    parser.add_argument("--seed", type=int, help="Random seed for repeatable fault injection.")
+    parser.add_argument("--platforms", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                        help="Comma-separated platforms to benchmark (default: all).")
+    parser.add_argument("--verbose", action="store_true", help="Show the publishers' log output.")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    for line in run(parse_args()):
+        print(line)
@@ -0,0 +1,270 @@
+"""
+A local HTTP server that stands in for the API of every supported platform.
+
+Each platform is served under its own path prefix (e.g. /dev_to/api/articles)
+and answers with the same response shape as the real API, so the publishers can
+run unchanged against it once their "base_url" points here. Latency, server
+errors and 429 throttling can be injected to measure how the orchestrator
+behaves against slow or flaky platforms.
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubServer:
+    """
+    Serves fake platform APIs on a local port.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on; 0 picks a free one.
+        latency (float): Seconds every response is delayed by.
+        jitter (float): Up to this many extra seconds are added to the delay, at random.
+        error_rate (float): Fraction of requests answered with 503.
+        throttle_rate (float): Fraction of requests answered with 429.
+        retry_after (float): Retry-After sent with 429 responses, in seconds.
+        seed (int): Seed for the random choices, for repeatable runs.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, retry_after=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.requests = {}
+        self._random = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Starts serving in a background thread and returns the server."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def platform_overrides(self):
+        """
+        Returns the config keys that point each platform at this server.
+
+        Returns:
+            dict: Platform name -> dict of config keys to merge into its PLATFORM_CONFIGS entry.
+        """
+        return {
+            "dev_to": {"base_url": f"{self.url}/dev_to/api"},
+            "hashnode": {"base_url": f"{self.url}/hashnode/"},
+            "wordpress": {"base_url": f"{self.url}/wordpress", "v2_base_url": f"{self.url}/wordpress/wp/v2"},
+            "write_as": {"base_url": f"{self.url}/write_as/api"},
+            "blogger": {"base_url": f"{self.url}/blogger", "token_url": f"{self.url}/blogger/token",
+                        "batch_url": f"{self.url}/blogger/batch"},
+            "telegraph": {"base_url": f"{self.url}/telegraph", "upload_base_url": f"{self.url}/telegraph_files"},
+            "tumblr": {"base_url": f"{self.url}/tumblr"},
+        }
+
+    def _next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def _count(self, platform):
+        with self._lock:
+            self.requests[platform] = self.requests.get(platform, 0) + 1
+
+    def _fault(self):
+        """Returns 429, 503 or None, according to the configured rates."""
+        with self._lock:
+            roll = self._random.random()
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 503
+        return None
+
+    def _batch_item(self, item, platform):
+        """Answers one sub-request of a WP REST API batch, failing it at the configured throttle and error rates."""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.throttle_rate:
+            return {"status": 429, "body": {"code": "rest_too_many_requests", "message": "throttled"},
+                    "headers": {"Retry-After": str(self.retry_after)}}
+        if roll < self.throttle_rate + self.error_rate:
+            return {"status": 503, "body": {"code": "unavailable", "message": "unavailable"}, "headers": {}}
+        item_id = self._next_id()
+        if item["path"].endswith("/posts"):
+            body = {"id": item_id, "link": f"{self.url}/{platform}/posts/{item_id}"}
+        else:
+            body = {"id": item_id, "name": item["body"].get("name")}
+        return {"status": 201, "body": body, "headers": {}}
+
+    def _blogger_batch(self, body):
+        """Answers a Google multipart/mixed batch of posts.insert calls, failing parts at the configured rates."""
+        boundary = body.split(b"\r\n", 1)[0][2:].decode('ascii')
+        parts = []
+        for part in body.split(f"--{boundary}".encode('ascii'))[1:-1]:
+            content_id = re.search(rb"Content-ID: <([^>]+)>", part).group(1).decode('ascii')
+            with self._lock:
+                roll = self._random.random()
+            headers = ""
+            if roll < self.throttle_rate:
+                status, payload = "429 Too Many Requests", {"error": {"code": 429, "message": "rateLimitExceeded"}}
+                headers = f"Retry-After: {self.retry_after}\r\n"
+            elif roll < self.throttle_rate + self.error_rate:
+                status, payload = "503 Service Unavailable", {"error": {"code": 503, "message": "unavailable"}}
+            else:
+                post_id = self._next_id()
+                status = "200 OK"
+                payload = {"kind": "blogger#post", "id": str(post_id), "url": f"{self.url}/blogger/posts/{post_id}"}
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=UTF-8\r\n{headers}\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        data = ("".join(parts) + f"--{boundary}--\r\n").encode('utf-8')
+        return 200, data, f"multipart/mixed; boundary={boundary}"
+
+    def respond(self, method, path, body):
+        """
+        Answers one request like the real platform would.
+
+        Returns:
+            tuple: (status code, JSON-serializable body), or (status code, raw bytes, content type).
+        """
+        platform, _, rest = path.lstrip('/').partition('/')
+        rest = '/' + rest.split('?')[0]
+        self._count(platform)
+        fault = self._fault()
+        if fault:
+            return fault, _error_body(platform, rest, fault)
+
+        post_id = self._next_id()
+        url = f"{self.url}/{platform}/posts/{post_id}"
+        if platform == "dev_to":
+            match = re.fullmatch(r'/api/articles(?:/(\d+))?', rest)
+            if match:
+                return (200 if match.group(1) else 201), {"id": int(match.group(1) or post_id), "url": url}
+        elif platform == "hashnode" and method == "POST":
+            request = json.loads(body or b'{}')
+            query, variables = request.get("query", ""), request.get("variables") or {}
+            if "resolveTags" in query:
+                return 200, {"data": {name: {"id": f"tag-{slug}", "name": slug, "slug": slug}
+                                      for name, slug in variables.items()}}
+            if "publishPosts" in query:
+                return 200, {"data": {name: {"post": {"id": f"h{post_id}-{name}", "slug": f"post-{post_id}-{name}",
+                                                      "url": f"{url}-{name}"}} for name in variables}}
+            field = "updatePost" if "updatePost" in query else "publishPost"
+            return 200, {"data": {field: {"post": {"id": f"h{post_id}", "slug": f"post-{post_id}", "url": url}}}}
+        elif platform == "wordpress":
+            if re.fullmatch(r'/wp/v2/sites/[^/]+/batch/v1', rest):
+                return 207, {"responses": [self._batch_item(item, platform) for item in json.loads(body)["requests"]]}
+            if re.fullmatch(r'/wp/v2/sites/[^/]+/(tags|categories)', rest):
+                return 200, []
+            if rest.endswith('/media/new'):
+                return 200, {"media": [{"ID": post_id, "URL": f"{self.url}/wordpress/media/{post_id}.png"}]}
+            match = re.fullmatch(r'/sites/[^/]+/posts/(new|\d+)', rest)
+            if match:
+                return 200, {"ID": post_id if match.group(1) == 'new' else int(match.group(1)), "URL": url}
+        elif platform == "write_as":
+            if rest == '/api/posts':
+                return 201, {"code": 201, "data": {"id": f"w{post_id}", "token": f"t{post_id}", "url": f"{url}.md"}}
+            match = re.fullmatch(r'/api/posts/(\w+)', rest)
+            if match:
+                return 200, {"code": 200, "data": {"id": match.group(1),
+                                                   "url": f"{self.url}/{platform}/posts/{match.group(1)}.md"}}
+        elif platform == "blogger":
+            if rest == '/batch' and method == "POST":
+                return self._blogger_batch(body)
+            if rest == '/token':
+                return 200, {"access_token": f"stub-token-{post_id}", "expires_in": 3600, "token_type": "Bearer"}
+            match = re.fullmatch(r'/blogs/[^/]+/posts/(\d*)', rest)
+            if match:
+                return 200, {"kind": "blogger#post", "id": match.group(1) or str(post_id), "url": url}
+        elif platform == "telegraph" and rest == '/createPage':
+            return 200, {"ok": True, "result": {"path": f"page-{post_id}", "url": url}}
+        elif platform == "telegraph" and rest.startswith('/editPage/'):
+            path = rest[len('/editPage/'):]
+            return 200, {"ok": True, "result": {"path": path, "url": f"{self.url}/{platform}/{path}"}}
+        elif platform == "telegraph_files" and rest == '/upload':
+            return 200, [{"src": f"/file/{post_id}.png"}]
+        elif platform == "tumblr" and re.fullmatch(r'/v2/blog/[^/]+/posts?', rest):
+            return 201, {"meta": {"status": 201, "msg": "Created"}, "response": {"id": post_id, "id_string": str(post_id)}}
+        elif platform == "tumblr":
+            match = re.fullmatch(r'/v2/blog/[^/]+/(?:posts/(\d+)|post/edit)', rest)
+            if match:
+                edited = match.group(1) or parse_qs(body.decode('utf-8')).get('id', [str(post_id)])[0]
+                return 200, {"meta": {"status": 200, "msg": "OK"}, "response": {"id": int(edited), "id_string": edited}}
+        return 404, {"error": f"no stub for {method} {path}"}
+
+
+def _error_body(platform, rest, status):
+    """Returns an error body shaped like the platform's own, so clients parse it as they would in production."""
+    message = "Too Many Requests" if status == 429 else "Service Unavailable"
+    code = "rate_limited" if status == 429 else "unavailable"
+    if platform == "dev_to":
+        return {"error": message, "status": status}
+    if platform == "hashnode":
+        return {"errors": [{"message": message, "extensions": {"code": code.upper()}}]}
+    if platform == "wordpress":
+        if rest.startswith('/wp/v2/'):
+            return {"code": code, "message": message, "data": {"status": status}}
+        return {"error": code, "message": message}
+    if platform == "write_as":
+        return {"code": status, "error_msg": message}
+    if platform == "blogger":
+        return {"error": {"code": status, "message": message, "errors": [{"reason": code, "message": message}]}}
+    if platform == "telegraph":
+        return {"ok": False, "error": "FLOOD_WAIT_1" if status == 429 else message.upper().replace(' ', '_')}
+    if platform == "tumblr":
+        return {"meta": {"status": status, "msg": message}, "response": [],
+                "errors": [{"title": message, "code": 0, "detail": message}]}
+    return {"error": message}
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _handle(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+            status, payload, *content_type = server.respond(self.command, self.path, body)
+            data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type[0] if content_type else 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            if status == 429:
+                self.send_header('Retry-After', str(server.retry_after))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PUT = do_PATCH = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
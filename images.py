@@ -0,0 +1,138 @@
+"""
+Uploads the local images of a post to the platforms that host media.
+
+Each image is identified by the SHA-256 hash of its contents. Uploads run in
+parallel, and the ledger remembers hash -> remote URL per platform, so an image
+is never uploaded to the same platform twice, even across runs and posts.
+Platforms without a media API reuse an image hosted on another platform.
+"""
+import hashlib
+import mimetypes
+import os
+
+from blog_poster import ratelimit
+
+# Leading bytes of common image formats, for files whose extension is missing or wrong.
+_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+)
+_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def detect_mime_type(path):
+    """
+    Detects an image's MIME type from its leading bytes, falling back to its extension.
+
+    Args:
+        path (str): Path of the image.
+
+    Returns:
+        str: The MIME type, or 'application/octet-stream' if it cannot be determined.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(512)
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if b'<svg' in head.lower():
+        return 'image/svg+xml'
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def _upload(platform_name, module, config, path, content_hash, mime_type, ledger, logger):
+    """Uploads one image to one platform and records its URL. Returns the URL or None."""
+    with ratelimit.limit(platform_name, config):
+        url = module.upload_image(path, mime_type, config, logger)
+    if url and ledger is not None:
+        ledger.record_media(content_hash, platform_name, url)
+    return url
+
+
+def prepare_images(post, platforms, ledger, logger, executor):
+    """
+    Uploads a post's local images and returns a copy of the post for each platform.
+
+    Platforms whose module has an upload_image(path, mime_type, config, logger)
+    function (and whose config does not set "upload_images": False) get their own
+    copy of every image. Other platforms use the URL of a copy hosted elsewhere.
+
+    Args:
+        post (PreparedPost): The post whose local images should be uploaded.
+        platforms (list): (platform name, module, config) tuples that will receive the post.
+        ledger (Ledger): Cache of earlier uploads; may be None to upload every time.
+        logger (logging.Logger): The logger instance.
+        executor (concurrent.futures.Executor): Executor the uploads run on in parallel.
+
+    Returns:
+        dict: Platform name -> PreparedPost with image links rewritten for that platform.
+    """
+    if not post.local_image_paths:
+        return {platform_name: post for platform_name, _, _ in platforms}
+
+    images = {}
+    for path in dict.fromkeys(post.local_image_paths):
+        try:
+            images[path] = (hash_file(path), detect_mime_type(path))
+        except OSError as e:
+            logger.warning(f"Could not read image {path}: {e}. It will be skipped.")
+
+    uploaders = [
+        (platform_name, module, config) for platform_name, module, config in platforms
+        if hasattr(module, 'upload_image') and config.get("upload_images", True)
+    ]
+
+    hosted = {platform_name: {} for platform_name, _, _ in uploaders}
+    futures = {}
+    for platform_name, module, config in uploaders:
+        for path, (content_hash, mime_type) in images.items():
+            cached_url = ledger.get_media(content_hash, platform_name) if ledger is not None else None
+            if cached_url:
+                hosted[platform_name][path] = cached_url
+                continue
+            future = executor.submit(
+                _upload, platform_name, module, config, path, content_hash, mime_type, ledger, logger
+            )
+            futures[future] = (platform_name, path)
+
+    for future, (platform_name, path) in futures.items():
+        try:
+            url = future.result()
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while uploading {path} to {platform_name}: {e}", exc_info=True)
+            url = None
+        if url:
+            hosted[platform_name][path] = url
+
+    # Any hosted copy will do for platforms that cannot upload their own.
+    shared = {}
+    for path, (content_hash, _) in images.items():
+        shared[path] = next((urls[path] for urls in hosted.values() if path in urls), None)
+        if not shared[path] and ledger is not None:
+            shared[path] = ledger.get_media(content_hash, None)
+
+    variants = {}
+    for platform_name, _, _ in platforms:
+        url_map = dict(shared)
+        url_map.update(hosted.get(platform_name, {}))
+        variants[platform_name] = post.with_image_urls(url_map)
+    missing = [path for path in images if not shared[path]]
+    if missing:
+        logger.warning(f"No hosted copy of {len(missing)} image(s); platforms that cannot send them with the post will skip them: {', '.join(os.path.basename(p) for p in missing)}")
+    return variants
@@ -0,0 +1,160 @@
+"""
+Persistent record of which post versions have been published to which platforms.
+
+The ledger is a local SQLite database keyed by (content hash, platform). It is
+consulted before any network work so that reruns skip posts that are already
+published instead of creating duplicates, and so that edited posts can be
+updated in place using the remote ID recorded for their source file. It also
+remembers where each image (by content hash) has been uploaded.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# Default location of the ledger, next to publishing.jsonl.
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), 'publishing.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    content_hash TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    source TEXT,
+    remote_id TEXT,
+    url TEXT,
+    published_at TEXT NOT NULL,
+    PRIMARY KEY (content_hash, platform)
+);
+CREATE INDEX IF NOT EXISTS publications_by_source ON publications (source, platform);
+CREATE TABLE IF NOT EXISTS media (
+    content_hash TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    url TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    PRIMARY KEY (content_hash, platform)
+);
+"""
+
+
+class Ledger:
+    """
+    A thread-safe handle on the publishing ledger.
+
+    Args:
+        path (str): Path to the SQLite database file. Created if it does not exist.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        # One connection shared by all publisher threads, serialized by the lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        # WAL lets several batch processes read while one writes.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, content_hash, platform):
+        """
+        Looks up a publication.
+
+        Args:
+            content_hash (str): The PreparedPost.content_hash of the post.
+            platform (str): The platform name, e.g. 'dev_to'.
+
+        Returns:
+            dict: The recorded 'remote_id', 'url', 'source' and 'published_at', or None if not published.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT remote_id, url, source, published_at FROM publications"
+                " WHERE content_hash = ? AND platform = ?",
+                (content_hash, platform)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_by_source(self, source, platform):
+        """
+        Looks up the most recent publication of any version of a markdown file.
+
+        Args:
+            source (str): The markdown file the post came from.
+            platform (str): The platform name.
+
+        Returns:
+            dict: The recorded 'content_hash', 'remote_id', 'url' and 'published_at', or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, remote_id, url, published_at FROM publications"
+                " WHERE source = ? AND platform = ? ORDER BY published_at DESC, rowid DESC LIMIT 1",
+                (source, platform)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, content_hash, platform, remote_id=None, url=None, source=None):
+        """
+        Records a successful publication, replacing any earlier record for the same key.
+
+        Args:
+            content_hash (str): The PreparedPost.content_hash of the post.
+            platform (str): The platform name.
+            remote_id (str): The post's ID on the platform, if known.
+            url (str): The post's public URL, if known.
+            source (str): The markdown file the post came from.
+        """
+        published_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO publications"
+                " (content_hash, platform, source, remote_id, url, published_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (content_hash, platform, source,
+                 None if remote_id is None else str(remote_id), url, published_at)
+            )
+
+    def remove(self, content_hash, platform):
+        """Forgets a publication, e.g. a post version that has since been updated in place."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM publications WHERE content_hash = ? AND platform = ?",
+                (content_hash, platform)
+            )
+
+    def get_media(self, content_hash, platform):
+        """
+        Looks up where an image has been uploaded.
+
+        Args:
+            content_hash (str): SHA-256 hex digest of the image file.
+            platform (str): The platform name, or None for an upload on any platform.
+
+        Returns:
+            str: The remote URL of the image, or None if it has not been uploaded.
+        """
+        with self._lock:
+            if platform is None:
+                row = self._conn.execute(
+                    "SELECT url FROM media WHERE content_hash = ? ORDER BY uploaded_at LIMIT 1",
+                    (content_hash,)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT url FROM media WHERE content_hash = ? AND platform = ?",
+                    (content_hash, platform)
+                ).fetchone()
+        return row["url"] if row else None
+
+    def record_media(self, content_hash, platform, url):
+        """Records that an image with the given hash is hosted at url on a platform."""
+        uploaded_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO media (content_hash, platform, url, uploaded_at) VALUES (?, ?, ?, ?)",
+                (content_hash, platform, url, uploaded_at)
+            )
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
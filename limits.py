@@ -0,0 +1,131 @@
+"""
+Checks posts against each platform's content size limit before anything is sent.
+
+A platform module declares which form of the post it sends (CONTENT_FORMAT,
+'markdown' or 'html') and its limit in bytes (MAX_CONTENT_BYTES, None if the
+platform documents none). A "max_content_bytes" key in the platform config
+overrides the limit. A post that does not fit is cut at a block boundary and
+ends with a "continue reading" link to its canonical URL, or, with
+"oversize": "reject" in the config, is not sent at all. Telegra.ph splits
+long posts into linked pages itself and declares no CONTENT_FORMAT.
+"""
+import os
+import re
+
+from blog_poster import metrics
+from blog_poster import rendercache
+from blog_poster.parser import extract_assets
+from blog_poster.post import PreparedPost
+
+# Fenced code blocks must not be cut in half.
+_FENCE = re.compile(r'^(```|~~~)')
+# Bytes kept free for the continue-reading notice.
+_NOTICE_RESERVE = 512
+
+
+def content_size(post, content_format):
+    """Returns the size in bytes of the form of the post a platform sends."""
+    text = post.html if content_format == 'html' else post.content
+    return len(text.encode('utf-8'))
+
+
+def _candidate_size(variant, content_format):
+    """Like content_size, but renders a truncation candidate without storing it in the render cache."""
+    if content_format != 'html':
+        return content_size(variant, content_format)
+    variant._computed['html'] = rendercache.render(variant.content, cached=False)
+    return len(variant.html.encode('utf-8'))
+
+
+def _blocks(content):
+    """Splits a markdown body into blocks at blank lines outside fenced code."""
+    blocks = []
+    current = []
+    in_fence = False
+    for line in content.split('\n'):
+        if _FENCE.match(line.lstrip()):
+            in_fence = not in_fence
+        if not line.strip() and not in_fence and current:
+            blocks.append('\n'.join(current))
+            current = []
+        elif line.strip() or current:
+            current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def _notice(post, config, platform_label):
+    """Returns the markdown appended to a truncated post."""
+    url = post.metadata.get("canonical_url") or config.get("continue_reading_url")
+    if url and post.source_path:
+        url = url.replace("{slug}", os.path.splitext(os.path.basename(post.source_path))[0])
+    if url:
+        return f"*This post is too long for {platform_label}.* [Continue reading]({url})"
+    return f"*This post was shortened to fit {platform_label}'s size limit.*"
+
+
+def _truncated(post, blocks, count, notice):
+    content = '\n\n'.join(blocks[:count] + [notice])
+    # Keep the local images that the remaining blocks still show.
+    base_dir = os.path.dirname(post.source_path) if post.source_path else os.getcwd()
+    kept = set(extract_assets(content, base_dir)[3])
+    variant = PreparedPost(
+        post.metadata, content,
+        [path for path in post.local_image_paths if path in kept],
+        post.source_path
+    )
+    # Still the same post as far as the ledger is concerned.
+    variant._computed['content_hash'] = post.content_hash
+    return variant
+
+
+def fit(post, platform_name, module, config, logger):
+    """
+    Returns the post, or a truncated copy that fits the platform's size limit.
+
+    Args:
+        post (PreparedPost): The post about to be sent.
+        platform_name (str): The platform name, for messages and metrics.
+        module (module): The platform module.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        PreparedPost: The post to send, or None if it is too large and may not be truncated.
+    """
+    content_format = getattr(module, 'CONTENT_FORMAT', None)
+    max_bytes = config.get("max_content_bytes", getattr(module, 'MAX_CONTENT_BYTES', None))
+    if content_format is None or not max_bytes:
+        return post
+    size = content_size(post, content_format)
+    if size <= max_bytes:
+        return post
+
+    if config.get("oversize", "truncate") == "reject":
+        metrics.increment(metrics.OVERSIZE_POSTS, platform=platform_name, action="rejected")
+        logger.error(f"Post is {size} bytes, over {platform_name}'s limit of {max_bytes}; not sending it.")
+        return None
+
+    notice = _notice(post, config, platform_name)
+    blocks = _blocks(post.content)
+    # Guess how many blocks fit from the markdown size, then shrink until the real size fits.
+    ratio = size / max(1, len(post.content.encode('utf-8')))
+    budget = (max_bytes - _NOTICE_RESERVE) / ratio
+    count, used = 0, 0
+    for block in blocks:
+        used += len(block.encode('utf-8')) + 2
+        if used > budget:
+            break
+        count += 1
+    while count > 0:
+        variant = _truncated(post, blocks, count, notice)
+        if _candidate_size(variant, content_format) <= max_bytes:
+            metrics.increment(metrics.OVERSIZE_POSTS, platform=platform_name, action="truncated")
+            logger.warning(f"Post is {size} bytes, over {platform_name}'s limit of {max_bytes}; "
+                           f"sending the first {count} of {len(blocks)} blocks.")
+            return variant
+        count = min(count - 1, int(count * 0.9))
+    metrics.increment(metrics.OVERSIZE_POSTS, platform=platform_name, action="rejected")
+    logger.error(f"Post is {size} bytes, over {platform_name}'s limit of {max_bytes}, and cannot be shortened to fit.")
+    return None
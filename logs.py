@@ -0,0 +1,192 @@
+"""
+Non-blocking, structured logging for publishing runs.
+
+Publishers log through a QueueHandler, so a log call only puts the record on a
+queue; a single listener thread formats it and writes it to the console and to
+publishing.jsonl. The log file holds one JSON object per line, tagged with the ID
+of the run and, for messages about a post, the ID of that post, and it is rotated
+by size. Identical tracebacks repeated within a short window are logged once;
+later occurrences keep their message but drop the traceback.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+LOGGER_NAME = "BlogPoster"
+DEFAULT_LOG_PATH = os.path.join(os.path.dirname(__file__), 'publishing.jsonl')
+# Rotate publishing.jsonl at this size, keeping this many old files.
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# Seconds during which a repeated traceback is logged without its stack.
+TRACEBACK_WINDOW = 300
+
+# Identifies every record logged by this process.
+RUN_ID = uuid.uuid4().hex[:12]
+
+_listener = None
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps records with the run ID, and with empty post fields when logged outside a post."""
+
+    def filter(self, record):
+        record.run_id = RUN_ID
+        if not hasattr(record, 'post_id'):
+            record.post_id = None
+            record.source = None
+        return True
+
+
+class TracebackRateLimiter(logging.Filter):
+    """
+    Drops the traceback of records whose exception was already logged recently.
+
+    Exceptions are considered the same when they have the same type and were raised
+    at the same line. The record itself is kept, with a 'suppressed_tracebacks' count.
+
+    Args:
+        window (float): Seconds after logging a traceback during which repeats are suppressed.
+    """
+
+    def __init__(self, window=TRACEBACK_WINDOW):
+        super().__init__()
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not record.exc_info or not record.exc_info[1]:
+            return True
+        exc = record.exc_info[1]
+        frames = traceback.extract_tb(exc.__traceback__)
+        origin = (frames[-1].filename, frames[-1].lineno) if frames else None
+        key = (type(exc).__qualname__, origin)
+        now = time.monotonic()
+        with self._lock:
+            logged_at, suppressed = self._seen.get(key, (None, 0))
+            if logged_at is not None and now - logged_at < self.window:
+                self._seen[key] = (logged_at, suppressed + 1)
+                record.exc_info = None
+                record.exc_text = None
+                record.suppressed_tracebacks = suppressed + 1
+            else:
+                self._seen[key] = (now, 0)
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that keeps the traceback separate from the message, for JSON output."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single JSON line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "run_id": getattr(record, 'run_id', None),
+            "post_id": getattr(record, 'post_id', None),
+            "source": getattr(record, 'source', None),
+            "thread": record.threadName,
+            "message": record.getMessage().strip(),
+        }
+        if record.exc_text:
+            entry["traceback"] = record.exc_text
+        if getattr(record, 'suppressed_tracebacks', None):
+            entry["suppressed_tracebacks"] = record.suppressed_tracebacks
+        return json.dumps(entry, default=str)
+
+
+class _ConsoleFormatter(logging.Formatter):
+    """Prints just the message, followed by the traceback if there is one."""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        return message
+
+
+def setup_logging(log_path=DEFAULT_LOG_PATH, max_bytes=MAX_LOG_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    Sets up the BlogPoster logger to log to the console and to a rotating JSON-lines file.
+
+    Records are handed to a background listener thread, which is stopped (and the
+    queue flushed) when the interpreter exits or stop_logging() is called.
+
+    Args:
+        log_path (str): Path of the log file.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Number of rotated files to keep.
+
+    Returns:
+        logging.Logger: The configured logger.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(logging.DEBUG)
+
+    # Prevent adding duplicate handlers if this function is called again
+    if logger.hasHandlers():
+        return logger
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(_ConsoleFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_ContextFilter())
+    queue_handler.addFilter(TracebackRateLimiter())
+    logger.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """Writes out every queued record and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def for_post(logger, source_path):
+    """
+    Returns a logger that tags every record with a new post ID and the post's source file.
+
+    Args:
+        logger (logging.Logger): The run's logger.
+        source_path (str): The markdown file being published.
+
+    Returns:
+        logging.LoggerAdapter: The per-post logger, usable wherever a logger is expected.
+    """
+    return logging.LoggerAdapter(logger, {"post_id": uuid.uuid4().hex[:12], "source": source_path})
@@ -3,50 +3,70 @@ Main script to orchestrate the blog posting process.
 """
 import os
 import sys
-import logging
-import importlib
+import glob
+import json
+import time
+import signal
+import argparse
+import threading
+import functools
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from blog_poster.parser import parse_markdown
+from blog_poster.post import PreparedPost
+from blog_poster.ledger import Ledger, DEFAULT_LEDGER_PATH
+from blog_poster.images import prepare_images
+from blog_poster.logs import setup_logging, for_post
+from blog_poster import metrics
 from blog_poster.config import PLATFORM_CONFIGS
+from blog_poster import platforms
+from blog_poster import transport
+from blog_poster import ratelimit
+from blog_poster import limits
+from blog_poster import rendercache
+from blog_poster import watch
+from blog_poster.batching import Batcher, DEFAULT_LINGER, DEFAULT_MAX_BATCH_SIZE
+from blog_poster.schedule import Schedule, format_time, run_worker
 
 def setup_logger():
-    """Sets up a logger to output to both console and a file."""
-    logger = logging.getLogger("BlogPoster")
-    logger.setLevel(logging.DEBUG)
-
-    # Prevent adding duplicate handlers if this function is called again
-    if logger.hasHandlers():
-        return logger
-
-    # File handler
-    log_path = os.path.join(os.path.dirname(__file__), 'publishing.log')
-    file_handler = logging.FileHandler(log_path)
-    file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
-
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_formatter = logging.Formatter('%(message)s')
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-
-    return logger
-
-# Dynamically import all publisher modules from the 'platforms' directory
-PLATFORM_MODULES = {}
-platforms_dir = os.path.join(os.path.dirname(__file__), 'platforms')
-for filename in os.listdir(platforms_dir):
-    if filename.endswith('.py') and not filename.startswith('__'):
-        module_name = filename[:-3]
+    """Sets up a logger that outputs to the console and to publishing.jsonl without blocking publishers."""
+    return setup_logging()
+
+def enabled_platforms(selected=None):
+    """
+    Returns the names of the platforms to publish to.
+
+    Args:
+        selected (list): Platform names chosen on the command line. Defaults to every
+                         platform in PLATFORM_CONFIGS whose entry does not set "enabled": False.
+
+    Returns:
+        list: The sorted platform names.
+    """
+    if selected:
+        return sorted(set(selected))
+    return sorted(name for name, config in PLATFORM_CONFIGS.items() if config.get("enabled", True))
+
+def load_platforms(logger, selected=None):
+    """
+    Imports the modules of the enabled platforms, and only those.
+
+    Args:
+        logger (logging.Logger): The logger instance.
+        selected (list): Platform names chosen on the command line, see enabled_platforms.
+
+    Returns:
+        list: (platform name, module) tuples for the platforms that could be loaded.
+    """
+    loaded = []
+    for platform_name in enabled_platforms(selected):
         try:
-            module = importlib.import_module(f"blog_poster.platforms.{module_name}")
-            if module_name in sys.modules:
-                module = importlib.reload(module)
-            PLATFORM_MODULES[module_name] = module
+            loaded.append((platform_name, platforms.get_platform(platform_name)))
+        except KeyError:
+            logger.warning(f"Unknown platform {platform_name}. Available platforms: {', '.join(platforms.available_platforms())}.")
         except ImportError as e:
-            # We need a logger here, but setup_logger hasn't been called yet.
-            # A simple print is acceptable for this initial setup error.
-            print(f"Could not import platform {module_name}: {e}")
+            logger.error(f"Could not import platform {platform_name}: {e}")
+    return loaded
 
 def log_metadata(logger, metadata):
     """Logs the metadata of the parsed markdown file."""
@@ -61,66 +81,654 @@ def log_metadata(logger, metadata):
         logger.info(f"Description: {metadata.get('description')}")
 
 
-def publish_to_platforms(logger, metadata, content, local_image_paths):
-    """Iterates through configured platforms and publishes the content."""
-    for platform_name, module in sorted(PLATFORM_MODULES.items()):
-        logger.info(f"\n--- Publishing to {platform_name.replace('_', '.').capitalize()} ---")
-        if platform_name in PLATFORM_CONFIGS:
-            config = PLATFORM_CONFIGS[platform_name]
-            if hasattr(module, 'publish'):
-                try:
-                    success = module.publish(
-                        metadata,
-                        content,
-                        config,
-                        logger,
-                        local_image_paths,
-                        metadata.get('author'),
-                        metadata.get('date'),
-                        metadata.get('description')
-                    )
-                    if success:
-                        logger.info(f"Successfully published to {platform_name}")
-                    else:
-                        logger.warning(f"Failed to publish to {platform_name}")
-                except Exception as e:
-                    logger.error(f"An unexpected error occurred while publishing to {platform_name}: {e}", exc_info=True)
-            else:
-                logger.warning(f"Platform module {platform_name} does not have a 'publish' function.")
-        else:
+# Seconds a single platform may take before its result is abandoned.
+# Override per platform with a "timeout" key in its PLATFORM_CONFIGS entry.
+DEFAULT_PLATFORM_TIMEOUT = 120
+
+# How often the dispatcher wakes up to check deadlines of platforms that
+# are still queued behind others.
+_DEADLINE_POLL_INTERVAL = 1.0
+
+def _platform_label(platform_name):
+    """Returns the display name of a platform, e.g. 'Dev.to' for 'dev_to'."""
+    return platform_name.replace('_', '.').capitalize()
+
+def _run_publish(platform_name, module, config, logger, post, started, previous=None):
+    """Worker body: records the start time and calls the platform's publish() or update()."""
+    started[platform_name] = time.monotonic()
+    with metrics.timed("publish", platform=platform_name), ratelimit.limit(platform_name, config):
+        if previous:
+            logger.info(f"\n--- Updating {_platform_label(platform_name)} ---")
+            return module.update(post, previous['remote_id'], config, logger)
+        logger.info(f"\n--- Publishing to {_platform_label(platform_name)} ---")
+        return module.publish(post, config, logger)
+
+def _submit_batched(platform_name, config, logger, post, started, batcher):
+    """Adds a new post to the platform's next batch; returns the Future of its publish() result."""
+    started[platform_name] = time.monotonic()
+    logger.info(f"\n--- Publishing to {_platform_label(platform_name)} (batched) ---")
+    with ratelimit.limit(platform_name, config):
+        future = batcher.submit(post)
+    start = started[platform_name]
+    future.add_done_callback(lambda _: metrics.observe(
+        metrics.STAGE_SECONDS, time.monotonic() - start, stage="publish", platform=platform_name
+    ))
+    return future
+
+def _report_result(logger, platform_name, future):
+    """Logs the outcome of a finished publish future and returns the publish() result."""
+    try:
+        result = future.result()
+    except Exception as e:
+        logger.error(f"An unexpected error occurred while publishing to {platform_name}: {e}", exc_info=True)
+        metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="error")
+        return False
+    if result:
+        logger.info(f"Successfully published to {platform_name}")
+        metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="success")
+        return result
+    logger.warning(f"Failed to publish to {platform_name}")
+    metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="failure")
+    return False
+
+def _record_publication(ledger, post, platform_name, result, previous=None):
+    """Stores a successful publish() or update() result in the ledger."""
+    if ledger is None or not result:
+        return
+    remote = result if isinstance(result, dict) else {}
+    if previous:
+        # The remote post now holds the new version; forget the old one.
+        ledger.remove(previous['content_hash'], platform_name)
+    remote_id = remote.get("id") or (previous or {}).get("remote_id")
+    ledger.record(post.content_hash, platform_name, remote_id, remote.get("url"), post.source_path)
+
+def _record_late_result(logger, ledger, post, platform_name, previous, future):
+    """Done-callback for timed-out platforms: records them if they eventually succeed."""
+    if future.cancelled() or future.exception() is not None or not future.result():
+        return
+    logger.warning(f"{platform_name} finished after its deadline; recording it in the ledger.")
+    _record_publication(ledger, post, platform_name, future.result(), previous)
+
+def _is_future(rfc3339_date):
+    """Returns True if an RFC 3339 UTC timestamp lies in the future."""
+    return bool(rfc3339_date) and rfc3339_date > format_time(datetime.now(timezone.utc))
+
+def publish_to_platforms(logger, post, max_workers=None, executor=None, ledger=None, force=False, selected=None,
+                         schedule=None, batchers=None):
+    """
+    Publishes the content to every configured platform concurrently.
+
+    Each platform runs in its own worker thread and gets its own deadline, measured
+    from the moment its worker starts. Results are logged as soon as each platform
+    finishes, so a run costs roughly as long as the slowest platform.
+
+    Args:
+        logger (logging.Logger): The logger instance.
+        post (PreparedPost): The parsed post, shared by all platforms so it is rendered only once.
+        max_workers (int): Maximum number of platforms to publish to at once.
+                           Defaults to one worker per platform.
+        executor (concurrent.futures.Executor): A shared executor to run the platform
+                           workers on, e.g. one pool for a whole batch. When given,
+                           max_workers is ignored and the executor is left running.
+        ledger (Ledger): If given, platforms that already have this exact post are skipped
+                           without any network work, platforms that have an earlier version
+                           of the same file are updated in place, and results are recorded.
+        force (bool): Ignore the ledger and always create new posts.
+        selected (list): Platform names to publish to instead of every enabled platform.
+        schedule (Schedule): If given, a post whose date lies in the future is queued for
+                           each platform instead of published, and counts as a success,
+                           even with force.
+        batchers (dict): Platform name -> Batcher that new posts for that platform are
+                           published through, together with other posts of the batch.
+
+    Returns:
+        dict: A mapping of platform name to True if it published successfully, False otherwise.
+    """
+    results = {}
+    jobs = []
+    scheduled = schedule is not None and post.source_path and _is_future(post.rfc3339_date)
+    for platform_name, module in load_platforms(logger, selected):
+        if platform_name not in PLATFORM_CONFIGS:
             logger.warning(f"No configuration found for {platform_name}. Skipping.")
+            continue
+        if not hasattr(module, 'publish'):
+            logger.warning(f"Platform module {platform_name} does not have a 'publish' function.")
+            continue
+        previous = None
+        if ledger is not None and not force:
+            existing = ledger.get(post.content_hash, platform_name)
+            if existing:
+                logger.info(f"Already published to {platform_name} at {existing['published_at']}: {existing['url']}. Skipping.")
+                results[platform_name] = True
+                metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="skipped")
+                continue
+            if post.source_path and hasattr(module, 'update'):
+                previous = ledger.find_by_source(post.source_path, platform_name)
+                if previous and not previous['remote_id']:
+                    previous = None
+        if scheduled:
+            if schedule.enqueue(post.source_path, platform_name, post.content_hash, post.rfc3339_date):
+                logger.info(f"Scheduled {platform_name} for {post.rfc3339_date}.")
+            else:
+                logger.info(f"Already scheduled {platform_name} for {post.rfc3339_date}. Skipping.")
+            results[platform_name] = True
+            metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="scheduled")
+            continue
+        jobs.append((platform_name, module, PLATFORM_CONFIGS[platform_name], previous))
+
+    if not jobs:
+        return results
+
+    started = {}
+    timeouts = {}
+    futures = {}
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(jobs), thread_name_prefix="publish")
+    try:
+        # Upload local images first so each platform gets a post with hosted image links.
+        with metrics.timed("images"):
+            platform_posts = prepare_images(
+                post, [(platform_name, module, config) for platform_name, module, config, _ in jobs],
+                ledger, logger, executor
+            )
+        previous_versions = {}
+        for platform_name, module, config, previous in jobs:
+            # Shorten posts that are over the platform's size limit, or fail them without sending.
+            platform_post = limits.fit(platform_posts[platform_name], platform_name, module, config, logger)
+            if platform_post is None:
+                metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="too_large")
+                results[platform_name] = False
+                continue
+            timeouts[platform_name] = config.get("timeout", DEFAULT_PLATFORM_TIMEOUT)
+            previous_versions[platform_name] = previous
+            batcher = (batchers or {}).get(platform_name)
+            if batcher is not None and not previous:
+                # Waiting for the batch holds no worker; the batch itself is sent on the batcher's executor.
+                future = _submit_batched(platform_name, config, logger, platform_post, started, batcher)
+            else:
+                future = executor.submit(
+                    _run_publish, platform_name, module, config, logger, platform_post, started, previous
+                )
+            futures[future] = platform_name
+
+        pending = set(futures)
+        while pending:
+            # Wake up at the earliest deadline among running platforms, or poll
+            # while some platforms are still waiting for a free worker.
+            deadlines = [started[futures[f]] + timeouts[futures[f]] for f in pending if futures[f] in started]
+            wait_for = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+            if len(deadlines) < len(pending):
+                wait_for = _DEADLINE_POLL_INTERVAL if wait_for is None else min(wait_for, _DEADLINE_POLL_INTERVAL)
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                platform_name = futures[future]
+                result = _report_result(logger, platform_name, future)
+                _record_publication(ledger, post, platform_name, result, previous_versions[platform_name])
+                results[platform_name] = bool(result)
+
+            now = time.monotonic()
+            for future in list(pending):
+                platform_name = futures[future]
+                if platform_name in started and now - started[platform_name] >= timeouts[platform_name]:
+                    pending.discard(future)
+                    if not future.cancel() and ledger is not None:
+                        future.add_done_callback(
+                            functools.partial(_record_late_result, logger, ledger, post, platform_name,
+                                              previous_versions[platform_name])
+                        )
+                    logger.error(f"Timed out publishing to {platform_name} after {timeouts[platform_name]} seconds.")
+                    metrics.increment(metrics.PUBLISH_RESULTS, platform=platform_name, outcome="timeout")
+                    results[platform_name] = False
+    finally:
+        # Timed-out workers cannot be interrupted; let them finish in the background.
+        if owns_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-def main(markdown_file_path, logger):
+    return results
+
+def main(markdown_file_path, logger, executor=None, ledger=None, force=False, selected=None, schedule=None,
+         batchers=None):
     """
     Main function to read a markdown file and publish it to configured platforms.
 
     Args:
         markdown_file_path (str): The absolute path to the markdown file.
         logger (logging.Logger): The logger instance for logging output.
+        executor (concurrent.futures.Executor): Optional shared executor for platform workers.
+        ledger (Ledger): Optional publishing ledger used to skip platforms that already have the post.
+        force (bool): Ignore the ledger and always create new posts.
+        selected (list): Platform names to publish to instead of every enabled platform.
+        schedule (Schedule): Optional queue that posts dated in the future are added to.
+        batchers (dict): Optional platform name -> Batcher, see publish_to_platforms.
+
+    Returns:
+        dict: A mapping of platform name to publish success, or None if the file could not be parsed.
     """
+    # Tag everything logged about this post with its own ID.
+    logger = for_post(logger, markdown_file_path)
     logger.info(f"--- Starting new blog distribution run for: {markdown_file_path} ---")
+    post_start = time.perf_counter()
 
     try:
-        metadata, content, local_image_paths = parse_markdown(markdown_file_path)
+        with metrics.timed("parse"):
+            metadata, content, local_image_paths = parse_markdown(markdown_file_path)
     except (ValueError, TypeError) as e:
         logger.error(f"Could not parse markdown file: {e}")
-        return
+        return None
 
     log_metadata(logger, metadata)
-    publish_to_platforms(logger, metadata, content, local_image_paths)
+    post = PreparedPost(metadata, content, local_image_paths, source_path=markdown_file_path)
+    results = publish_to_platforms(logger, post, executor=executor, ledger=ledger, force=force, selected=selected,
+                                   schedule=schedule, batchers=batchers)
+    metrics.observe(metrics.STAGE_SECONDS, time.perf_counter() - post_start, stage="post")
 
     logger.info("--- Blog distribution run finished ---")
+    return results
+
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+def _read_manifest(manifest_path):
+    """Reads a manifest file: one markdown path or glob per line, '#' starts a comment."""
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    entries = []
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                entries.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return entries
+
+def collect_markdown_files(paths, manifest_path=None):
+    """
+    Expands files, directories, glob patterns and an optional manifest into markdown file paths.
+
+    Directories are searched recursively for .md/.markdown files. Duplicates are dropped
+    and the original order is preserved.
+
+    Args:
+        paths (list): Markdown files, directories or glob patterns.
+        manifest_path (str): Optional path to a manifest file listing more entries.
+
+    Returns:
+        list: Absolute paths of the markdown files to publish.
+    """
+    entries = list(paths)
+    if manifest_path:
+        entries.extend(_read_manifest(manifest_path))
+
+    files = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            matches = []
+            for root, _, filenames in os.walk(entry):
+                matches.extend(os.path.join(root, name) for name in filenames if name.endswith(MARKDOWN_EXTENSIONS))
+            files.extend(sorted(matches))
+        elif any(char in entry for char in '*?['):
+            files.extend(sorted(match for match in glob.glob(entry, recursive=True) if os.path.isfile(match)))
+        else:
+            files.append(entry)
+
+    seen = set()
+    unique_files = []
+    for path in files:
+        path = os.path.abspath(path)
+        if path not in seen:
+            seen.add(path)
+            unique_files.append(path)
+    return unique_files
+
+def log_summary(logger, batch_results, elapsed):
+    """Logs per-platform success counts and the posts that failed."""
+    logger.info(f"\n=== Batch summary: {len(batch_results)} post(s) in {elapsed:.1f}s ===")
+    platform_counts = {}
+    failed_posts = []
+    for path, results in batch_results.items():
+        if results is None:
+            failed_posts.append(f"{path} (could not be parsed)")
+            continue
+        failed = sorted(name for name, success in results.items() if not success)
+        if failed:
+            failed_posts.append(f"{path} ({', '.join(failed)})")
+        for name, success in results.items():
+            counts = platform_counts.setdefault(name, [0, 0])
+            counts[0 if success else 1] += 1
+    for name, (succeeded, failed) in sorted(platform_counts.items()):
+        logger.info(f"{name}: {succeeded} succeeded, {failed} failed")
+    if failed_posts:
+        logger.warning("Posts with failures:")
+        for entry in failed_posts:
+            logger.warning(f"  {entry}")
+
+def _all_published(results):
+    """Returns True if a post was parsed and every platform published it (per-platform results, or None)."""
+    return results is not None and all(results.values())
+
+def make_batchers(logger, selected=None, executor=None):
+    """
+    Creates a Batcher for every enabled platform that can publish several posts in one request.
+
+    The batch size is set with a "batch_size" key in the platform's PLATFORM_CONFIGS entry
+    (1 turns batching off), and how long the first post of a batch waits for the others
+    with "batch_linger", in seconds.
+
+    Args:
+        logger (logging.Logger): The logger instance.
+        selected (list): Platform names to publish to instead of every enabled platform.
+        executor (concurrent.futures.Executor): Executor the batches are sent on.
+
+    Returns:
+        dict: Platform name -> Batcher.
+    """
+    batchers = {}
+    for platform_name, module in load_platforms(logger, selected):
+        config = PLATFORM_CONFIGS.get(platform_name)
+        if config is None or not hasattr(module, 'publish_batch'):
+            continue
+        batch_size = config.get("batch_size", DEFAULT_MAX_BATCH_SIZE)
+        if batch_size > 1:
+            batchers[platform_name] = Batcher(module.publish_batch, config, logger, max_size=batch_size,
+                                              linger=config.get("batch_linger", DEFAULT_LINGER), executor=executor)
+    return batchers
+
+def run_batch(markdown_paths, logger, max_posts=4, max_workers=8, ledger=None, force=False, selected=None,
+              schedule=None, batch_posts=None):
+    """
+    Publishes many markdown files in one process.
+
+    Posts are processed max_posts at a time, and all of their platform workers share
+    one pool of max_workers threads and one HTTP connection pool. New posts for
+    platforms that support it are sent together in batched requests.
+
+    Batched requests are sent on the same pool, so max_workers always bounds the
+    requests in flight. A post waiting for its batch holds no platform worker, but it
+    does keep its post worker busy, so a batch can only hold as many posts as are
+    processed at once. While some platform batches requests, batch_posts posts are
+    therefore processed at once, which may be more than max_posts: this costs more
+    parsed posts in memory, but lets batches fill up to their batch_size.
+
+    Args:
+        markdown_paths (list): Absolute paths of the markdown files to publish.
+        logger (logging.Logger): The logger instance.
+        max_posts (int): Maximum number of posts processed at once (see batch_posts).
+        max_workers (int): Maximum number of platform publishes and batches in flight across all posts.
+        ledger (Ledger): Optional publishing ledger used to skip posts that are already published.
+        force (bool): Ignore the ledger and always create new posts.
+        selected (list): Platform names to publish to instead of every enabled platform.
+        schedule (Schedule): Optional queue that posts dated in the future are added to.
+        batch_posts (int): Posts processed at once while some platform batches requests, overriding
+                           max_posts if larger. Defaults to the largest platform batch_size; 0 keeps max_posts.
+
+    Returns:
+        dict: A mapping of markdown path to its per-platform results (None if it failed to parse).
+    """
+    transport.configure(pool_maxsize=max_workers)
+    start = time.monotonic()
+    batch_results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="publish") as platform_executor:
+        batchers = make_batchers(logger, selected, platform_executor) if len(markdown_paths) > 1 else {}
+        post_workers = max_posts
+        if batchers:
+            if batch_posts is None:
+                batch_posts = max(batcher.max_size for batcher in batchers.values())
+            post_workers = max(max_posts, min(batch_posts, len(markdown_paths)))
+        with ThreadPoolExecutor(max_workers=post_workers, thread_name_prefix="post") as post_executor:
+            futures = {
+                post_executor.submit(main, path, logger, platform_executor, ledger, force, selected, schedule, batchers): path
+                for path in markdown_paths
+            }
+            for future in futures:
+                path = futures[future]
+                try:
+                    batch_results[path] = future.result()
+                except Exception as e:
+                    logger.error(f"An unexpected error occurred while processing {path}: {e}", exc_info=True)
+                    batch_results[path] = None
+    log_summary(logger, batch_results, time.monotonic() - start)
+    return batch_results
+
+def _write_payload(path, payload):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False, default=str)
+        f.write("\n")
+
+def log_cpu_summary(logger):
+    """Logs the CPU time used by each stage, summed over all posts."""
+    logger.info("\n=== CPU time by stage ===")
+    for labels, histogram in metrics.histograms(metrics.STAGE_CPU_SECONDS):
+        stage = labels.get("stage", "")
+        if labels.get("platform"):
+            stage = f"{stage}:{labels['platform']}"
+        logger.info(f"{stage:<28} {histogram.sum * 1000:9.1f} ms total, {histogram.sum / histogram.count * 1000:7.2f} ms/call ({histogram.count} calls)")
+
+def dry_run(markdown_paths, logger, output_dir, selected=None):
+    """
+    Runs the pipeline up to the network boundary and writes every platform's payload to disk.
+
+    Each post is parsed and rendered, and every enabled platform's build_payload()
+    produces the requests its publish() would send, after the same size check as
+    publishing (see blog_poster.limits). They are written as JSON to
+    <output_dir>/<post name>/<platform>.json. Nothing is sent, images are not uploaded
+    and the ledger is not used. The CPU time of each stage is logged at the end.
+
+    Args:
+        markdown_paths (list): Absolute paths of the markdown files.
+        logger (logging.Logger): The logger instance.
+        output_dir (str): Directory the payloads are written to.
+        selected (list): Platform names to build payloads for instead of every enabled platform.
+
+    Returns:
+        dict: A mapping of markdown path to {platform: True if its payload was written},
+              or None if the file could not be parsed.
+    """
+    loaded = load_platforms(logger, selected)
+    builders = []
+    for platform_name, module in loaded:
+        if not hasattr(module, 'build_payload'):
+            logger.warning(f"Platform module {platform_name} does not have a 'build_payload' function. Skipping.")
+        elif platform_name not in PLATFORM_CONFIGS:
+            logger.warning(f"No configuration found for {platform_name}. Skipping.")
+        else:
+            builders.append((platform_name, module, PLATFORM_CONFIGS[platform_name]))
+
+    start = time.monotonic()
+    results = {}
+    used_names = set()
+    for markdown_path in markdown_paths:
+        try:
+            with metrics.timed("parse"):
+                metadata, content, local_image_paths = parse_markdown(markdown_path)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Could not parse markdown file {markdown_path}: {e}")
+            results[markdown_path] = None
+            continue
+
+        post = PreparedPost(metadata, content, local_image_paths, source_path=markdown_path)
+        post.html  # Rendered up front so payload timings do not include it.
+
+        name = os.path.splitext(os.path.basename(markdown_path))[0]
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{os.path.splitext(os.path.basename(markdown_path))[0]}-{suffix}"
+        used_names.add(name)
+        post_dir = os.path.join(output_dir, name)
+        os.makedirs(post_dir, exist_ok=True)
+
+        results[markdown_path] = {}
+        for platform_name, module, config in builders:
+            # The same size check publishing applies, so the payload is what would be sent.
+            platform_post = limits.fit(post, platform_name, module, config, logger)
+            if platform_post is None:
+                results[markdown_path][platform_name] = False
+                continue
+            try:
+                with metrics.timed("payload", platform=platform_name):
+                    payload = module.build_payload(platform_post, config, logger)
+                _write_payload(os.path.join(post_dir, f"{platform_name}.json"), payload)
+                results[markdown_path][platform_name] = True
+            except Exception as e:
+                logger.error(f"Could not build the {platform_name} payload for {markdown_path}: {e}", exc_info=True)
+                results[markdown_path][platform_name] = False
+
+    elapsed = time.monotonic() - start
+    logger.info(f"\n=== Dry run: {len(markdown_paths)} post(s) in {elapsed:.2f}s, payloads written to {output_dir} ===")
+    log_cpu_summary(logger)
+    return results
+
+def release_scheduled(source, platforms, logger, ledger=None, schedule=None):
+    """Publishes a scheduled post to the platforms whose jobs are due; the schedule worker's publish callable."""
+    return main(source, logger, ledger=ledger, selected=platforms, schedule=schedule)
+
+def start_schedule_worker(logger, ledger, schedule, max_posts, stop_event):
+    """Runs the schedule worker in a background thread and returns the thread."""
+    publish = functools.partial(release_scheduled, logger=logger, ledger=ledger, schedule=schedule)
+    thread = threading.Thread(
+        target=run_worker, args=(schedule, publish, logger, max_posts, stop_event), name="schedule-worker", daemon=True
+    )
+    thread.start()
+    return thread
+
+def write_metrics(logger, elapsed, metrics_file=None, report_path=None):
+    """
+    Writes the metrics recorded during the run.
+
+    Args:
+        logger (logging.Logger): The logger instance.
+        elapsed (float): Wall-clock duration of the run, in seconds.
+        metrics_file (str): Path of the Prometheus textfile to write, if any.
+        report_path (str): Path of the JSON report to write, if any.
+    """
+    try:
+        if metrics_file:
+            metrics.write_prometheus(metrics_file)
+            logger.info(f"Metrics written to {metrics_file}")
+        if report_path:
+            metrics.write_report(report_path, elapsed)
+            logger.info(f"Run report written to {report_path}")
+    except OSError as e:
+        logger.error(f"Could not write metrics: {e}")
+
+def parse_args(argv=None):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python3 -m blog_poster.main",
+        description="Publish markdown posts to all configured platforms."
+    )
+    parser.add_argument("paths", nargs="*", help="Markdown files, directories or glob patterns to publish.")
+    parser.add_argument("--manifest", help="File listing markdown paths or globs to publish, one per line.")
+    parser.add_argument("--max-posts", type=int, default=4,
+                        help="Maximum number of posts processed at once (default: 4). Raised to --batch-posts "
+                             "while a platform batches requests.")
+    parser.add_argument("--batch-posts", type=int,
+                        help="Posts processed at once while a platform batches requests, even if more than "
+                             "--max-posts; this bounds the batch size. Requests in flight stay within "
+                             "--max-workers (default: the largest platform batch_size; 0 keeps --max-posts).")
+    parser.add_argument("--max-workers", type=int, default=8, help="Maximum number of platform publishes in flight (default: 8).")
+    parser.add_argument("--ledger", default=DEFAULT_LEDGER_PATH, help="Path of the publishing ledger database (default: publishing.db).")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the ledger: publish every post as new, even if unchanged. "
+                             "Posts dated in the future are still queued; add --no-schedule to publish them now.")
+    parser.add_argument("--no-schedule", action="store_true",
+                        help="Publish posts dated in the future right away instead of queueing them until their date.")
+    parser.add_argument("--schedule-worker", action="store_true",
+                        help="Keep running and publish queued posts when their date arrives.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and publish files again whenever they change.")
+    parser.add_argument("--debounce", type=float, default=watch.DEFAULT_DEBOUNCE,
+                        help=f"With --watch: seconds a file must be unchanged before it is published (default: {watch.DEFAULT_DEBOUNCE}).")
+    parser.add_argument("--poll-interval", type=float, default=watch.DEFAULT_POLL_INTERVAL,
+                        help=f"With --watch: seconds between scans when inotify is unavailable (default: {watch.DEFAULT_POLL_INTERVAL}).")
+    parser.add_argument("--dry-run", metavar="DIR",
+                        help="Build every platform's request payloads and write them to DIR instead of publishing.")
+    parser.add_argument("--render-cache", default=rendercache.DEFAULT_RENDER_CACHE_PATH,
+                        help="Path of the rendered-HTML cache database (default: render_cache.db).")
+    parser.add_argument("--no-render-cache", action="store_true",
+                        help="Render every post's HTML again instead of reusing it from the render cache.")
+    parser.add_argument("--metrics-file", help="Write run metrics to this Prometheus textfile (e.g. for node_exporter).")
+    parser.add_argument("--report", help="Write run metrics to this JSON report.")
+    parser.add_argument("--platforms", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                        help="Comma-separated platforms to publish to (default: every platform enabled in config.py).")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.manifest and not args.schedule_worker:
+        parser.error("at least one markdown path or --manifest is required")
+    if args.watch and args.dry_run:
+        parser.error("--watch cannot be combined with --dry-run")
+    if args.no_schedule and args.schedule_worker:
+        parser.error("--schedule-worker cannot be combined with --no-schedule")
+    if args.schedule_worker and args.dry_run:
+        parser.error("--schedule-worker cannot be combined with --dry-run")
+    return args
 
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python3 -m blog_poster.main <path_to_markdown_file>")
-        sys.exit(1)
-    
-    markdown_path = sys.argv[1]
-    if not os.path.isabs(markdown_path):
-        markdown_path = os.path.abspath(markdown_path)
+    args = parse_args()
 
     # Setup logger and run main function
     app_logger = setup_logger()
-    main(markdown_path, app_logger)
\ No newline at end of file
+    rendercache.configure(None if args.no_render_cache else args.render_cache, logger=app_logger)
+    # Size the connection pool before any worker thread starts; later calls with the same
+    # settings (e.g. from run_batch) keep the session instead of closing it under them.
+    transport.configure(pool_maxsize=args.max_workers)
+    # Posts dated in the future share the ledger's database as their queue.
+    schedule = None if args.no_schedule or args.dry_run else Schedule(args.ledger)
+    stop_event = threading.Event()
+    if args.watch or args.schedule_worker:
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    if args.watch:
+        ledger = Ledger(args.ledger)
+        if schedule is not None:
+            start_schedule_worker(app_logger, ledger, schedule, args.max_posts, stop_event)
+        publish = functools.partial(
+            run_batch, logger=app_logger, max_posts=args.max_posts, max_workers=args.max_workers,
+            batch_posts=args.batch_posts,
+            ledger=ledger, force=args.force, selected=args.platforms, schedule=schedule
+        )
+        try:
+            watch_paths = args.paths + (_read_manifest(args.manifest) if args.manifest else [])
+            watch.watch(
+                watch_paths, functools.partial(collect_markdown_files, args.paths, args.manifest), publish, app_logger,
+                extensions=MARKDOWN_EXTENSIONS, debounce=args.debounce, poll_interval=args.poll_interval,
+                stop_event=stop_event
+            )
+        except KeyboardInterrupt:
+            pass
+        stop_event.set()
+        app_logger.info("Stopped watching.")
+        sys.exit(0)
+    markdown_paths = collect_markdown_files(args.paths, args.manifest)
+    if not markdown_paths and not args.schedule_worker:
+        app_logger.error("No markdown files found.")
+        sys.exit(1)
+
+    run_start = time.monotonic()
+    if args.dry_run:
+        dry_run_results = dry_run(markdown_paths, app_logger, args.dry_run, selected=args.platforms)
+        write_metrics(app_logger, time.monotonic() - run_start, args.metrics_file, args.report)
+        sys.exit(0 if all(results and all(results.values()) for results in dry_run_results.values()) else 1)
+
+    ledger = Ledger(args.ledger)
+    all_succeeded = True
+    if len(markdown_paths) == 1:
+        results = main(markdown_paths[0], app_logger, ledger=ledger, force=args.force, selected=args.platforms,
+                       schedule=schedule)
+        all_succeeded = _all_published(results)
+    elif markdown_paths:
+        batch_results = run_batch(
+            markdown_paths, app_logger, args.max_posts, args.max_workers, ledger=ledger, force=args.force,
+            selected=args.platforms, schedule=schedule, batch_posts=args.batch_posts
+        )
+        all_succeeded = all(_all_published(results) for results in batch_results.values())
+    if args.schedule_worker:
+        worker = start_schedule_worker(app_logger, ledger, schedule, args.max_posts, stop_event)
+        try:
+            while worker.is_alive():
+                worker.join(1)
+        except KeyboardInterrupt:
+            stop_event.set()
+            worker.join()
+    write_metrics(app_logger, time.monotonic() - run_start, args.metrics_file, args.report)
+    sys.exit(0 if all_succeeded else 1)
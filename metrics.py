@@ -0,0 +1,256 @@
+"""
+In-process metrics for publishing runs.
+
+Parsing, rendering, image uploads, token refreshes, every platform publish and
+every HTTP request record their latency in histograms, together with counters
+for bytes sent and received, retries and publish outcomes. At the end of a run
+the metrics can be written as a Prometheus textfile (for node_exporter's textfile
+collector) and as a JSON report.
+"""
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from blog_poster.logs import RUN_ID
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = "blog_poster_stage_seconds"
+STAGE_CPU_SECONDS = "blog_poster_stage_cpu_seconds"
+HTTP_REQUEST_SECONDS = "blog_poster_http_request_seconds"
+HTTP_BYTES_SENT = "blog_poster_http_bytes_sent_total"
+HTTP_BYTES_RECEIVED = "blog_poster_http_bytes_received_total"
+HTTP_RETRIES = "blog_poster_http_retries_total"
+PUBLISH_RESULTS = "blog_poster_publish_results_total"
+RATE_LIMIT_WAIT_SECONDS = "blog_poster_rate_limit_wait_seconds"
+OVERSIZE_POSTS = "blog_poster_oversize_posts_total"
+RENDER_CACHE_LOOKUPS = "blog_poster_render_cache_lookups_total"
+
+_HELP = {
+    STAGE_SECONDS: "Time spent in each publishing stage.",
+    STAGE_CPU_SECONDS: "CPU time used by the thread running each publishing stage.",
+    HTTP_REQUEST_SECONDS: "Latency of each HTTP request attempt.",
+    HTTP_BYTES_SENT: "Request body bytes sent.",
+    HTTP_BYTES_RECEIVED: "Response body bytes received.",
+    HTTP_RETRIES: "HTTP requests retried after a failure.",
+    PUBLISH_RESULTS: "Platform publishes by outcome.",
+    RATE_LIMIT_WAIT_SECONDS: "Time requests waited for a rate-limit token.",
+    OVERSIZE_POSTS: "Posts over a platform's size limit, by action taken.",
+    RENDER_CACHE_LOOKUPS: "Rendered-HTML cache lookups, by result.",
+}
+
+
+class Histogram:
+    """A latency histogram with fixed buckets, as exposed by Prometheus."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile by linear interpolation within its bucket, like Prometheus'
+        histogram_quantile(). Values beyond the last bucket are reported as the maximum seen.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The estimated value, or None if nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, total in self.cumulative_counts():
+            if total >= rank:
+                if bound == float('inf'):
+                    return self.max
+                in_bucket = total - below
+                fraction = (rank - below) / in_bucket if in_bucket else 1.0
+                return min(self.max, lower + (bound - lower) * fraction)
+            lower, below = bound, total
+        return self.max
+
+    def cumulative_counts(self):
+        """Returns (upper bound, observations <= bound) pairs, ending with +Inf."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            pairs.append((bound, total))
+        pairs.append((float('inf'), self.count))
+        return pairs
+
+
+_histograms = {}
+_counters = {}
+_lock = threading.Lock()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def observe(name, seconds, **labels):
+    """Records a duration in the histogram with this name and labels."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def histograms(name):
+    """Returns (labels dict, Histogram) pairs for every histogram with this name."""
+    with _lock:
+        return [(dict(labels), histogram) for (key, labels), histogram in sorted(_histograms.items()) if key == name]
+
+
+def get_histogram(name, **labels):
+    """Returns the histogram with this name and labels, or None if nothing was recorded."""
+    with _lock:
+        return _histograms.get(_key(name, labels))
+
+
+def increment(name, value=1, **labels):
+    """Adds value to the counter with this name and labels."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextlib.contextmanager
+def timed(stage, **labels):
+    """
+    Records how long the with-block takes as a stage of the run, e.g. timed('parse').
+
+    Both wall-clock time and the CPU time of the current thread are recorded; the
+    latter excludes time spent waiting on the network or on other threads.
+    """
+    start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        observe(STAGE_CPU_SECONDS, time.thread_time() - cpu_start, stage=stage, **labels)
+        observe(STAGE_SECONDS, time.perf_counter() - start, stage=stage, **labels)
+
+
+def reset():
+    """Drops every recorded metric."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render_prometheus():
+    """Returns every metric in the Prometheus text exposition format."""
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+
+    lines = []
+    declared = set()
+    for (name, labels), histogram in histograms:
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, count in histogram.cumulative_counts():
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    for (name, labels), value in counters:
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot():
+    """
+    Returns every metric as plain data.
+
+    Returns:
+        dict: 'histograms' and 'counters' lists; each entry has the metric 'name' and
+              'labels', and histograms also 'count', 'sum', 'mean', 'max' and 'buckets'.
+    """
+    with _lock:
+        histograms = [
+            {
+                "name": name, "labels": dict(labels), "count": histogram.count,
+                "sum": round(histogram.sum, 6), "mean": round(histogram.sum / histogram.count, 6),
+                "max": round(histogram.max, 6),
+                "buckets": {repr(bound): count for bound, count in histogram.cumulative_counts()[:-1]},
+            }
+            for (name, labels), histogram in sorted(_histograms.items())
+        ]
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+    return {"histograms": histograms, "counters": counters}
+
+
+def _write_atomically(path, text):
+    """Writes a file through a temporary file, so readers never see it half written."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.metrics-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_prometheus(path):
+    """Writes the metrics as a Prometheus textfile (use a .prom name for node_exporter)."""
+    _write_atomically(path, render_prometheus())
+
+
+def write_report(path, elapsed=None):
+    """
+    Writes the metrics as a JSON run report.
+
+    Args:
+        path (str): Path of the report.
+        elapsed (float): Wall-clock duration of the run, in seconds.
+    """
+    report = {"run_id": RUN_ID, "elapsed_seconds": elapsed}
+    report.update(snapshot())
+    _write_atomically(path, json.dumps(report, indent=2))
@@ -0,0 +1,150 @@
+"""
+Converts Telegra.ph-style Node trees into Tumblr's Neue Post Format (NPF).
+
+See https://www.tumblr.com/docs/npf. NPF posts are a flat list of content
+blocks: text blocks carry plain text with formatting ranges (bold, italic,
+links...) and a subtype for headings, quotes and list items, and image blocks
+carry media. The post's rendered HTML is already available as a Node tree
+(PreparedPost.telegraph_nodes), which is much easier to flatten than HTML.
+"""
+
+# Node tag -> NPF inline formatting type.
+INLINE_FORMATS = {'b': 'bold', 'strong': 'bold', 'i': 'italic', 'em': 'italic', 's': 'strikethrough'}
+# Node tag -> NPF text block subtype.
+BLOCK_SUBTYPES = {'h3': 'heading1', 'h4': 'heading2', 'pre': 'chat', 'aside': 'quote'}
+LIST_SUBTYPES = {'ul': 'unordered-list-item', 'ol': 'ordered-list-item'}
+
+
+class _BlockBuilder:
+    """Collects NPF blocks while walking the node tree."""
+
+    def __init__(self, image_media):
+        self.blocks = []
+        self._image_media = image_media
+        self._text = []
+        self._length = 0
+        self._formatting = []
+
+    def flush(self, subtype=None, indent_level=0):
+        """Ends the current text block, if it has any text."""
+        text = ''.join(self._text)
+        stripped = text.strip()
+        if stripped:
+            offset = len(text) - len(text.lstrip())
+            block = {"type": "text", "text": stripped}
+            if subtype:
+                block["subtype"] = subtype
+            if indent_level:
+                block["indent_level"] = indent_level
+            formatting = []
+            for entry in self._formatting:
+                start = max(0, entry["start"] - offset)
+                end = min(len(stripped), entry["end"] - offset)
+                if start < end:
+                    formatting.append(dict(entry, start=start, end=end))
+            if formatting:
+                block["formatting"] = formatting
+            self.blocks.append(block)
+        self._text, self._length, self._formatting = [], 0, []
+
+    def add_text(self, text):
+        self._text.append(text)
+        self._length += len(text)
+
+    def add_image(self, src, subtype=None, indent_level=0):
+        self.flush(subtype, indent_level)
+        media = self._image_media(src)
+        if media:
+            self.blocks.append({"type": "image", "media": [media]})
+
+    def inline(self, node, subtype=None, indent_level=0):
+        """Adds the text of an inline node, recording its formatting range."""
+        if isinstance(node, str):
+            self.add_text(node)
+            return
+        tag = node.get('tag')
+        if tag == 'br':
+            self.add_text('\n')
+            return
+        if tag == 'img':
+            self.add_image(node.get('attrs', {}).get('src'), subtype, indent_level)
+            return
+        start = self._length
+        for child in node.get('children', []):
+            self.inline(child, subtype, indent_level)
+        # An image inside the element may have flushed the block it started in.
+        start = min(start, self._length)
+        if tag in INLINE_FORMATS:
+            self._formatting.append({"start": start, "end": self._length, "type": INLINE_FORMATS[tag]})
+        elif tag == 'a' and node.get('attrs', {}).get('href'):
+            self._formatting.append({"start": start, "end": self._length, "type": "link",
+                                     "url": node['attrs']['href']})
+
+    def block(self, node, subtype=None, indent_level=0):
+        """Adds a block-level node as one or more NPF blocks."""
+        if isinstance(node, str):
+            self.add_text(node)
+            self.flush(subtype, indent_level)
+            return
+        tag = node.get('tag')
+        children = node.get('children', [])
+        if tag == 'hr':
+            self.flush(subtype, indent_level)
+        elif tag in LIST_SUBTYPES:
+            for item in children:
+                self.list_item(item, LIST_SUBTYPES[tag], indent_level)
+        elif tag in ('blockquote', 'figure'):
+            nested_subtype = 'indented' if tag == 'blockquote' else subtype
+            for child in children:
+                if isinstance(child, dict) and child.get('tag') in ('p', 'figcaption', 'ul', 'ol', 'img', 'blockquote', 'pre'):
+                    self.block(child, nested_subtype, indent_level)
+                else:
+                    self.inline(child, nested_subtype, indent_level)
+            self.flush(nested_subtype, indent_level)
+        elif tag in ('iframe', 'video'):
+            self.flush(subtype, indent_level)
+            src = node.get('attrs', {}).get('src')
+            if src:
+                self.blocks.append({"type": "video" if tag == 'video' else "link", "url": src})
+        else:
+            subtype = BLOCK_SUBTYPES.get(tag, subtype)
+            self.inline(node, subtype, indent_level)
+            self.flush(subtype, indent_level)
+
+    def list_item(self, item, subtype, indent_level):
+        """Adds a list item; nested lists become items with a deeper indent_level."""
+        if not isinstance(item, dict):
+            self.add_text(item)
+            self.flush(subtype, indent_level)
+            return
+        for child in item.get('children', []):
+            if isinstance(child, dict) and child.get('tag') in LIST_SUBTYPES:
+                self.flush(subtype, indent_level)
+                for nested in child.get('children', []):
+                    self.list_item(nested, LIST_SUBTYPES[child['tag']], min(indent_level + 1, 7))
+            elif isinstance(child, dict) and child.get('tag') == 'p':
+                self.inline(child, subtype, indent_level)
+                self.add_text(' ')
+            else:
+                self.inline(child, subtype, indent_level)
+        self.flush(subtype, indent_level)
+
+
+def nodes_to_blocks(nodes, image_media):
+    """
+    Converts Node objects into a list of NPF content blocks.
+
+    Args:
+        nodes (list): Node objects, as returned by telegraph_nodes.html_to_nodes().
+        image_media (callable): Called with an image's src; returns the NPF media object
+                                for it (e.g. {"url": ...} or {"type": ..., "identifier": ...}),
+                                or None to leave the image out.
+
+    Returns:
+        list: The NPF content blocks.
+    """
+    builder = _BlockBuilder(image_media)
+    for node in nodes:
+        builder.block(node)
+    builder.flush()
+    return builder.blocks
@@ -1,9 +1,179 @@
 """
 Parses a Markdown file to extract front-matter and body content.
+
+Parsed files are cached in memory, keyed by path and validated against the file's
+modification time and size (and, when those change, its content hash), so batch
+and repeated runs do not re-parse files that have not changed. A cached file
+whose modification time changed is hashed in chunks first, so a large file that
+was only touched is never read into memory as a whole.
 """
-import frontmatter
-import re
+import collections
+import hashlib
 import os
+import re
+import threading
+
+import frontmatter
+
+# A single pass over the body finds Markdown images, links and ATX headings.
+# Images: ![alt](src "optional title"), links: [text](href "optional title"), headings: ## Text
+ASSET_PATTERN = re.compile(
+    r'(?P<image>!\[(?P<image_alt>.*?)\]\((?P<image_src>.*?)(?:\s+"[^"]*")?\))'
+    r'|(?P<link>\[(?P<link_text>.*?)\]\((?P<link_href>.*?)(?:\s+"[^"]*")?\))'
+    r'|^(?P<heading_level>#{1,6})[ \t]+(?P<heading>.+?)[ \t#]*$',
+    re.MULTILINE
+)
+# Image sources with these prefixes are hosted elsewhere and need no upload.
+REMOTE_PREFIXES = ('http://', 'https://', '//', 'data:')
+# Maximum number of parsed files kept in the cache.
+CACHE_SIZE = 1024
+# Bytes read at a time when hashing a file.
+HASH_CHUNK_SIZE = 1024 * 1024
+
+ParsedDocument = collections.namedtuple(
+    'ParsedDocument',
+    ['metadata', 'content', 'local_image_paths', 'images', 'links', 'headings', 'content_hash']
+)
+ParsedDocument.__doc__ = """
+A parsed markdown file.
+
+Attributes:
+    metadata (dict): The front-matter.
+    content (str): The body content.
+    local_image_paths (list): Absolute paths of images that are not remote URLs.
+    images (list): (alt text, source) tuples for every image in the body.
+    links (list): (text, href) tuples for every link in the body.
+    headings (list): (level, text) tuples for every ATX heading in the body.
+    content_hash (str): SHA-256 hex digest of the raw file.
+"""
+
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def extract_assets(content, base_dir):
+    """
+    Finds images, links and headings in a markdown body in one pass.
+
+    Args:
+        content (str): The markdown body.
+        base_dir (str): Absolute directory that relative image paths are resolved against.
+
+    Returns:
+        tuple: (images, links, headings, local_image_paths) as described on ParsedDocument.
+    """
+    images, links, headings, local_image_paths = [], [], [], []
+    for match in ASSET_PATTERN.finditer(content):
+        if match.group('image'):
+            src = match.group('image_src').strip()
+            images.append((match.group('image_alt'), src))
+            if not src.startswith(REMOTE_PREFIXES):
+                # Resolve relative paths against the markdown file's directory
+                local_image_paths.append(os.path.normpath(os.path.join(base_dir, src)))
+        elif match.group('link'):
+            links.append((match.group('link_text'), match.group('link_href').strip()))
+        else:
+            headings.append((len(match.group('heading_level')), match.group('heading')))
+    return images, links, headings, local_image_paths
+
+
+def rewrite_images(content, base_dir, url_map):
+    """
+    Replaces the sources of local images in a markdown body.
+
+    Args:
+        content (str): The markdown body.
+        base_dir (str): Absolute directory that relative image paths are resolved against.
+        url_map (dict): Absolute local image path -> URL to use instead.
+
+    Returns:
+        str: The body with every mapped image pointing at its URL.
+    """
+    def replace(match):
+        if not match.group('image'):
+            return match.group(0)
+        src = match.group('image_src').strip()
+        if src.startswith(REMOTE_PREFIXES):
+            return match.group(0)
+        url = url_map.get(os.path.normpath(os.path.join(base_dir, src)))
+        if not url:
+            return match.group(0)
+        start, end = match.span('image_src')
+        offset = match.start()
+        text = match.group(0)
+        return text[:start - offset] + url + text[end - offset:]
+
+    return ASSET_PATTERN.sub(replace, content)
+
+
+def _parse_bytes(raw, file_path):
+    """Parses the raw bytes of a markdown file into a ParsedDocument."""
+    metadata, content = frontmatter.parse(raw.decode('utf-8'))
+    images, links, headings, local_image_paths = extract_assets(content, os.path.dirname(file_path))
+    return ParsedDocument(
+        metadata, content, local_image_paths, images, links, headings,
+        hashlib.sha256(raw).hexdigest()
+    )
+
+
+def _hash_file(f):
+    """Returns the SHA-256 hex digest of an open binary file, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_document(file_path):
+    """
+    Parses a markdown file, reusing the cached result if the file has not changed.
+
+    The returned document is shared with the cache and must not be modified.
+
+    Args:
+        file_path (str): The path to the markdown file.
+
+    Returns:
+        ParsedDocument: The parsed file.
+
+    Raises:
+        ValueError: If the file cannot be read or parsed.
+    """
+    file_path = os.path.abspath(file_path)
+    try:
+        stat = os.stat(file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            cached = _cache.get(file_path)
+            if cached is not None and cached[0] == signature:
+                _cache.move_to_end(file_path)
+                return cached[1]
+
+        with open(file_path, 'rb') as f:
+            if cached is not None and cached[1].content_hash == _hash_file(f):
+                # Touched but not modified.
+                document = cached[1]
+            else:
+                f.seek(0)
+                document = _parse_bytes(f.read(), file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        raise ValueError(f"Error reading markdown file {file_path}: {e}") from e
+    except Exception as e:
+        raise ValueError(f"Error parsing markdown file {file_path}: {e}") from e
+
+    with _cache_lock:
+        _cache[file_path] = (signature, document)
+        _cache.move_to_end(file_path)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return document
+
+
+def clear_cache():
+    """Drops every cached document."""
+    with _cache_lock:
+        _cache.clear()
+
 
 def parse_markdown(file_path):
     """
@@ -14,30 +184,10 @@ def parse_markdown(file_path):
 
     Returns:
         tuple: A tuple containing the post's metadata (dict), content (str), and a list of local image paths (list).
-               Returns (None, None, None) if the file cannot be read or parsed.
+
+    Raises:
+        ValueError: If the file cannot be read or parsed.
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            post = frontmatter.load(f)
-            metadata = post.metadata
-            content = post.content
-
-            local_image_paths = []
-            # Regex to find Markdown image syntax: ![alt text](image_path)
-            # Group 1: alt text, Group 2: image_path
-            image_pattern = re.compile(r'!\[.*?\]\((.*?)\)')
-            
-            # Find all image paths
-            found_image_paths = image_pattern.findall(content)
-
-            # Determine if path is local or external URL
-            for img_path in found_image_paths:
-                if not img_path.startswith(('http://', 'https://')):
-                    # Resolve relative paths to absolute paths based on the markdown file's directory
-                    abs_img_path = os.path.abspath(os.path.join(os.path.dirname(file_path), img_path))
-                    local_image_paths.append(abs_img_path)
-
-            return metadata, content, local_image_paths
-    except Exception as e:
-        print(f"Error parsing markdown file: {e}")
-        return None, None, None
+    document = parse_document(file_path)
+    # Hand out copies so callers cannot modify the cached document.
+    return dict(document.metadata), document.content, list(document.local_image_paths)
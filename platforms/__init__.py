@@ -0,0 +1,102 @@
+"""
+Registry of the platforms posts can be published to.
+
+Platforms are registered by name and their modules are imported only when first
+used, so a run that publishes to one platform does not pay for importing the
+client libraries of all the others. Besides the built-in platforms, installed
+packages can add their own through the 'blog_poster.platforms' entry point
+group, e.g. in pyproject.toml:
+
+    [project.entry-points."blog_poster.platforms"]
+    medium = "blog_poster_medium.publisher"
+
+A platform module provides publish(post, config, logger), and optionally
+update(post, remote_id, config, logger), upload_image(path, mime_type, config, logger),
+build_payload(post, config, logger) for dry runs, and publish_batch(posts, config, logger)
+to send several new posts in one request in batch mode.
+"""
+import importlib
+import threading
+from importlib import metadata
+
+ENTRY_POINT_GROUP = "blog_poster.platforms"
+
+BUILTIN_PLATFORMS = {
+    "blogger": "blog_poster.platforms.blogger",
+    "dev_to": "blog_poster.platforms.dev_to",
+    "hashnode": "blog_poster.platforms.hashnode",
+    "telegraph": "blog_poster.platforms.telegraph",
+    "tumblr": "blog_poster.platforms.tumblr",
+    "wordpress": "blog_poster.platforms.wordpress",
+    "write_as": "blog_poster.platforms.write_as",
+}
+
+# Platform name -> module path (str) or entry point, until it is loaded.
+_registry = dict(BUILTIN_PLATFORMS)
+_modules = {}
+_entry_points_loaded = False
+_lock = threading.RLock()
+
+
+def _load_entry_points():
+    """Adds platforms advertised by installed packages. Built-in names take precedence."""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+        _registry.setdefault(entry_point.name, entry_point)
+
+
+def register(name, target):
+    """
+    Registers a platform.
+
+    Args:
+        name (str): The platform name, as used in PLATFORM_CONFIGS.
+        target (str or module): The module implementing the platform, or its dotted path
+                                to import it lazily.
+    """
+    with _lock:
+        _modules.pop(name, None)
+        _registry[name] = target
+        if not isinstance(target, str):
+            _modules[name] = target
+
+
+def available_platforms():
+    """Returns the sorted names of all registered platforms, without importing them."""
+    with _lock:
+        _load_entry_points()
+        return sorted(_registry)
+
+
+def get_platform(name):
+    """
+    Returns a platform's module, importing it on first use.
+
+    Args:
+        name (str): The platform name.
+
+    Returns:
+        module: The platform module.
+
+    Raises:
+        KeyError: If no platform with that name is registered.
+        ImportError: If the platform module or one of its dependencies cannot be imported.
+    """
+    with _lock:
+        module = _modules.get(name)
+        if module is not None:
+            return module
+        if name not in _registry:
+            _load_entry_points()
+        target = _registry[name]
+        if isinstance(target, str):
+            module = importlib.import_module(target)
+        elif isinstance(target, metadata.EntryPoint):
+            module = target.load()
+        else:
+            module = target
+        _modules[name] = module
+        return module
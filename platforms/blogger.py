@@ -1,91 +1,57 @@
-import requests
-import markdown
+import functools
 import json
-from requests_oauthlib import OAuth2Session
-
-# Path to the config file (assuming it's one level up from platforms/)
-CONFIG_FILE_PATH = "/Users/bezal/blog_poster/config.py"
-
-def _update_config_file(new_config, logger):
-    """
-    Updates the config.py file with new token information.
-    This is a direct file manipulation and should be used carefully.
-    """
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as f:
-            lines = f.readlines()
-
-        # Find the PLATFORM_CONFIGS dictionary start and end
-        start_line = -1
-        end_line = -1
-        for i, line in enumerate(lines):
-            if "PLATFORM_CONFIGS = {" in line:
-                start_line = i
-            if start_line != -1 and line.strip() == ")":
-                end_line = i
-                break
-        
-        if start_line == -1 or end_line == -1:
-            logger.error("Could not find PLATFORM_CONFIGS in config.py. Cannot update token.")
-            return False
-
-        # Extract the existing config string
-        existing_config_str = "".join(lines[start_line : end_line + 1])
-        # Safely evaluate the string to a Python dict
-        existing_config = eval(existing_config_str)
+import re
+import time
+import uuid
+from urllib.parse import urlsplit
 
-        # Update the specific platform's config
-        existing_config['blogger'] = new_config['blogger']
-
-        # Convert back to string representation for writing
-        # This is a simplified approach; a proper config parser/writer would be better
-        updated_config_str = "PLATFORM_CONFIGS = " + json.dumps(existing_config, indent=4)
-
-        # Replace the old config block with the new one
-        new_lines = lines[:start_line] + [updated_config_str + "\n"] + lines[end_line + 1:]
-
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            f.writelines(new_lines)
-        logger.info("Config.py updated with new Blogger access token.")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to update config.py: {e}", exc_info=True)
-        return False
+import requests
+from blog_poster import retry
+from blog_poster import tokens
+from blog_poster import transport
+
+# Override with "base_url" and "token_url" keys in the platform config, e.g. to point at a local stub.
+BASE_URL = "https://www.googleapis.com/blogger/v3"
+TOKEN_URL = "https://oauth2.googleapis.com/token"
+# The form of the post that is sent, and its size limit in bytes: Blogger does not save
+# posts of about 1 MB of HTML or more. Override with "max_content_bytes". See blog_poster.limits.
+CONTENT_FORMAT = 'html'
+MAX_CONTENT_BYTES = 1000 * 1000
+# Google's batch endpoint for the Blogger API. Override with a "batch_url" key in the platform config.
+BATCH_URL = "https://www.googleapis.com/batch/blogger/v3"
+# Most calls packed into one batch request.
+MAX_BATCH_CALLS = 50
+# Rounds of resending the calls of a batch that were throttled or had their token rejected.
+BATCH_RETRY_ROUNDS = 2
+
+def _can_refresh(config):
+    """Returns True if the configuration has everything needed to refresh the access token."""
+    return all(config.get(key) for key in ("client_id", "client_secret", "refresh_token"))
 
 def _refresh_blogger_token(config, logger):
     """
-    Refreshes the Blogger access token using the refresh token.
-    """
-    client_id = config.get("client_id")
-    client_secret = config.get("client_secret")
-    refresh_token = config.get("refresh_token")
-    redirect_uris = config.get("redirect_uris")
-
-    if not all([client_id, client_secret, refresh_token, redirect_uris]):
-        logger.error("Missing client_id, client_secret, refresh_token, or redirect_uris for Blogger token refresh.")
-        return None
+    Exchanges the refresh token for a new Blogger access token.
 
-    token_url = "https://oauth2.googleapis.com/token"
+    Returns:
+        tuple: (access_token, expires_in seconds), or None if the refresh failed.
+    """
     payload = {
-        'client_id': client_id,
-        'client_secret': client_secret,
-        'refresh_token': refresh_token,
+        'client_id': config.get("client_id"),
+        'client_secret': config.get("client_secret"),
+        'refresh_token': config.get("refresh_token"),
         'grant_type': 'refresh_token'
     }
 
     try:
-        response = requests.post(token_url, data=payload)
+        response = transport.post(config.get("token_url", TOKEN_URL), data=payload)
         response.raise_for_status()
         token_data = response.json()
 
         new_access_token = token_data.get('access_token')
         if new_access_token:
             logger.info("Blogger access token refreshed successfully.")
-            # Update the config dictionary in memory
-            config['access_token'] = new_access_token
-            # Persist the updated config to file
-            _update_config_file(config, logger)
-            return new_access_token
+            # Google access tokens last an hour unless the response says otherwise.
+            return new_access_token, token_data.get('expires_in', 3600)
         else:
             logger.error(f"Failed to get new access token during refresh: {token_data}")
             return None
@@ -96,99 +62,110 @@ def _refresh_blogger_token(config, logger):
             logger.error(f"Refresh token response body: {e.response.text}")
         return None
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
+def _get_access_token(config, logger, rejected_token=None):
     """
-    Publishes a post to Blogger.
+    Returns a Blogger access token that is not about to expire.
+
+    Tokens are refreshed ahead of expiry by the shared token manager, so every
+    worker uses the same fresh token. Without refresh credentials the configured
+    access_token is used as is.
 
     Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
         config (dict): The platform-specific configuration.
         logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
+        rejected_token (str): A token Blogger just rejected with 401, forcing a refresh.
 
     Returns:
-        bool: True if successful, False otherwise.
+        str: The access token, or None if none is available.
     """
-    logger.info("Attempting to publish to Blogger...")
-    if local_image_paths:
-        logger.warning("Blogger does not currently support direct image uploads via this script. Images will be skipped.")
-    access_token = config.get("access_token")
+    configured_token = config.get("access_token")
+    if configured_token == "YOUR_BLOGGER_ACCESS_TOKEN":
+        configured_token = None
+    if not _can_refresh(config):
+        return configured_token if configured_token != rejected_token else None
+
+    key = f"blogger:{config.get('client_id')}"
+    refresh = functools.partial(_refresh_blogger_token, config, logger)
+    access_token = tokens.get_manager().get_token(key, refresh, rejected_token=rejected_token)
+    if access_token is None and configured_token != rejected_token:
+        return configured_token
+    return access_token
+
+def _get_credentials(config, logger):
+    """Returns (access_token, blog_id), or (None, None) if the configuration is incomplete."""
     blog_id = config.get("blog_id")
-
-    if not access_token or access_token == "YOUR_BLOGGER_ACCESS_TOKEN":
-        logger.error("Error: Blogger Access Token is missing or not set in config.py.")
-        return False
     if not blog_id or blog_id == "YOUR_BLOGGER_BLOG_ID":
         logger.error("Error: Blogger Blog ID is missing or not set in config.py.")
-        return False
-
-    api_url = f"https://www.googleapis.com/blogger/v3/blogs/{blog_id}/posts/"
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
+        return None, None
 
-    # Blogger expects content in HTML format.
-    html_content = markdown.markdown(post_content)
+    access_token = _get_access_token(config, logger)
+    if not access_token:
+        logger.error("Error: Blogger Access Token is missing or not set in config.py, and it could not be refreshed.")
+        return None, None
+    return access_token, blog_id
 
+def _build_post(post, blog_id, logger):
+    """Builds the post resource shared by the insert and patch endpoints."""
     data = {
         "kind": "blogger#post",
         "blog": {
             "id": blog_id
         },
-        "title": post_metadata.get("title", "No Title"),
-        "content": html_content,
-        "labels": post_metadata.get("tags", []) # Blogger uses labels for tags
+        "title": post.title or "No Title",
+        "content": post.html, # Blogger expects content in HTML format.
+        "labels": post.tags # Blogger uses labels for tags, as a list of strings
     }
 
     # Add author if available
-    if author:
-        data["author"] = {"displayName": author}
+    if post.author:
+        data["author"] = {"displayName": post.author}
 
     # Add published date if available
-    if date:
+    if post.date:
         # Blogger API expects RFC3339 format (e.g., 2025-08-26T12:00:00Z)
-        # Assuming date from front-matter is in a parseable format
-        try:
-            from datetime import datetime
-            # Attempt to parse and format the date
-            parsed_date = datetime.fromisoformat(str(date).replace('Z', '+00:00')) # Handle Z for UTC
-            data["published"] = parsed_date.isoformat(timespec='seconds') + 'Z'
-        except ValueError:
-            logger.warning(f"Could not parse date '{date}' for Blogger. Using default.")
+        if post.rfc3339_date:
+            data["published"] = post.rfc3339_date
+        else:
+            logger.warning(f"Could not parse date '{post.date}' for Blogger. Using default.")
+    return data
+
+def _send(method, api_url, access_token, data, config, success_message, logger):
+    """
+    Sends a post request, refreshing the access token and retrying once on 401.
 
-    # Blogger API expects labels as a list of strings
-    if isinstance(data["labels"], str):
-        data["labels"] = [label.strip() for label in data["labels"].split(',')]
+    Returns:
+        dict: The post's 'id' and 'url' if successful, False otherwise.
+    """
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
 
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        # A PATCH of the same content is safe to repeat; an insert is not.
+        response = transport.request(method, api_url, headers=headers, json=data, idempotent=method != "POST")
         response.raise_for_status()
 
         response_data = response.json()
         post_url = response_data.get("url")
-        logger.info(f"Successfully published to Blogger! URL: {post_url}")
-        return True
+        logger.info(f"{success_message} URL: {post_url}")
+        return {"id": response_data.get("id"), "url": post_url}
 
     except requests.exceptions.RequestException as e:
         if e.response is not None and e.response.status_code == 401:
-            logger.warning("Blogger access token expired. Attempting to refresh...")
-            new_access_token = _refresh_blogger_token(config, logger)
+            # The token was revoked or expired early; refresh it unless another worker already has.
+            logger.warning("Blogger access token was rejected. Attempting to refresh...")
+            new_access_token = _get_access_token(config, logger, rejected_token=access_token)
             if new_access_token:
                 logger.info("Retrying Blogger post with new access token...")
                 headers["Authorization"] = f"Bearer {new_access_token}"
                 try:
-                    retry_response = requests.post(api_url, headers=headers, json=data)
+                    retry_response = transport.request(method, api_url, headers=headers, json=data, idempotent=method != "POST")
                     retry_response.raise_for_status()
                     retry_response_data = retry_response.json()
                     retry_post_url = retry_response_data.get("url")
-                    logger.info(f"Successfully published to Blogger after refresh! URL: {retry_post_url}")
-                    return True
+                    logger.info(f"{success_message} (after token refresh) URL: {retry_post_url}")
+                    return {"id": retry_response_data.get("id"), "url": retry_post_url}
                 except requests.exceptions.RequestException as retry_e:
                     logger.error(f"Blogger post failed even after token refresh: {retry_e}", exc_info=True)
                     if retry_e.response:
@@ -202,73 +179,228 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
             if e.response:
                 logger.error(f"Response body: {e.response.text}")
             return False
-    blog_id = config.get("blog_id")
 
-    if not access_token or access_token == "YOUR_BLOGGER_ACCESS_TOKEN":
-        logger.error("Error: Blogger Access Token is missing or not set in config.py.")
+def publish(post, config, logger):
+    """
+    Publishes a post to Blogger.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to Blogger...")
+    if post.local_image_paths:
+        logger.warning("Blogger does not currently support direct image uploads via this script. Images will be skipped.")
+    access_token, blog_id = _get_credentials(config, logger)
+    if access_token is None:
         return False
-    if not blog_id or blog_id == "YOUR_BLOGGER_BLOG_ID":
-        logger.error("Error: Blogger Blog ID is missing or not set in config.py.")
+
+    api_url = f"{config.get('base_url', BASE_URL)}/blogs/{blog_id}/posts/"
+    data = _build_post(post, blog_id, logger)
+    return _send("POST", api_url, access_token, data, config, "Successfully published to Blogger!", logger)
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Blogger post in place.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The Blogger post ID returned when it was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info(f"Attempting to update Blogger post {remote_id}...")
+    access_token, blog_id = _get_credentials(config, logger)
+    if access_token is None:
         return False
 
-    api_url = f"https://www.googleapis.com/blogger/v3/blogs/{blog_id}/posts/"
+    api_url = f"{config.get('base_url', BASE_URL)}/blogs/{blog_id}/posts/{remote_id}"
+    data = _build_post(post, blog_id, logger)
+    return _send("PATCH", api_url, access_token, data, config, "Successfully updated Blogger post!", logger)
 
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
+def _encode_batch(calls, access_token):
+    """
+    Encodes calls as a multipart/mixed batch body.
 
-    # Blogger expects content in HTML format.
-    html_content = markdown.markdown(post_content)
+    Args:
+        calls (list): (content ID, method, path, JSON body) tuples.
+        access_token (str): The token every call is authorized with.
 
-    data = {
-        "kind": "blogger#post",
-        "blog": {
-            "id": blog_id
-        },
-        "title": post_metadata.get("title", "No Title"),
-        "content": html_content,
-        "labels": post_metadata.get("tags", []) # Blogger uses labels for tags
-    }
+    Returns:
+        tuple: (body bytes, Content-Type header value).
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    lines = []
+    for content_id, method, path, body in calls:
+        payload = json.dumps(body)
+        lines += [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <{content_id}>",
+            "",
+            f"{method} {path} HTTP/1.1",
+            "Content-Type: application/json; charset=UTF-8",
+            f"Authorization: Bearer {access_token}",
+            "",
+            payload,
+        ]
+    lines.append(f"--{boundary}--")
+    return "\r\n".join(lines).encode('utf-8'), f"multipart/mixed; boundary={boundary}"
+
+def _split_head(data):
+    """Splits bytes into (headers, body) at the first blank line."""
+    parts = re.split(rb"\r?\n\r?\n", data, maxsplit=1)
+    return parts[0], parts[1] if len(parts) > 1 else b""
+
+def _decode_batch(response):
+    """
+    Splits a multipart/mixed batch response into its parts.
 
-    # Blogger API expects labels as a list of strings
-    if isinstance(data["labels"], str):
-        data["labels"] = [label.strip() for label in data["labels"].split(',')]
+    Returns:
+        dict: content ID (without the 'response-' prefix) -> (status code, parsed JSON body or {},
+              the part's Retry-After in seconds or None).
+    """
+    match = re.search(r'boundary="?([^";]+)"?', response.headers.get("Content-Type", ""))
+    if not match:
+        raise ValueError(f"Batch response is not multipart: {response.text[:200]}")
+    results = {}
+    for part in response.content.split(b"--" + match.group(1).encode('utf-8')):
+        part = part.strip(b"\r\n")
+        if not part or part == b"--":
+            continue
+        outer_headers, inner = _split_head(part)
+        content_id = re.search(rb"Content-ID:\s*<(?:response-)?([^>]+)>", outer_headers, re.IGNORECASE)
+        inner = inner.lstrip()
+        status = re.match(rb"HTTP/\d(?:\.\d)?\s+(\d{3})", inner)
+        if not content_id or not status:
+            continue
+        inner_headers, body = _split_head(inner)
+        body = body.strip()
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            data = {"error": body.decode('utf-8', 'replace')}
+        retry_after = re.search(rb"^Retry-After:\s*(.+?)\s*$", inner_headers, re.IGNORECASE | re.MULTILINE)
+        retry_after = retry.parse_retry_after(retry_after.group(1).decode('ascii', 'replace')) if retry_after else None
+        results[content_id.group(1).decode('utf-8')] = (int(status.group(1)), data, retry_after)
+    return results
 
-    try:
-        response = requests.post(api_url, headers=headers, json=data)
-        response.raise_for_status()
+def publish_batch(posts, config, logger):
+    """
+    Publishes several posts to Blogger with Google batch requests.
 
-        response_data = response.json()
-        post_url = response_data.get("url")
-        logger.info(f"Successfully published to Blogger! URL: {post_url}")
-        return True
+    Up to MAX_BATCH_CALLS posts.insert calls are packed into one multipart/mixed request.
+    Each part's response is parsed on its own: calls rejected with 401 are resent once
+    with a refreshed token, and throttled calls (429) are resent in the next round,
+    after a backoff that honours Retry-After. posts.insert is not idempotent, so calls
+    that failed with a server error, or whose batch request failed, are not resent.
 
-    except requests.exceptions.RequestException as e:
-        if e.response is not None and e.response.status_code == 401:
-            logger.warning("Blogger access token expired. Attempting to refresh...")
-            new_access_token = _refresh_blogger_token(config, logger)
-            if new_access_token:
-                # Retry the request with the new token
-                logger.info("Retrying Blogger post with new access token...")
-                headers["Authorization"] = f"Bearer {new_access_token}"
-                try:
-                    retry_response = requests.post(api_url, headers=headers, json=data)
-                    retry_response.raise_for_status()
-                    retry_response_data = retry_response.json()
-                    retry_post_url = retry_response_data.get("url")
-                    logger.info(f"Successfully published to Blogger after refresh! URL: {retry_post_url}")
-                    return True
-                except requests.exceptions.RequestException as retry_e:
-                    logger.error(f"Blogger post failed even after token refresh: {retry_e}", exc_info=True)
-                    if retry_e.response:
-                        logger.error(f"Retry response body: {retry_e.response.text}")
-                    return False
-            else:
+    Args:
+        posts (list): The PreparedPost objects to publish.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One result per post, in order: its remote 'id' and 'url', or False.
+    """
+    if len(posts) == 1:
+        return [publish(posts[0], config, logger)]
+    logger.info(f"Attempting to publish {len(posts)} posts to Blogger in batches...")
+    access_token, blog_id = _get_credentials(config, logger)
+    if access_token is None:
+        return [False] * len(posts)
+
+    path = f"{urlsplit(config.get('base_url', BASE_URL)).path}/blogs/{blog_id}/posts/"
+    calls = {f"item{i}": ("POST", path, _build_post(post, blog_id, logger)) for i, post in enumerate(posts)}
+    results = {}
+    todo = list(calls)
+    token_refreshed = False
+    for round_number in range(BATCH_RETRY_ROUNDS + 1):
+        retry_later = []
+        retry_after = None
+        rejected = throttled = False
+        for start in range(0, len(todo), MAX_BATCH_CALLS):
+            chunk = todo[start:start + MAX_BATCH_CALLS]
+            body, content_type = _encode_batch([(content_id,) + calls[content_id] for content_id in chunk], access_token)
+            try:
+                # Inserts are not idempotent, so the batch as a whole is never resent blindly.
+                response = transport.post(
+                    config.get("batch_url", BATCH_URL), data=body, idempotent=False,
+                    headers={"Authorization": f"Bearer {access_token}", "Content-Type": content_type}
+                )
+                if response.status_code in (401, 429):
+                    # The whole batch was turned away before any call ran.
+                    envelope_retry_after = retry.parse_retry_after(response.headers.get("Retry-After"))
+                    parts = {content_id: (response.status_code, {}, envelope_retry_after) for content_id in chunk}
+                else:
+                    response.raise_for_status()
+                    parts = _decode_batch(response)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"Blogger batch request failed: {e}")
+                parts = {}
+            for content_id in chunk:
+                status, data, part_retry_after = parts.get(content_id, (None, {}, None))
+                results[content_id] = (status, data)
+                if status == 401:
+                    rejected = True
+                    retry_later.append(content_id)
+                elif status == 429:
+                    throttled = True
+                    retry_later.append(content_id)
+                    if part_retry_after is not None:
+                        retry_after = max(retry_after or 0, part_retry_after)
+        if not retry_later or round_number == BATCH_RETRY_ROUNDS:
+            break
+        if rejected:
+            if token_refreshed:
+                break
+            logger.warning("Blogger access token was rejected. Attempting to refresh...")
+            access_token = _get_access_token(config, logger, rejected_token=access_token)
+            token_refreshed = True
+            if not access_token:
                 logger.error("Failed to refresh Blogger token. Cannot publish.")
-                return False
+                break
+        if throttled:
+            delay = retry.resend_delay(round_number + 1, retry_after)
+            logger.warning(f"Resending {len(retry_later)} Blogger batch call(s) in {delay:.1f}s.")
+            time.sleep(delay)
         else:
-            logger.error(f"Error publishing to Blogger: {e}", exc_info=True)
-            if e.response:
-                logger.error(f"Response body: {e.response.text}")
-            return False
\ No newline at end of file
+            logger.warning(f"Resending {len(retry_later)} Blogger batch call(s).")
+        todo = retry_later
+
+    published = []
+    for content_id, post in zip(calls, posts):
+        status, data = results.get(content_id, (None, {}))
+        if status is not None and 200 <= status < 300 and data.get("id"):
+            logger.info(f"Successfully published '{post.title}' to Blogger! URL: {data.get('url')}")
+            published.append({"id": data.get("id"), "url": data.get("url")})
+        else:
+            # A missing status means the batch itself failed, so the call may or may not have run.
+            logger.error(f"Error publishing '{post.title}' to Blogger ({status or 'no response'}): {data.get('error', data)}")
+            published.append(False)
+    return published
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    Credentials are left out, so the payload can be written to disk.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and 'json' (or form 'data') body.
+    """
+    blog_id = config.get("blog_id")
+    api_url = f"{config.get('base_url', BASE_URL)}/blogs/{blog_id}/posts/"
+    return [{"method": "POST", "url": api_url, "json": _build_post(post, blog_id, logger)}]
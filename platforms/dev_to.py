@@ -3,65 +3,113 @@ Handles publishing to Dev.to.
 """
 
 import requests
+from blog_poster import transport
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
-    """
-    Publishes a post to Dev.to.
-
-    Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
-        config (dict): The platform-specific configuration.
-        logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
+# Override with a "base_url" key in the platform config, e.g. to point at a local stub.
+BASE_URL = "https://dev.to/api"
+# The form of the post that is sent, and its size limit in bytes: Forem (Dev.to) rejects
+# article bodies over 800 KB. Override with "max_content_bytes". See blog_poster.limits.
+CONTENT_FORMAT = 'markdown'
+MAX_CONTENT_BYTES = 800 * 1024
 
-    Returns:
-        bool: True if successful, False otherwise.
-    """
-    logger.info("Attempting to publish to Dev.to...")
-    if local_image_paths:
-        logger.warning("Dev.to does not currently support direct image uploads via this script. Images will be skipped.")
+def _get_headers(config, logger):
+    """Returns the request headers, or None if the API key is not configured."""
     api_key = config.get("api_key")
     if not api_key or api_key == "YOUR_DEV_TO_API_KEY":
         logger.error("Error: Dev.to API key is missing or not set in config.py.")
-        return False
+        return None
 
-    headers = {
+    return {
         "Content-Type": "application/json",
         "api-key": api_key,
     }
 
-    # Dev.to API expects the tags as a list of strings
-    tags = post_metadata.get('tags', [])
-    if isinstance(tags, str):
-        tags = [tag.strip() for tag in tags.split(',')]
-
+def _build_article(post):
+    """Builds the JSON body shared by the create and update endpoints."""
     data = {
         "article": {
-            "title": post_metadata.get("title", "No Title"),
-            "body_markdown": post_content,
-            "published": post_metadata.get("published", False),
-            "tags": tags,
+            "title": post.title or "No Title",
+            "body_markdown": post.content,
+            "published": post.metadata.get("published", False),
+            "tags": post.tags, # Dev.to API expects the tags as a list of strings
         }
     }
 
     # Add description if available
-    if description:
-        data["article"]["description"] = description
+    if post.description:
+        data["article"]["description"] = post.description
+    return data
 
+def _send(method, url, headers, data, success_message, logger, error_message="Error publishing to Dev.to"):
+    """Sends an article request and returns the article's 'id' and 'url', or False on failure."""
     try:
-        response = requests.post("https://dev.to/api/articles", headers=headers, json=data)
+        response = transport.request(method, url, headers=headers, json=data)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
 
         response_data = response.json()
-        logger.info(f"Successfully published to Dev.to! URL: {response_data.get('url')}")
-        return True
+        logger.info(f"{success_message} URL: {response_data.get('url')}")
+        return {"id": response_data.get("id"), "url": response_data.get("url")}
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error publishing to Dev.to: {e}")
+        logger.error(f"{error_message}: {e}")
         if e.response:
             logger.error(f"Response body: {e.response.text}")
         return False
+
+def publish(post, config, logger):
+    """
+    Publishes a post to Dev.to.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to Dev.to...")
+    if post.local_image_paths:
+        logger.warning("Dev.to does not currently support direct image uploads via this script. Images will be skipped.")
+    headers = _get_headers(config, logger)
+    if headers is None:
+        return False
+
+    return _send("POST", f"{config.get('base_url', BASE_URL)}/articles", headers, _build_article(post), "Successfully published to Dev.to!", logger)
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Dev.to article in place.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The Dev.to article ID returned when it was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info(f"Attempting to update Dev.to article {remote_id}...")
+    headers = _get_headers(config, logger)
+    if headers is None:
+        return False
+
+    return _send("PUT", f"{config.get('base_url', BASE_URL)}/articles/{remote_id}", headers, _build_article(post),
+                 "Successfully updated Dev.to article!", logger, error_message=f"Error updating Dev.to article {remote_id}")
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    Credentials are left out, so the payload can be written to disk.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and 'json' (or form 'data') body.
+    """
+    return [{"method": "POST", "url": f"{config.get('base_url', BASE_URL)}/articles", "json": _build_article(post)}]
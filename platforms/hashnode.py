@@ -1,84 +1,202 @@
 """
 Handles publishing to Hashnode.
+
+Tags are sent by ID when Hashnode already has a tag with the same slug, so posts
+join existing tags instead of creating near-duplicates. Slug -> tag lookups are
+made with one aliased query per post (or per batch) and cached on disk.
 """
 
+import json
+import os
+import re
+import tempfile
+import threading
 import requests
+from blog_poster import transport
+
+# The GraphQL endpoint. Override with a "base_url" key in the platform config.
+API_URL = "https://gql.hashnode.com/"
+# The form of the post that is sent, and its size limit in bytes (none documented; set
+# "max_content_bytes" in the platform config to enforce one). See blog_poster.limits.
+CONTENT_FORMAT = 'markdown'
+MAX_CONTENT_BYTES = None
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
+# Where resolved tags are cached. Override with a "tag_cache_path" key in the platform config.
+DEFAULT_TAG_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'hashnode_tags.json')
+
+PUBLISH_MUTATION = """
+    mutation publishPost($input: PublishPostInput!) {
+      publishPost(input: $input) {
+        post {
+          id
+          slug
+          url
+        }
+      }
+    }
     """
-    Publishes a post to Hashnode.
+
+UPDATE_MUTATION = """
+    mutation updatePost($input: UpdatePostInput!) {
+      updatePost(input: $input) {
+        post {
+          id
+          slug
+          url
+        }
+      }
+    }
+    """
+
+TAG_FIELDS = "id name slug"
+
+_tag_caches = {}
+_tag_cache_lock = threading.Lock()
+
+def slugify(tag_name):
+    """Returns the Hashnode-style slug of a tag name, e.g. 'web-development' for 'Web Development'."""
+    return re.sub(r'[^a-z0-9]+', '-', tag_name.lower()).strip('-')
+
+def _load_tag_cache(path):
+    """Returns the in-memory tag cache for path, reading it from disk on first use. Call with the lock held."""
+    cache = _tag_caches.get(path)
+    if cache is None:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        _tag_caches[path] = cache
+    return cache
+
+def _save_tag_cache(path, cache):
+    """Writes the tag cache atomically. Call with the lock held."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.hashnode-tags-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def cached_tags(config):
+    """Returns a copy of the slug -> tag ID cache for the configured endpoint."""
+    path = config.get("tag_cache_path", DEFAULT_TAG_CACHE_PATH)
+    with _tag_cache_lock:
+        return dict(_load_tag_cache(path).get(config.get("base_url", API_URL), {}))
+
+def resolve_tags(slugs, headers, config, logger):
+    """
+    Looks up the Hashnode tag IDs of slugs, querying only the ones not cached yet.
+
+    All unknown slugs are resolved with a single GraphQL query that aliases one
+    tag(slug:) field per slug. Slugs Hashnode has no tag for are not cached, since
+    publishing the post creates the tag.
 
     Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
+        slugs (iterable): Tag slugs.
+        headers (dict): Request headers, including the Authorization key.
         config (dict): The platform-specific configuration.
         logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
 
     Returns:
-        bool: True if successful, False otherwise.
+        dict: slug -> tag ID for every slug Hashnode has a tag for. On a failed lookup
+              only the cached slugs are returned.
     """
-    logger.info("Attempting to publish to Hashnode...")
-    if local_image_paths:
-        logger.warning("Hashnode does not currently support direct image uploads via this script. Images will be skipped.")
+    api_url = config.get("base_url", API_URL)
+    path = config.get("tag_cache_path", DEFAULT_TAG_CACHE_PATH)
+    known = cached_tags(config)
+    missing = sorted(set(slug for slug in slugs if slug) - set(known))
+    if not missing:
+        return known
+
+    variables = {f"s{i}": slug for i, slug in enumerate(missing)}
+    query = "query resolveTags(" + ", ".join(f"${name}: String!" for name in variables) + ") {\n"
+    query += "".join(f"  {name}: tag(slug: ${name}) {{ {TAG_FIELDS} }}\n" for name in variables) + "}"
+    try:
+        # A read-only query, so it is safe to retry.
+        response = transport.post(api_url, headers=headers, json={"query": query, "variables": variables}, idempotent=True)
+        response.raise_for_status()
+        data = response.json().get("data") or {}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"Could not look up Hashnode tags, sending them by name: {e}")
+        return known
+
+    found = {}
+    for name, slug in variables.items():
+        tag = data.get(name)
+        if tag and tag.get("id"):
+            found[slug] = tag["id"]
+    if found:
+        with _tag_cache_lock:
+            cache = _load_tag_cache(path)
+            cache.setdefault(api_url, {}).update(found)
+            try:
+                _save_tag_cache(path, cache)
+            except OSError as e:
+                logger.warning(f"Could not save the Hashnode tag cache: {e}")
+    known.update(found)
+    return known
+
+def _get_credentials(config, logger):
+    """Returns (headers, publication_id), or (None, None) if the configuration is incomplete."""
     api_key = config.get("api_key")
     publication_id = config.get("publication_id")
 
     if not api_key or api_key == "YOUR_HASHNODE_API_KEY":
         logger.error("Error: Hashnode API key is missing or not set in config.py.")
-        return False
+        return None, None
     if not publication_id or publication_id == "YOUR_HASHNODE_PUBLICATION_ID":
         logger.error("Error: Hashnode Publication ID is missing or not set in config.py.")
-        return False
+        return None, None
 
     headers = {
         "Content-Type": "application/json",
         "Authorization": api_key
     }
+    return headers, publication_id
 
-    # Hashnode expects tags to be a list of dictionaries with 'id' or 'name' and 'slug'
-    # For simplicity, we'll pass them as names and let Hashnode handle creating them.
-    # This requires a more complex query if we want to use existing tags by ID.
-    tags = post_metadata.get('tags', [])
-    if isinstance(tags, str):
-        tags = [tag.strip() for tag in tags.split(',')]
-    
-    # The API expects a list of TagInput objects, which are dicts.
-    tag_inputs = []
-    for tag_name in tags:
-        # A simple way to generate a slug, Hashnode might do this differently
-        slug = tag_name.lower().replace(' ', '-')
-        tag_inputs.append({"name": tag_name, "slug": slug})
+def _build_input(post, publication_id, tag_ids=None):
+    """
+    Builds the post input shared by the publishPost and updatePost mutations.
 
-    mutation = """
-    mutation publishPost($input: PublishPostInput!) {
-      publishPost(input: $input) {
-        post {
-          slug
-          url
-        }
-      }
-    }
+    Tags with a known ID (tag_ids maps slug -> ID) are sent by ID; the others by name
+    and slug, which makes Hashnode create them.
     """
+    tag_ids = tag_ids or {}
+    tag_inputs = []
+    seen = set()
+    for tag_name in post.tags:
+        slug = slugify(tag_name)
+        if not slug or slug in seen:
+            continue
+        seen.add(slug)
+        if slug in tag_ids:
+            tag_inputs.append({"id": tag_ids[slug]})
+        else:
+            tag_inputs.append({"name": tag_name, "slug": slug})
 
-    variables = {
-        "input": {
-            "title": post_metadata.get("title", "No Title"),
-            "contentMarkdown": post_content,
-            "publicationId": publication_id,
-            "tags": tag_inputs
-        }
+    post_input = {
+        "title": post.title or "No Title",
+        "contentMarkdown": post.content,
+        "publicationId": publication_id,
+        "tags": tag_inputs
     }
 
     # Add description (subtitle) if available
-    if description:
-        variables["input"]["subtitle"] = description
+    if post.description:
+        post_input["subtitle"] = post.description
+    return post_input
 
+def _send(api_url, mutation, field, post_input, headers, success_message, logger, idempotent=False):
+    """Runs a post mutation and returns the post's 'id' and 'url', or False on failure."""
     try:
-        response = requests.post("https://gql.hashnode.com/", headers=headers, json={"query": mutation, "variables": variables})
+        response = transport.post(
+            api_url, headers=headers, json={"query": mutation, "variables": {"input": post_input}}, idempotent=idempotent
+        )
         response.raise_for_status()
 
         response_data = response.json()
@@ -86,10 +204,10 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
             logger.error(f"Error publishing to Hashnode: {response_data['errors']}")
             return False
 
-        post_info = response_data.get('data', {}).get('publishPost', {}).get('post', {})
+        post_info = (response_data.get('data') or {}).get(field, {}).get('post', {})
         if post_info:
-            logger.info(f"Successfully published to Hashnode! URL: {post_info.get('url')}")
-            return True
+            logger.info(f"{success_message} URL: {post_info.get('url')}")
+            return {"id": post_info.get("id"), "url": post_info.get("url")}
         else:
             logger.error(f"Failed to publish to Hashnode. Response: {response_data}")
             return False
@@ -100,3 +218,126 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
             logger.error(f"Response body: {e.response.text}")
         return False
 
+def publish(post, config, logger):
+    """
+    Publishes a post to Hashnode.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to Hashnode...")
+    if post.local_image_paths:
+        logger.warning("Hashnode does not currently support direct image uploads via this script. Images will be skipped.")
+    headers, publication_id = _get_credentials(config, logger)
+    if headers is None:
+        return False
+
+    tag_ids = resolve_tags([slugify(tag) for tag in post.tags], headers, config, logger)
+    post_input = _build_input(post, publication_id, tag_ids)
+    return _send(config.get("base_url", API_URL), PUBLISH_MUTATION, "publishPost", post_input, headers, "Successfully published to Hashnode!", logger)
+
+def publish_batch(posts, config, logger):
+    """
+    Publishes several posts to Hashnode in one request.
+
+    Every post gets its own aliased publishPost field in a single GraphQL mutation
+    document, and the tags of all posts are resolved with one lookup. GraphQL reports
+    errors per field, so one rejected post does not fail the others.
+
+    Args:
+        posts (list): The PreparedPost objects to publish.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One result per post, in order: its remote 'id' and 'url', or False.
+    """
+    if len(posts) == 1:
+        return [publish(posts[0], config, logger)]
+    logger.info(f"Attempting to publish {len(posts)} posts to Hashnode in one request...")
+    headers, publication_id = _get_credentials(config, logger)
+    if headers is None:
+        return [False] * len(posts)
+
+    tag_ids = resolve_tags([slugify(tag) for post in posts for tag in post.tags], headers, config, logger)
+    variables = {f"p{i}": _build_input(post, publication_id, tag_ids) for i, post in enumerate(posts)}
+    mutation = "mutation publishPosts(" + ", ".join(f"${name}: PublishPostInput!" for name in variables) + ") {\n"
+    mutation += "".join(
+        f"  {name}: publishPost(input: ${name}) {{ post {{ id slug url }} }}\n" for name in variables
+    ) + "}"
+    try:
+        response = transport.post(config.get("base_url", API_URL), headers=headers,
+                                  json={"query": mutation, "variables": variables})
+        response.raise_for_status()
+        response_data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error publishing to Hashnode: {e}")
+        if getattr(e, 'response', None) is not None:
+            logger.error(f"Response body: {e.response.text}")
+        return [False] * len(posts)
+
+    errors = {}
+    for error in response_data.get("errors") or []:
+        alias = (error.get("path") or [None])[0]
+        errors.setdefault(alias, []).append(error.get("message", error))
+    data = response_data.get("data") or {}
+    results = []
+    for name, post in zip(variables, posts):
+        post_info = (data.get(name) or {}).get("post")
+        if post_info:
+            logger.info(f"Successfully published '{post.title}' to Hashnode! URL: {post_info.get('url')}")
+            results.append({"id": post_info.get("id"), "url": post_info.get("url")})
+        else:
+            # Errors without a path (e.g. an invalid document) apply to every post.
+            logger.error(f"Error publishing '{post.title}' to Hashnode: {errors.get(name) or errors.get(None) or response_data}")
+            results.append(False)
+    return results
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Hashnode post in place.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The Hashnode post ID returned when it was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info(f"Attempting to update Hashnode post {remote_id}...")
+    headers, publication_id = _get_credentials(config, logger)
+    if headers is None:
+        return False
+
+    tag_ids = resolve_tags([slugify(tag) for tag in post.tags], headers, config, logger)
+    post_input = dict(_build_input(post, publication_id, tag_ids), id=remote_id)
+    # updatePost sets the post to the given content, so it may be retried.
+    return _send(config.get("base_url", API_URL), UPDATE_MUTATION, "updatePost", post_input, headers, "Successfully updated Hashnode post!", logger, idempotent=True)
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    Credentials are left out, so the payload can be written to disk. Tags are not
+    looked up; the ones already in the tag cache are sent by ID.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and 'json' (or form 'data') body.
+    """
+    post_input = _build_input(post, config.get("publication_id"), cached_tags(config))
+    return [{
+        "method": "POST", "url": config.get("base_url", API_URL),
+        "json": {"query": PUBLISH_MUTATION, "variables": {"input": post_input}}
+    }]
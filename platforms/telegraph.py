@@ -3,48 +3,64 @@ Handles publishing to Telegra.ph.
 """
 
 import requests
-import markdown
+from blog_poster import transport
+from blog_poster.telegraph_nodes import split_nodes, node_size
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
+# Telegra.ph rejects pages whose content is larger than 64 KB.
+MAX_CONTENT_BYTES = 64 * 1024
+CONTINUE_READING_TEXT = "Continue reading →"
+# Override with "base_url" (the API) and "upload_base_url" (the file host) keys in the platform config.
+BASE_URL = "https://api.telegra.ph"
+UPLOAD_BASE_URL = "https://telegra.ph"
+# A post split into several pages is recorded in the ledger as the paths of all its
+# pages, in reading order, joined by this separator, so update() can edit each one.
+PATH_SEPARATOR = ','
+
+def _continue_reading_node(url):
+    """Returns the node appended to a page to link it to the next part."""
+    return {'tag': 'p', 'children': [{'tag': 'a', 'attrs': {'href': url}, 'children': [CONTINUE_READING_TEXT]}]}
+
+def upload_image(image_path, mime_type, config, logger):
     """
-    Publishes a post to Telegra.ph.
+    Uploads an image to Telegra.ph's file host, streaming it from disk.
 
     Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
+        image_path (str): Absolute path of the image.
+        mime_type (str): The image's MIME type.
         config (dict): The platform-specific configuration.
         logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
 
     Returns:
-        bool: True if successful, False otherwise.
+        str: The URL of the uploaded image, or None on failure.
     """
-    logger.info("Attempting to publish to Telegra.ph...")
-    if local_image_paths:
-        logger.warning("Telegra.ph does not currently support direct image uploads via this script. Images will be skipped.")
-    access_token = config.get("access_token")
-
-    if not access_token or access_token == "YOUR_TELEGRAPH_ACCESS_TOKEN":
-        logger.error("Error: Telegra.ph Access Token is missing or not set in config.py.")
-        return False
+    upload_base_url = config.get("upload_base_url", UPLOAD_BASE_URL)
+    body = transport.MultipartFile('file', image_path, mime_type)
+    try:
+        response = transport.post(f"{upload_base_url}/upload", headers={'Content-Type': body.content_type}, data=body)
+        response.raise_for_status()
 
-    api_url = "https://api.telegra.ph/createPage"
+        response_data = response.json()
+        if isinstance(response_data, list) and response_data and response_data[0].get('src'):
+            image_url = f"{upload_base_url}{response_data[0]['src']}"
+            logger.info(f"Successfully uploaded image {image_path} to Telegra.ph. URL: {image_url}")
+            return image_url
+        logger.error(f"Failed to upload image to Telegra.ph. Response: {response_data}")
+        return None
 
-    # Telegra.ph content is an array of Node objects. For simplicity, we'll convert markdown to HTML
-    # and wrap it in a single paragraph node.
-    html_content = markdown.markdown(post_content)
-    # Basic conversion to Telegra.ph Node format
-    # For more complex markdown, a dedicated parser would be needed.
-    content_nodes = [{'tag': 'p', 'children': [post_content]}]
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Error uploading image to Telegra.ph: {e}")
+        return None
+    finally:
+        body.close()
 
+def _save_page(api_url, access_token, title, author_name, content_nodes, logger,
+               error_message="Error publishing to Telegra.ph"):
+    """Sends a single createPage or editPage request and returns the page's 'result' object, or None on failure."""
     data = {
         'access_token': access_token,
-        'title': post_metadata.get("title", "No Title"),
-        'author_name': author if author else "", # Use author from front-matter
-        'content': content_nodes # This needs to be a JSON string for the API
+        'title': title,
+        'author_name': author_name,
+        'content': content_nodes
     }
 
     headers = {
@@ -52,20 +68,148 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
     }
 
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = transport.post(api_url, headers=headers, json=data)
         response.raise_for_status()
 
         response_data = response.json()
         if response_data.get('ok') and response_data.get('result'):
-            page_url = response_data['result'].get('url')
-            logger.info(f"Successfully published to Telegra.ph! URL: {page_url}")
-            return True
-        else:
-            logger.error(f"Failed to publish to Telegra.ph. Response: {response_data}")
-            return False
+            return response_data['result']
+        logger.error(f"{error_message}. Response: {response_data}")
+        return None
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error publishing to Telegra.ph: {e}")
-        if e.response:
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"{error_message}: {e}")
+        if getattr(e, 'response', None):
             logger.error(f"Response body: {e.response.text}")
+        return None
+
+def _build_pages(post, config, logger):
+    """Splits the post into pages that fit the content limit. Returns (title, content nodes) pairs."""
+    title = post.title or "No Title"
+    # Leave room on every page but the last for the link to the next part.
+    link_size = node_size(_continue_reading_node("https://telegra.ph/" + "x" * 256)) + 1
+    max_bytes = config.get("max_content_bytes", MAX_CONTENT_BYTES)
+    pages = split_nodes(post.telegraph_nodes, max_bytes - link_size) or [[]]
+    if len(pages) == 1:
+        return [(title, list(pages[0]))]
+    logger.info(f"Post exceeds the Telegra.ph content limit; publishing it as {len(pages)} linked pages.")
+    return [(f"{title} (Part {index + 1} of {len(pages)})", list(nodes)) for index, nodes in enumerate(pages)]
+
+def publish(post, config, logger):
+    """
+    Publishes a post to Telegra.ph.
+
+    Posts larger than Telegra.ph's content limit are split into several pages, each
+    ending with a link to the next one.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to Telegra.ph...")
+    if post.local_image_paths:
+        logger.warning("Some images could not be uploaded to Telegra.ph and will be skipped.")
+    access_token = config.get("access_token")
+
+    if not access_token or access_token == "YOUR_TELEGRAPH_ACCESS_TOKEN":
+        logger.error("Error: Telegra.ph Access Token is missing or not set in config.py.")
         return False
+
+    api_url = f"{config.get('base_url', BASE_URL)}/createPage"
+    author_name = post.author or "" # Use author from front-matter
+    pages = _build_pages(post, config, logger)
+
+    # Create the pages last to first so each one can link to the page after it.
+    page = None
+    paths = []
+    for page_title, content_nodes in reversed(pages):
+        if page:
+            content_nodes = content_nodes + [_continue_reading_node(page.get('url'))]
+        page = _save_page(api_url, access_token, page_title, author_name, content_nodes, logger)
+        if not page:
+            return False
+        paths.insert(0, page.get('path'))
+
+    logger.info(f"Successfully published to Telegra.ph! URL: {page.get('url')}")
+    return {"id": PATH_SEPARATOR.join(paths), "url": page.get('url')}
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Telegra.ph post in place.
+
+    Each page of the new version replaces the page at the same position. If the post
+    now needs more pages, the extra ones are created; pages it no longer needs cannot
+    be deleted on Telegra.ph, so they are left as they are and no longer linked to.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The page paths recorded when the post was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    paths = remote_id.split(PATH_SEPARATOR)
+    logger.info(f"Attempting to update Telegra.ph page {paths[0]}...")
+    access_token = config.get("access_token")
+
+    if not access_token or access_token == "YOUR_TELEGRAPH_ACCESS_TOKEN":
+        logger.error("Error: Telegra.ph Access Token is missing or not set in config.py.")
+        return False
+
+    base_url = config.get('base_url', BASE_URL)
+    author_name = post.author or ""
+    pages = _build_pages(post, config, logger)
+
+    page = None
+    new_paths = []
+    for index in reversed(range(len(pages))):
+        page_title, content_nodes = pages[index]
+        if page:
+            content_nodes = content_nodes + [_continue_reading_node(page.get('url'))]
+        if index < len(paths):
+            page = _save_page(f"{base_url}/editPage/{paths[index]}", access_token, page_title, author_name,
+                              content_nodes, logger, error_message=f"Error updating Telegra.ph page {paths[index]}")
+        else:
+            page = _save_page(f"{base_url}/createPage", access_token, page_title, author_name, content_nodes, logger)
+        if not page:
+            return False
+        new_paths.insert(0, page.get('path'))
+
+    if len(paths) > len(pages):
+        logger.warning(f"The post now fits on {len(pages)} Telegra.ph page(s); "
+                       f"the pages it no longer needs stay online: {', '.join(paths[len(pages):])}")
+    logger.info(f"Successfully updated Telegra.ph post! URL: {page.get('url')}")
+    return {"id": PATH_SEPARATOR.join(new_paths), "url": page.get('url')}
+
+def build_payload(post, config, logger):
+    """
+    Builds the createPage requests publish() would send, without sending them.
+
+    The access token is left out, and since page URLs are only known once a page
+    exists, each "continue reading" link points at a placeholder URL for its part.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per page, in reading order, with its 'method', 'url' and 'json' body.
+    """
+    api_url = f"{config.get('base_url', BASE_URL)}/createPage"
+    pages = _build_pages(post, config, logger)
+    payload = []
+    for index, (page_title, content_nodes) in enumerate(pages):
+        if index + 1 < len(pages):
+            content_nodes = content_nodes + [_continue_reading_node(f"https://telegra.ph/part-{index + 2}")]
+        payload.append({
+            "method": "POST", "url": api_url,
+            "json": {"title": page_title, "author_name": post.author or "", "content": content_nodes}
+        })
+    return payload
@@ -1,30 +1,37 @@
 """
 Handles publishing to Tumblr.
+
+Posts are created as legacy text posts through pytumblr by default. With "npf": True
+in the platform config they are created in the Neue Post Format instead, and local
+images are sent as image blocks in the same request.
 """
 
-import pytumblr
-import markdown
+import json
+import mimetypes
+import os
+import threading
+import requests
+from blog_poster import ratelimit
+from blog_poster import transport
+from blog_poster.npf import nodes_to_blocks
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
-    """
-    Publishes a post to Tumblr.
+BASE_URL = "https://api.tumblr.com"
+# The form of the post that is sent, and its size limit in bytes (none documented; set
+# "max_content_bytes" in the platform config to enforce one). See blog_poster.limits.
+CONTENT_FORMAT = 'html'
+MAX_CONTENT_BYTES = None
 
-    Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
-        config (dict): The platform-specific configuration.
-        logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
+# (consumer key, consumer secret, token, token secret, host) -> TumblrRestClient, shared by all posts.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _get_client(config, logger):
+    """
+    Returns the cached Tumblr client for the configured credentials and the blog hostname.
 
     Returns:
-        bool: True if successful, False otherwise.
+        tuple: (pytumblr.TumblrRestClient, blog_hostname), or (None, None) if the configuration is incomplete.
     """
-    logger.info("Attempting to publish to Tumblr...")
-    if local_image_paths:
-        logger.warning("Tumblr does not currently support direct image uploads via this script. Images will be skipped.")
     consumer_key = config.get("client_id") # Tumblr uses client_id as consumer_key
     consumer_secret = config.get("client_secret") # Tumblr uses client_secret as consumer_secret
     oauth_token = config.get("access_token")
@@ -33,38 +40,142 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
 
     if not all([consumer_key, consumer_secret, oauth_token, oauth_token_secret, blog_hostname]):
         logger.error("Error: Missing Tumblr credentials or blog_hostname in config.py.")
-        return False
+        return None, None
 
-    # Initialize the Tumblr client
-    client = pytumblr.TumblrRestClient(
-        consumer_key,
-        consumer_secret,
-        oauth_token,
-        oauth_token_secret
-    )
+    host = config.get("base_url", BASE_URL)
+    key = (consumer_key, consumer_secret, oauth_token, oauth_token_secret, host)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            # Imported here so loading the platform registry does not pull in pytumblr and its OAuth stack.
+            import pytumblr
 
-    # Tumblr API expects content in HTML format for text posts
-    html_content = markdown.markdown(post_content)
+            # "base_url" in the config overrides the API host.
+            client = _clients[key] = pytumblr.TumblrRestClient(
+                consumer_key,
+                consumer_secret,
+                oauth_token,
+                oauth_token_secret,
+                host=host
+            )
+    return client, blog_hostname
 
-    # Prepare optional parameters
-    optional_params = {}
-    if date:
+def _build_params(post, logger):
+    """Builds the parameters of a text post."""
+    params = {
+        "title": post.title or "No Title",
+        "body": post.html, # Tumblr API expects content in HTML format for text posts
+    }
+    if post.date:
         # Tumblr API expects RFC 3339 format (e.g., 2025-08-26T12:00:00Z)
-        # Assuming date from front-matter is in a parseable format
-        try:
-            from datetime import datetime
-            parsed_date = datetime.fromisoformat(str(date).replace('Z', '+00:00'))
-            optional_params['date'] = parsed_date.isoformat(timespec='seconds') + 'Z'
-        except ValueError:
-            logger.warning(f"Could not parse date '{date}' for Tumblr. Using default.")
+        if post.rfc3339_date:
+            params['date'] = post.rfc3339_date
+        else:
+            logger.warning(f"Could not parse date '{post.date}' for Tumblr. Using default.")
+    return params
+
+def _build_npf(post, logger):
+    """
+    Builds the body of an NPF post and the local images to send with it.
+
+    Returns:
+        tuple: (body dict, list of (identifier, path, mime type) for the local images).
+    """
+    base_dir = os.path.dirname(post.source_path) if post.source_path else os.getcwd()
+    local_paths = set(post.local_image_paths)
+    images = []
+    media = {}
+
+    def image_media(src):
+        if not src:
+            return None
+        path = os.path.normpath(os.path.join(base_dir, src))
+        if path not in local_paths:
+            return {"url": src}
+        if path not in media:
+            # Each local image is sent once, however often the post shows it.
+            identifier = f"image{len(media)}"
+            mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            media[path] = {"type": mime_type, "identifier": identifier}
+            images.append((identifier, path, mime_type))
+        return dict(media[path])
+
+    content = [{"type": "text", "subtype": "heading1", "text": post.title or "No Title"}]
+    content += nodes_to_blocks(post.telegraph_nodes, image_media)
+    body = {"content": content}
+    if post.tags:
+        body["tags"] = ",".join(post.tags)
+    if post.date:
+        if post.rfc3339_date:
+            body["date"] = post.rfc3339_date
+        else:
+            logger.warning(f"Could not parse date '{post.date}' for Tumblr. Using default.")
+    return body, images
+
+def _publish_npf(post, client, blog_hostname, config, logger, remote_id=None):
+    """
+    Creates an NPF post, or with remote_id replaces that post, sending its local images
+    as multipart parts of the same request.
+    """
+    body, images = _build_npf(post, logger)
+    api_url = f"{config.get('base_url', BASE_URL)}/v2/blog/{blog_hostname}/posts"
+    if remote_id:
+        api_url, method = f"{api_url}/{remote_id}", "PUT"
+        error_message, failure_message = f"updating Tumblr post {remote_id}", f"update Tumblr post {remote_id}"
+    else:
+        method = "POST"
+        error_message, failure_message = "publishing to Tumblr", "publish to Tumblr"
+    try:
+        if images:
+            files = [("json", (None, json.dumps(body), "application/json"))]
+            for identifier, path, mime_type in images:
+                # Read up front so the parts can be sent again if the request is retried.
+                with open(path, 'rb') as f:
+                    files.append((identifier, (os.path.basename(path), f.read(), mime_type)))
+            logger.info(f"Sending {len(images)} image(s) with the Tumblr post.")
+            response = transport.request(method, api_url, files=files, auth=client.request.oauth)
+        else:
+            response = transport.request(method, api_url, json=body, auth=client.request.oauth)
+        response_data = response.json()
+    except (requests.exceptions.RequestException, OSError, ValueError) as e:
+        logger.error(f"An error occurred while {error_message}: {e}")
+        return False
+
+    result = response_data.get("response") or {}
+    post_id = result.get("id_string") or result.get("id") or (remote_id if response.status_code < 400 else None)
+    if response.status_code >= 400 or not post_id:
+        logger.error(f"Failed to {failure_message}. Response: {response_data}")
+        return False
+    post_url = f"https://{blog_hostname}/post/{post_id}"
+    success_message = "Successfully updated Tumblr post!" if remote_id else "Successfully published to Tumblr!"
+    logger.info(f"{success_message} Post ID: {post_id}, URL: {post_url}")
+    return {"id": post_id, "url": post_url}
+
+def publish(post, config, logger):
+    """
+    Publishes a post to Tumblr.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to Tumblr...")
+    client, blog_hostname = _get_client(config, logger)
+    if client is None:
+        return False
+    if config.get("npf"):
+        return _publish_npf(post, client, blog_hostname, config, logger)
+    if post.local_image_paths:
+        logger.warning("Tumblr text posts do not support direct image uploads; set \"npf\": True to send them. Images will be skipped.")
 
     try:
-        response = client.create_text(
-            blog_hostname,
-            title=post_metadata.get("title", "No Title"),
-            body=html_content,
-            **optional_params
-        )
+        # pytumblr does not go through the shared transport, so take the rate-limit token here.
+        ratelimit.acquire()
+        response = client.create_text(blog_hostname, **_build_params(post, logger))
 
         if response and response.get('id'):
             # Tumblr API doesn't return a direct URL in the create response for text posts
@@ -72,7 +183,7 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
             post_id = response.get('id')
             post_url = f"https://{blog_hostname}/post/{post_id}"
             logger.info(f"Successfully published to Tumblr! Post ID: {post_id}, URL: {post_url}")
-            return True
+            return {"id": post_id, "url": post_url}
         else:
             logger.error(f"Failed to publish to Tumblr. Response: {response}")
             return False
@@ -80,3 +191,63 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
     except Exception as e:
         logger.error(f"An error occurred while publishing to Tumblr: {e}")
         return False
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Tumblr post in place.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The Tumblr post ID returned when it was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info(f"Attempting to update Tumblr post {remote_id}...")
+    client, blog_hostname = _get_client(config, logger)
+    if client is None:
+        return False
+    if config.get("npf"):
+        return _publish_npf(post, client, blog_hostname, config, logger, remote_id=remote_id)
+
+    try:
+        # pytumblr does not go through the shared transport, so take the rate-limit token here.
+        ratelimit.acquire()
+        response = client.edit_post(blog_hostname, id=remote_id, type="text", **_build_params(post, logger))
+
+        if response and response.get('id'):
+            post_url = f"https://{blog_hostname}/post/{remote_id}"
+            logger.info(f"Successfully updated Tumblr post! Post ID: {remote_id}, URL: {post_url}")
+            return {"id": remote_id, "url": post_url}
+        else:
+            logger.error(f"Failed to update Tumblr post {remote_id}. Response: {response}")
+            return False
+
+    except Exception as e:
+        logger.error(f"An error occurred while updating Tumblr post {remote_id}: {e}")
+        return False
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    The OAuth signature is left out. For text posts 'data' holds the form fields; for
+    NPF posts 'json' holds the post and 'files' the local images sent with it.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and form 'data' or 'json' body.
+    """
+    if config.get("npf"):
+        body, images = _build_npf(post, logger)
+        api_url = f"{config.get('base_url', BASE_URL)}/v2/blog/{config.get('blog_hostname')}/posts"
+        return [{"method": "POST", "url": api_url, "json": body,
+                 "files": {identifier: path for identifier, path, _ in images}}]
+    api_url = f"{config.get('base_url', BASE_URL)}/v2/blog/{config.get('blog_hostname')}/post"
+    return [{"method": "POST", "url": api_url, "data": dict(_build_params(post, logger), type="text")}]
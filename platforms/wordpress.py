@@ -1,145 +1,141 @@
 import requests
-import markdown
 import os
+import re
+import time
+import threading
 import base64
+from blog_poster import retry
+from blog_poster import transport
 
-# Path to the config file (assuming it's one level up from platforms/)
-CONFIG_FILE_PATH = "/Users/bezal/blog_poster/config.py"
+# Override with a "base_url" key in the platform config, e.g. to point at a local stub.
+BASE_URL = "https://public-api.wordpress.com/rest/v1.1"
+# The WP REST API (wp/v2) used for bulk publishing. Override with a "v2_base_url" key.
+V2_BASE_URL = "https://public-api.wordpress.com/wp/v2"
+# The form of the post that is sent, and its size limit in bytes (none documented; set
+# "max_content_bytes" in the platform config to enforce one). See blog_poster.limits.
+CONTENT_FORMAT = 'html'
+MAX_CONTENT_BYTES = None
+# Most requests the batch endpoint accepts at once (WordPress' default limit).
+MAX_BATCH_REQUESTS = 25
+# Rounds of resending the items of a batch that failed with a temporary error.
+BATCH_RETRY_ROUNDS = 2
+# Batch URLs that answered as if the endpoint does not exist; posts go one by one there.
+_unsupported_batch_urls = set()
+# (wp/v2 site URL, taxonomy) -> term slug -> term ID, for the rest of the run.
+_term_ids = {}
+_term_ids_lock = threading.Lock()
 
-def _upload_image_to_wordpress(image_path, config, logger):
+def upload_image(image_path, mime_type, config, logger):
     """
-    Uploads an image to WordPress.com's media library.
+    Uploads an image to WordPress.com's media library, streaming it from disk.
+
+    Uses Basic authentication when a username and application password are configured,
+    and the OAuth access token otherwise.
+
+    Args:
+        image_path (str): Absolute path of the image.
+        mime_type (str): The image's MIME type.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        str: The URL of the uploaded image, or None on failure.
     """
     username = config.get("username")
     application_password = config.get("application_password")
+    access_token = config.get("access_token")
     site_id = config.get("site_id")
 
-    if not all([username, application_password, site_id]):
-        logger.error("Missing WordPress.com username, application_password, or site ID for image upload.")
+    if not site_id or not ((username and application_password) or access_token):
+        logger.error("Missing WordPress.com credentials or site ID for image upload.")
         return None
 
-    media_api_url = f"https://public-api.wordpress.com/rest/v1.1/sites/{site_id}/media/new"
-
-    # Basic Authentication
-    credentials = f"{username}:{application_password}"
-    encoded_credentials = base64.b64encode(credentials.encode()).decode('utf-8')
+    media_api_url = f"{config.get('base_url', BASE_URL)}/sites/{site_id}/media/new"
 
-    headers = {
-        "Authorization": f"Basic {encoded_credentials}"
-    }
+    if username and application_password:
+        # Basic Authentication
+        credentials = f"{username}:{application_password}"
+        encoded_credentials = base64.b64encode(credentials.encode()).decode('utf-8')
+        headers = {"Authorization": f"Basic {encoded_credentials}"}
+    else:
+        headers = {"Authorization": f"Bearer {access_token}"}
 
+    file_name = os.path.basename(image_path)
+    body = transport.MultipartFile('media[]', image_path, mime_type)
+    headers["Content-Type"] = body.content_type
     try:
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-            file_name = os.path.basename(image_path)
-            
-            # Use files parameter for multipart/form-data upload
-            # WordPress.com API expects the filename in the files tuple
-            files = {'media[]': (file_name, image_data, 'image/png')} # Assuming PNG for test_image.png
-            
-            logger.debug(f"Attempting image upload to {media_api_url} for {file_name}")
-            response = requests.post(media_api_url, headers=headers, files=files)
-            response.raise_for_status()
+        logger.debug(f"Attempting image upload to {media_api_url} for {file_name}")
+        response = transport.post(media_api_url, headers=headers, data=body)
+        response.raise_for_status()
 
-            response_data = response.json()
-            if response_data and response_data.get('media') and len(response_data['media']) > 0:
-                image_url = response_data['media'][0].get('url')
-                logger.info(f"Successfully uploaded image {file_name} to WordPress.com. URL: {image_url}")
-                return image_url
-            else:
-                logger.error(f"Failed to get image URL from WordPress.com upload response: {response_data}")
-                return None
+        response_data = response.json()
+        if response_data and response_data.get('media') and len(response_data['media']) > 0:
+            image_url = response_data['media'][0].get('URL') or response_data['media'][0].get('url')
+            logger.info(f"Successfully uploaded image {file_name} to WordPress.com. URL: {image_url}")
+            return image_url
+        else:
+            logger.error(f"Failed to get image URL from WordPress.com upload response: {response_data}")
+            return None
 
     except requests.exceptions.RequestException as e:
         logger.error(f"Error uploading image to WordPress.com: {e}", exc_info=True)
         if e.response:
             logger.error(f"Image upload response body: {e.response.text}")
         return None
+    finally:
+        body.close()
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
-    """
-    Publishes a post to WordPress.com.
-
-    Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
-        config (dict): The platform-specific configuration.
-        logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
-
-    Returns:
-        bool: True if successful, False otherwise.
-    """
-    logger.info("Attempting to publish to WordPress.com...")
+def _get_credentials(config, logger):
+    """Returns (headers, site_id), or (None, None) if the configuration is incomplete."""
     access_token = config.get("access_token")
     site_id = config.get("site_id")
 
     if not access_token or access_token == "YOUR_WORDPRESS_ACCESS_TOKEN":
         logger.error("Error: WordPress.com Access Token is missing or not set in config.py.")
-        return False
+        return None, None
     if not site_id or site_id == "YOUR_WORDPRESS_SITE_ID":
         logger.error("Error: WordPress.com Site ID is missing or not set in config.py.")
-        return False
-
-    # --- Image Handling ---
-    updated_post_content = post_content
-    if local_image_paths:
-        logger.warning("WordPress.com image upload via API is not supported on your current plan. Images will be skipped. Please use externally hosted images.")
-    # --- End Image Handling ---
-
-    api_url = f"https://public-api.wordpress.com/rest/v1.1/sites/{site_id}/posts/new"
+        return None, None
 
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
+    return headers, site_id
 
-    # WordPress API expects content in HTML format.
-    html_content = markdown.markdown(updated_post_content)
-
-    # Get tags and categories from metadata
-    tags = post_metadata.get('tags', [])
-    if isinstance(tags, str):
-        tags = [tag.strip() for tag in tags.split(',')]
-    
-    categories = post_metadata.get('categories', [])
-    if isinstance(categories, str):
-        categories = [cat.strip() for cat in categories.split(',')]
-
+def _build_post(post, logger):
+    """Builds the JSON body shared by the create and edit endpoints."""
     data = {
-        "title": post_metadata.get("title", "No Title"),
-        "content": html_content,
-        "status": "publish" if post_metadata.get("published", False) else "draft",
-        "tags": ",".join(tags), # API expects a comma-separated string for tags
-        "categories": ",".join(categories)
+        "title": post.title or "No Title",
+        "content": post.html, # WordPress API expects content in HTML format.
+        "status": "publish" if post.metadata.get("published", False) else "draft",
+        "tags": ",".join(post.tags), # API expects a comma-separated string for tags
+        "categories": ",".join(post.categories)
     }
 
     # Add date if available
-    if date:
+    if post.date:
         # WordPress API expects RFC3339 format (e.g., 2025-08-26T12:00:00Z)
-        # Assuming date from front-matter is in a parseable format
-        try:
-            from datetime import datetime
-            parsed_date = datetime.fromisoformat(str(date).replace('Z', '+00:00')) # Handle Z for UTC
-            data["date"] = parsed_date.isoformat(timespec='seconds') + 'Z'
-        except ValueError:
-            logger.warning(f"Could not parse date '{date}' for WordPress.com. Using default.")
+        if post.rfc3339_date:
+            data["date"] = post.rfc3339_date
+        else:
+            logger.warning(f"Could not parse date '{post.date}' for WordPress.com. Using default.")
 
     # Add description as excerpt if available
-    if description:
-        data["excerpt"] = description
+    if post.description:
+        data["excerpt"] = post.description
+    return data
 
+def _send(api_url, headers, data, success_message, logger, idempotent=False):
+    """Sends a post to the given endpoint and returns its 'id' and 'url', or False on failure."""
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = transport.post(api_url, headers=headers, json=data, idempotent=idempotent)
         response.raise_for_status()
 
         response_data = response.json()
         post_url = response_data.get("URL", "")
-        logger.info(f"Successfully published to WordPress.com! URL: {post_url}")
-        return True
+        logger.info(f"{success_message} URL: {post_url}")
+        return {"id": response_data.get("ID"), "url": post_url}
 
     except requests.exceptions.RequestException as e:
         if e.response is not None and e.response.status_code == 401:
@@ -153,4 +149,266 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
             logger.error(f"Error publishing to WordPress.com: {e}", exc_info=True)
             if e.response:
                 logger.error(f"Response body: {e.response.text}")
-            return False
\ No newline at end of file
+            return False
+
+def publish(post, config, logger):
+    """
+    Publishes a post to WordPress.com.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info("Attempting to publish to WordPress.com...")
+    headers, site_id = _get_credentials(config, logger)
+    if headers is None:
+        return False
+
+    # Images are uploaded by the image stage before publishing; any left are local-only.
+    if post.local_image_paths:
+        logger.warning("Some images could not be uploaded to WordPress.com and will be skipped. Please use externally hosted images.")
+
+    api_url = f"{config.get('base_url', BASE_URL)}/sites/{site_id}/posts/new"
+    return _send(api_url, headers, _build_post(post, logger), "Successfully published to WordPress.com!", logger)
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing WordPress.com post in place.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The WordPress.com post ID returned when it was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    logger.info(f"Attempting to update WordPress.com post {remote_id}...")
+    headers, site_id = _get_credentials(config, logger)
+    if headers is None:
+        return False
+
+    # The v1.1 API edits a post with a POST to its own URL.
+    api_url = f"{config.get('base_url', BASE_URL)}/sites/{site_id}/posts/{remote_id}"
+    # Editing a post with the same content twice is harmless, so the edit may be retried.
+    return _send(api_url, headers, _build_post(post, logger), "Successfully updated WordPress.com post!", logger, idempotent=True)
+
+def _slug(name):
+    """Returns the slug WordPress gives a term name, e.g. 'web-development' for 'Web Development'."""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+def _v2_site_url(config, site_id):
+    return f"{config.get('v2_base_url', V2_BASE_URL)}/sites/{site_id}"
+
+def _send_batch(batch_url, headers, calls):
+    """
+    Sends sub-requests to the WP REST API batch endpoint.
+
+    Returns:
+        list: One (status, body, Retry-After seconds or None) tuple per sub-request,
+              or None if the endpoint is not available or refused the batch with a client error.
+
+    Raises:
+        requests.exceptions.RequestException: If the batch request itself fails.
+    """
+    response = transport.post(batch_url, headers=headers, json={"requests": calls})
+    if response.status_code == 501 or (400 <= response.status_code < 500 and response.status_code != 429):
+        # Turned away before any of it ran, e.g. no such route on this site.
+        return None
+    if response.status_code == 429:
+        # The whole batch was turned away before any of it ran.
+        retry_after = retry.parse_retry_after(response.headers.get("Retry-After"))
+        return [(429, {"message": "Too Many Requests"}, retry_after)] * len(calls)
+    response.raise_for_status()
+    responses = response.json().get("responses")
+    if not isinstance(responses, list) or len(responses) != len(calls):
+        raise requests.exceptions.RequestException(f"Unexpected batch response: {response.text[:500]}")
+    results = []
+    for item in responses:
+        retry_after = retry.parse_retry_after((item.get("headers") or {}).get("Retry-After"))
+        results.append((item.get("status", 500), item.get("body") or {}, retry_after))
+    return results
+
+def _run_batch(batch_url, headers, calls, logger):
+    """
+    Sends sub-requests in batches of MAX_BATCH_REQUESTS, resending only the items that
+    were throttled (429), after a backoff that honours Retry-After.
+
+    Creating posts and terms is not idempotent, so items that failed with a server error
+    are not resent, and neither is a batch whose request failed: the server may have
+    acted on it. Such items get a status of None.
+
+    Returns:
+        list: One (status, body) pair per sub-request, or None if the endpoint is not available.
+    """
+    results = [(None, {})] * len(calls)
+    todo = list(range(len(calls)))
+    for round_number in range(BATCH_RETRY_ROUNDS + 1):
+        retry_later = []
+        retry_after = None
+        for start in range(0, len(todo), MAX_BATCH_REQUESTS):
+            chunk = todo[start:start + MAX_BATCH_REQUESTS]
+            try:
+                responses = _send_batch(batch_url, headers, [calls[i] for i in chunk])
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.error(f"WordPress.com batch request failed; its {len(chunk)} item(s) are not resent: {e}")
+                responses = [(None, {"message": str(e)}, None)] * len(chunk)
+            if responses is None:
+                return None
+            for index, (status, body, item_retry_after) in zip(chunk, responses):
+                results[index] = (status, body)
+                if status == 429:
+                    retry_later.append(index)
+                    if item_retry_after is not None:
+                        retry_after = max(retry_after or 0, item_retry_after)
+        if not retry_later or round_number == BATCH_RETRY_ROUNDS:
+            break
+        delay = retry.resend_delay(round_number + 1, retry_after)
+        logger.warning(f"Resending {len(retry_later)} throttled WordPress.com batch item(s) in {delay:.1f}s.")
+        time.sleep(delay)
+        todo = retry_later
+    return results
+
+def _resolve_terms(taxonomy, names, site_url, batch_url, headers, logger):
+    """
+    Returns name -> term ID for tag or category names, creating the missing terms in one batch.
+
+    The wp/v2 endpoints only take term IDs, unlike the v1.1 API, which takes names.
+    Resolved IDs are kept for the rest of the run, so later batches only look up
+    terms they have not seen yet.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    if not names:
+        return {}
+    with _term_ids_lock:
+        known = dict(_term_ids.get((site_url, taxonomy), {}))
+    ids = {name: known[_slug(name)] for name in names if _slug(name) in known}
+    unknown = [name for name in names if name not in ids]
+    if unknown:
+        try:
+            response = transport.get(f"{site_url}/{taxonomy}", headers=headers,
+                                     params={"per_page": 100, "slug": ",".join(_slug(name) for name in unknown)})
+            response.raise_for_status()
+            for term in response.json():
+                for name in unknown:
+                    if term.get("name", "").lower() == name.lower() or term.get("slug") == _slug(name):
+                        ids[name] = term.get("id")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Could not look up WordPress.com {taxonomy}: {e}")
+
+    missing = [name for name in names if name not in ids]
+    if missing:
+        created = _run_batch(
+            batch_url, headers,
+            [{"method": "POST", "path": f"/wp/v2/{taxonomy}", "body": {"name": name}} for name in missing], logger
+        ) or []
+        for name, (status, body) in zip(missing, created):
+            # A term that already exists is reported with its ID.
+            term_id = body.get("id") or (body.get("data") or {}).get("term_id")
+            if term_id:
+                ids[name] = term_id
+            else:
+                logger.warning(f"Could not create WordPress.com {taxonomy[:-1]} '{name}': {body.get('message', status)}")
+    with _term_ids_lock:
+        _term_ids.setdefault((site_url, taxonomy), {}).update((_slug(name), term_id) for name, term_id in ids.items())
+    return ids
+
+def _build_v2_post(post, tag_ids, category_ids, logger):
+    """
+    Builds the wp/v2 body of a new post from the v1.1 body publish() sends, so both
+    modes map the post to the same fields. Only the encoding differs: wp/v2 takes
+    tags and categories as term IDs, and the UTC date as date_gmt without the 'Z'.
+    """
+    data = _build_post(post, logger)
+    data["tags"] = [tag_ids[name] for name in post.tags if name in tag_ids]
+    data["categories"] = [category_ids[name] for name in post.categories if name in category_ids]
+    if "date" in data:
+        data["date_gmt"] = data.pop("date").rstrip('Z')
+    return data
+
+def publish_batch(posts, config, logger):
+    """
+    Publishes several posts to WordPress.com through the WP REST API batch endpoint.
+
+    Up to MAX_BATCH_REQUESTS posts are created per request, after their tags and
+    categories are resolved to term IDs (missing terms are created in one batch too).
+    The posts get the same fields as publish() sends; see _build_v2_post. Each post's
+    result is read from its own sub-response, and only posts that were throttled are
+    resent.
+
+    Only posts are batched. Images are still uploaded one request each by the image
+    stage, because the batch endpoint only carries JSON bodies, not file uploads.
+
+    The default batch URL follows the wp/v2 routes WordPress.com serves under
+    public-api.wordpress.com; set "batch_url" if a site serves it elsewhere. If the
+    endpoint is missing or refuses the batch before running any of it (a 4xx other
+    than 429, or 501), the posts are published one by one with publish(), and so are
+    later batches for the rest of the run.
+
+    Args:
+        posts (list): The PreparedPost objects to publish.
+        config (dict): The platform-specific configuration. "batch_url" overrides the
+                       batch endpoint, which defaults to <v2_base_url>/sites/<site_id>/batch/v1.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One result per post, in order: its remote 'id' and 'url', or False.
+    """
+    headers, site_id = _get_credentials(config, logger)
+    if headers is None:
+        return [False] * len(posts)
+    site_url = _v2_site_url(config, site_id)
+    batch_url = config.get("batch_url", f"{site_url}/batch/v1")
+    if len(posts) == 1 or batch_url in _unsupported_batch_urls:
+        return [publish(post, config, logger) for post in posts]
+
+    logger.info(f"Attempting to publish {len(posts)} posts to WordPress.com in batches...")
+    for post in posts:
+        if post.local_image_paths:
+            logger.warning(f"Some images of '{post.title}' could not be uploaded to WordPress.com and will be skipped.")
+    tag_ids = _resolve_terms("tags", [name for post in posts for name in post.tags], site_url, batch_url, headers, logger)
+    category_ids = _resolve_terms(
+        "categories", [name for post in posts for name in post.categories], site_url, batch_url, headers, logger
+    )
+    responses = _run_batch(batch_url, headers, [
+        {"method": "POST", "path": "/wp/v2/posts", "body": _build_v2_post(post, tag_ids, category_ids, logger)}
+        for post in posts
+    ], logger)
+    if responses is None:
+        logger.warning(f"WordPress.com batch endpoint {batch_url} is not available or refused the batch; "
+                       "publishing posts one by one.")
+        _unsupported_batch_urls.add(batch_url)
+        return [publish(post, config, logger) for post in posts]
+
+    results = []
+    for post, (status, body) in zip(posts, responses):
+        if status is not None and 200 <= status < 300 and body.get("id"):
+            logger.info(f"Successfully published '{post.title}' to WordPress.com! URL: {body.get('link', '')}")
+            results.append({"id": body.get("id"), "url": body.get("link", "")})
+        else:
+            # A missing status means the batch request failed, so the post may or may not exist.
+            logger.error(f"Error publishing '{post.title}' to WordPress.com ({status or 'no response'}): {body.get('message', body)}")
+            results.append(False)
+    return results
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    Credentials are left out, so the payload can be written to disk.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and 'json' (or form 'data') body.
+    """
+    api_url = f"{config.get('base_url', BASE_URL)}/sites/{config.get('site_id')}/posts/new"
+    return [{"method": "POST", "url": api_url, "json": _build_post(post, logger)}]
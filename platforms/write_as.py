@@ -3,58 +3,71 @@ Handles publishing to Write.as.
 """
 
 import requests
+from blog_poster import transport
 
-def publish(post_metadata, post_content, config, logger, local_image_paths=None, author=None, date=None, description=None):
+# Override with a "base_url" key in the platform config, e.g. to point at a local stub.
+BASE_URL = "https://write.as/api"
+# The form of the post that is sent, and its size limit in bytes (none documented; set
+# "max_content_bytes" in the platform config to enforce one). See blog_poster.limits.
+CONTENT_FORMAT = 'markdown'
+MAX_CONTENT_BYTES = None
+# Posts are anonymous; the token Write.as returns with a new post is what allows editing it.
+# It is kept in the ledger together with the post ID as "<id>:<token>".
+TOKEN_SEPARATOR = ':'
+
+def _build_post(post):
+    """Builds the JSON body of a new post."""
+    # Write.as API expects 'body' for content and 'title' for title
+    return {
+        "title": post.title or "",
+        "body": post.content
+    }
+
+def _post_url(response_data):
+    """Returns the viewable URL of a post from an API response, or None."""
+    post_url = response_data['data'].get("url")
+    # Write.as returns a .md URL, the viewable URL is without .md
+    if post_url and post_url.endswith('.md'):
+        post_url = post_url[:-3]
+    return post_url
+
+def publish(post, config, logger):
     """
     Publishes a post to Write.as.
 
     Args:
-        post_metadata (dict): The metadata from the markdown file.
-        post_content (str): The body content from the markdown file.
+        post (PreparedPost): The parsed post and its rendered forms.
         config (dict): The platform-specific configuration.
         logger (logging.Logger): The logger instance.
-        local_image_paths (list): List of absolute paths to local images found in markdown.
-        author (str): Author name from front-matter.
-        date (str): Date from front-matter.
-        description (str): Description from front-matter.
 
     Returns:
-        bool: True if successful, False otherwise.
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
     """
     logger.info("Attempting to publish to Write.as...")
-    if local_image_paths:
+    if post.local_image_paths:
         logger.warning("Write.as does not currently support direct image uploads via this script. Images will be skipped.")
 
-    api_url = "https://write.as/api/posts"
+    api_url = f"{config.get('base_url', BASE_URL)}/posts"
 
-    # Write.as API expects 'body' for content and 'title' for title
-    data = {
-        "title": post_metadata.get("title", ""),
-        "body": post_content
-    }
+    data = _build_post(post)
 
     headers = {
         "Content-Type": "application/json"
     }
 
     try:
-        response = requests.post(api_url, headers=headers, json=data)
+        response = transport.post(api_url, headers=headers, json=data)
         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
 
         response_data = response.json()
         logger.debug(f"Write.as raw response: {response_data}")
-        post_url = response_data['data']["url"]
-        logger.debug(f"Write.as initial post_url: {post_url}")
+        post_url = _post_url(response_data)
         if post_url:
-            logger.debug("Write.as: post_url is truthy.")
-            # Write.as returns a .md URL, the viewable URL is without .md
-            if post_url.endswith('.md'):
-                post_url = post_url[:-3]
-                logger.debug(f"Write.as post_url after stripping .md: {post_url}")
             logger.info(f"Successfully published to Write.as! URL: {post_url}")
-            return True
+            post_id = response_data['data'].get("id")
+            token = response_data['data'].get("token")
+            return {"id": f"{post_id}{TOKEN_SEPARATOR}{token}" if token else post_id, "url": post_url}
         else:
-            logger.debug("Write.as: post_url is falsy.")
             logger.error(f"Failed to publish to Write.as. No URL in response: {response_data}")
             return False
 
@@ -63,3 +76,57 @@ def publish(post_metadata, post_content, config, logger, local_image_paths=None,
         if e.response:
             logger.error(f"Response body: {e.response.text}")
         return False
+
+def update(post, remote_id, config, logger):
+    """
+    Updates an existing Write.as post in place, using the token returned when it was published.
+
+    Args:
+        post (PreparedPost): The new version of the post.
+        remote_id (str): The "<id>:<token>" recorded when the post was first published.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        dict: The remote post's 'id' and 'url' if successful, False otherwise.
+    """
+    post_id, _, token = remote_id.partition(TOKEN_SEPARATOR)
+    logger.info(f"Attempting to update Write.as post {post_id}...")
+    if not token:
+        logger.error(f"No edit token is recorded for Write.as post {post_id}, so it cannot be updated in place. "
+                     "Run with --force to publish it as a new post.")
+        return False
+
+    api_url = f"{config.get('base_url', BASE_URL)}/posts/{post_id}"
+    data = dict(_build_post(post), token=token)
+
+    try:
+        response = transport.post(api_url, headers={"Content-Type": "application/json"}, json=data)
+        response.raise_for_status()
+
+        response_data = response.json()
+        post_url = _post_url(response_data)
+        logger.info(f"Successfully updated Write.as post! URL: {post_url}")
+        return {"id": remote_id, "url": post_url}
+
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        logger.error(f"Error updating Write.as post {post_id}: {e}")
+        if getattr(e, 'response', None):
+            logger.error(f"Response body: {e.response.text}")
+        return False
+
+def build_payload(post, config, logger):
+    """
+    Builds the request publish() would send, without sending it.
+
+    Credentials are left out, so the payload can be written to disk.
+
+    Args:
+        post (PreparedPost): The parsed post and its rendered forms.
+        config (dict): The platform-specific configuration.
+        logger (logging.Logger): The logger instance.
+
+    Returns:
+        list: One dict per request, with its 'method', 'url' and 'json' (or form 'data') body.
+    """
+    return [{"method": "POST", "url": f"{config.get('base_url', BASE_URL)}/posts", "json": _build_post(post)}]
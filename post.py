@@ -0,0 +1,179 @@
+"""
+A parsed post together with the derived forms that publishers need.
+
+Rendering markdown to HTML, splitting tag lists and parsing the front-matter date
+are done lazily and at most once per post, no matter how many platforms use them.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from blog_poster import metrics
+from blog_poster import rendercache
+from blog_poster.parser import rewrite_images
+from blog_poster.telegraph_nodes import html_to_nodes
+
+
+def split_list(value):
+    """
+    Normalizes a front-matter list field into a list of stripped strings.
+
+    Args:
+        value (str or list): A comma-separated string or a list.
+
+    Returns:
+        list: The non-empty items.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def to_rfc3339(value):
+    """
+    Converts a front-matter date to an RFC 3339 UTC timestamp (e.g. 2025-08-26T12:00:00Z).
+
+    Naive dates and datetimes are assumed to be in UTC.
+
+    Args:
+        value (str, datetime.date or datetime.datetime): The date from front-matter.
+
+    Returns:
+        str: The formatted timestamp, or None if the value cannot be parsed.
+    """
+    try:
+        parsed_date = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed_date.tzinfo is not None:
+        parsed_date = parsed_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed_date.isoformat(timespec='seconds') + 'Z'
+
+
+def _computed_once(func):
+    """Like functools.cached_property, but guaranteed to compute only once when threads race."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self):
+        try:
+            return self._computed[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._computed:
+                self._computed[name] = func(self)
+            return self._computed[name]
+
+    return property(getter)
+
+
+class PreparedPost:
+    """
+    A post as parsed by parse_markdown, shared read-only by every publisher.
+
+    Attributes:
+        metadata (dict): The front-matter of the markdown file.
+        content (str): The markdown body.
+        local_image_paths (list): Absolute paths to local images found in the body.
+        source_path (str): The markdown file the post was read from, if any.
+    """
+
+    def __init__(self, metadata, content, local_image_paths=None, source_path=None):
+        self.metadata = metadata or {}
+        self.content = content or ""
+        self.local_image_paths = local_image_paths or []
+        self.source_path = source_path
+        self._computed = {}
+        self._lock = threading.RLock()
+        self._variants = {}
+
+    @property
+    def title(self):
+        return self.metadata.get("title")
+
+    @property
+    def author(self):
+        return self.metadata.get("author")
+
+    @property
+    def date(self):
+        return self.metadata.get("date")
+
+    @property
+    def description(self):
+        return self.metadata.get("description")
+
+    def with_image_urls(self, url_map):
+        """
+        Returns a copy of the post whose local images point at uploaded URLs.
+
+        The copy keeps this post's content_hash, so the ledger still identifies it as
+        the same post. Copies are cached, so platforms that end up with the same image
+        URLs share one copy and render it only once.
+
+        Args:
+            url_map (dict): Absolute local image path -> remote URL.
+
+        Returns:
+            PreparedPost: The rewritten post, or this post if nothing needs rewriting.
+        """
+        url_map = {path: url for path, url in url_map.items() if path in self.local_image_paths and url}
+        if not url_map:
+            return self
+        key = frozenset(url_map.items())
+        with self._lock:
+            variant = self._variants.get(key)
+        if variant is None:
+            base_dir = os.path.dirname(self.source_path) if self.source_path else os.getcwd()
+            variant = PreparedPost(
+                self.metadata,
+                rewrite_images(self.content, base_dir, url_map),
+                [path for path in self.local_image_paths if path not in url_map],
+                self.source_path
+            )
+            variant._computed['content_hash'] = self.content_hash
+            with self._lock:
+                variant = self._variants.setdefault(key, variant)
+        return variant
+
+    @_computed_once
+    def content_hash(self):
+        """SHA-256 hex digest identifying this exact version of the post (front-matter and body)."""
+        canonical = json.dumps(self.metadata, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(f"{canonical}\n{self.content}".encode('utf-8')).hexdigest()
+
+    @_computed_once
+    def html(self):
+        """The body rendered to HTML, from the on-disk render cache if an earlier run rendered it."""
+        with metrics.timed("render"):
+            return rendercache.render(self.content)
+
+    @_computed_once
+    def tags(self):
+        """The 'tags' front-matter field as a list of strings."""
+        return split_list(self.metadata.get("tags"))
+
+    @_computed_once
+    def categories(self):
+        """The 'categories' front-matter field as a list of strings."""
+        return split_list(self.metadata.get("categories"))
+
+    @_computed_once
+    def rfc3339_date(self):
+        """The front-matter date as an RFC 3339 UTC timestamp, or None if missing or unparseable."""
+        if not self.date:
+            return None
+        return to_rfc3339(self.date)
+
+    @_computed_once
+    def telegraph_nodes(self):
+        """The rendered HTML as a list of Telegra.ph Node objects."""
+        html = self.html
+        with metrics.timed("telegraph_nodes"):
+            return html_to_nodes(html)
@@ -0,0 +1,220 @@
+"""
+Client-side rate limiting per platform and account.
+
+Platforms enforce posting quotas, and a batch that sends requests as fast as it
+can runs into bursts of 429 responses. A platform entry in PLATFORM_CONFIGS can
+set a "rate_limit", e.g.
+
+    "dev_to": {"api_key": "...", "rate_limit": {"requests": 10, "per": 30}},
+
+and every request made while publishing to that platform then waits for a token
+from a bucket shared by all workers using the same account. The bucket adapts to
+the server: rate-limit headers (X-RateLimit-* or RateLimit-*) cap its tokens and
+spread the remaining quota over the reset window, a 429 pauses it for the
+Retry-After period and halves its rate, and successful responses raise the rate
+back towards the configured maximum.
+"""
+import contextlib
+import contextvars
+import hashlib
+import threading
+import time
+
+from blog_poster import metrics
+from blog_poster.retry import parse_retry_after
+
+# Lowest rate, in requests per second, the bucket slows down to after repeated 429s.
+MIN_RATE = 1 / 60
+# Fraction of the configured rate added back after each successful response.
+RECOVERY_STEP = 0.1
+# Header families carrying (limit, remaining, reset), in order of preference.
+_HEADER_FAMILIES = (
+    ("X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset"),
+    ("RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset"),
+)
+# Reset values above this are Unix timestamps rather than a number of seconds.
+_EPOCH_THRESHOLD = 10 ** 9
+
+
+class TokenBucket:
+    """
+    A token bucket whose rate adapts to the server's rate-limit responses.
+
+    Args:
+        rate (float): Maximum sustained rate, in requests per second.
+        burst (int): Most requests that may be sent back to back.
+        name (str): Label for metrics and log messages.
+    """
+
+    def __init__(self, rate, burst=1, name=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.name = name
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        # While paused, _updated lies in the future and nothing is added.
+        if now > self._updated:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def _pause_until(self, until):
+        """Hands out nothing before until, then allows one request. Call with the lock held."""
+        self._paused_until = max(self._paused_until, until)
+        self._tokens = 1.0
+        self._updated = max(self._updated, self._paused_until)
+
+    def acquire(self):
+        """
+        Waits until a request may be sent, and takes a token for it.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait_for = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait_for)
+
+    def pause(self, seconds):
+        """Stops handing out tokens for the given number of seconds."""
+        with self._lock:
+            self._pause_until(time.monotonic() + seconds)
+
+    def observe(self, status_code, headers):
+        """
+        Adapts the bucket to a response.
+
+        Args:
+            status_code (int): The response status.
+            headers (Mapping): The response headers (case-insensitive, as on requests responses).
+        """
+        remaining, reset = _parse_quota(headers)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if status_code == 429:
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self._tokens = 0.0
+                retry_after = parse_retry_after(headers.get("Retry-After"))
+                wait_for = retry_after if retry_after is not None else reset
+                if wait_for:
+                    self._pause_until(now + wait_for)
+                return
+            if remaining is None:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+                return
+            # Never hold more tokens than the server says are left.
+            self._tokens = min(self._tokens, float(remaining))
+            if remaining <= 0 and reset:
+                self._pause_until(now + reset)
+            elif reset:
+                # Spread what is left of the quota over the rest of the window.
+                self.rate = max(MIN_RATE, min(self.max_rate, remaining / reset))
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * RECOVERY_STEP)
+
+
+def _parse_quota(headers):
+    """Returns (remaining requests, seconds until reset) from rate-limit headers; either may be None."""
+    for _, remaining_header, reset_header in _HEADER_FAMILIES:
+        remaining = headers.get(remaining_header)
+        if remaining is None:
+            continue
+        try:
+            remaining = int(float(remaining))
+        except ValueError:
+            continue
+        reset = None
+        try:
+            reset = float(headers.get(reset_header))
+            if reset > _EPOCH_THRESHOLD:
+                reset = reset - time.time()
+            reset = max(0.0, reset)
+        except (TypeError, ValueError):
+            pass
+        return remaining, reset
+    return None, None
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+_current = contextvars.ContextVar("rate_limit_bucket", default=None)
+
+
+def _account(config):
+    """Returns a short, non-reversible identifier of the account a platform config publishes as."""
+    settings = config.get("rate_limit") or {}
+    if settings.get("account"):
+        return str(settings["account"])
+    for key in ("api_key", "access_token", "client_id", "username", "site_id", "blog_id", "blog_hostname"):
+        if config.get(key):
+            return hashlib.sha256(str(config[key]).encode('utf-8')).hexdigest()[:12]
+    return "default"
+
+
+def get_bucket(platform_name, config):
+    """
+    Returns the bucket shared by every publish to this platform and account.
+
+    Args:
+        platform_name (str): The platform name.
+        config (dict): The platform-specific configuration. Its "rate_limit" entry holds
+                       "requests" per "per" seconds (default 1 second) and optionally
+                       "burst" (default: "requests") and "account".
+
+    Returns:
+        TokenBucket: The bucket, or None if the platform has no rate limit configured.
+    """
+    settings = config.get("rate_limit")
+    if not settings:
+        return None
+    key = (platform_name, _account(config))
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            requests_allowed = settings.get("requests", 1)
+            rate = requests_allowed / float(settings.get("per", 1))
+            bucket = _buckets[key] = TokenBucket(rate, settings.get("burst", requests_allowed), name=platform_name)
+        return bucket
+
+
+@contextlib.contextmanager
+def limit(platform_name, config):
+    """Applies the platform's rate limit to every request sent through the transport in the with-block."""
+    token = _current.set(get_bucket(platform_name, config))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def acquire():
+    """Waits for a token from the current platform's bucket, if it has one."""
+    bucket = _current.get()
+    if bucket is not None:
+        waited = bucket.acquire()
+        metrics.observe(metrics.RATE_LIMIT_WAIT_SECONDS, waited, platform=bucket.name)
+
+
+def observe(response):
+    """Adapts the current platform's bucket to a response."""
+    bucket = _current.get()
+    if bucket is not None:
+        bucket.observe(response.status_code, response.headers)
+
+
+def reset():
+    """Drops every bucket, e.g. after PLATFORM_CONFIGS changed."""
+    with _buckets_lock:
+        _buckets.clear()
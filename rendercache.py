@@ -0,0 +1,208 @@
+"""
+Caches rendered HTML on disk across runs.
+
+Rendering markdown is most of the CPU time of a dry run or a republish of a large
+archive, yet unchanged posts render to the same HTML every time. Rendered bodies
+are kept in a SQLite database (render_cache.db by default), keyed by a hash of the
+markdown body together with a fingerprint of the renderer: the Python-Markdown
+version and the extensions and extension settings used. Upgrading Markdown or
+changing extensions therefore never serves stale HTML. The cache holds at most
+max_bytes of HTML; when it grows past that, the least recently used entries are
+dropped. Any database error falls back to rendering without the cache.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from blog_poster import metrics
+
+# Default location of the cache, next to publishing.jsonl.
+DEFAULT_RENDER_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'render_cache.db')
+# Most bytes of HTML kept in the cache.
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction frees space down to this fraction of max_bytes, so it does not run on every insert.
+EVICTION_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS renders (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS renders_by_use ON renders (used_at);
+"""
+
+
+class RenderCache:
+    """
+    A thread-safe, size-bounded cache of rendered HTML.
+
+    Args:
+        path (str): Path to the SQLite database file. Created if it does not exist.
+        max_bytes (int): Most bytes of HTML kept; least recently used entries are evicted first.
+    """
+
+    def __init__(self, path=DEFAULT_RENDER_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached HTML for a key, or None, and marks the entry as recently used."""
+        with self._lock:
+            row = self._conn.execute("SELECT html FROM renders WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE renders SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row is not None else None
+
+    def put(self, key, html):
+        """Stores the HTML for a key, evicting the least recently used entries if the cache is full."""
+        size = len(html.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO renders (key, html, size, used_at) VALUES (?, ?, ?, ?)",
+                    (key, html, size, time.time())
+                )
+                # Other processes may have added entries too; recount before deciding to evict.
+                self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM renders").fetchone()[0]
+                if self._total > self.max_bytes:
+                    self._evict()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache is below its target size. Call with the lock held."""
+        target = self.max_bytes * EVICTION_TARGET
+        freed = []
+        for key, size in self._conn.execute("SELECT key, size FROM renders ORDER BY used_at"):
+            if self._total <= target:
+                break
+            freed.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM renders WHERE key = ?", freed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _extension_name(extension):
+    """Returns a stable description of a Markdown extension given by name or as an instance."""
+    if isinstance(extension, str):
+        return extension
+    configs = sorted((key, repr(value)) for key, value in extension.getConfigs().items())
+    return f"{type(extension).__module__}.{type(extension).__qualname__}:{configs}"
+
+
+def fingerprint(extensions=(), extension_configs=None):
+    """
+    Returns a digest of everything besides the body that affects the rendered HTML.
+
+    Args:
+        extensions (iterable): Markdown extensions, as names or Extension instances.
+        extension_configs (dict): Settings for extensions given by name.
+
+    Returns:
+        str: A SHA-256 hex digest.
+    """
+    import markdown
+    description = json.dumps(
+        [markdown.__version__, [_extension_name(extension) for extension in extensions], extension_configs or {}],
+        sort_keys=True, default=repr
+    )
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+
+_cache = None
+_configured = False
+_cache_lock = threading.Lock()
+
+
+def configure(path=DEFAULT_RENDER_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, logger=None):
+    """
+    Sets the process-wide cache used by render(). Pass path=None to render without a cache.
+
+    If the database cannot be opened, rendering goes on without a cache.
+
+    Args:
+        path (str): Path to the SQLite database file.
+        max_bytes (int): Most bytes of HTML kept.
+        logger (logging.Logger): Optional logger for a database that cannot be opened.
+    """
+    global _cache, _configured
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+        if path:
+            try:
+                _cache = RenderCache(path, max_bytes)
+            except sqlite3.Error as e:
+                if logger is not None:
+                    logger.warning(f"Could not open the render cache {path}: {e}. Rendering without it.")
+        _configured = True
+
+
+def get_cache():
+    """Returns the process-wide RenderCache, creating it at the default path on first use, or None if disabled."""
+    global _cache, _configured
+    with _cache_lock:
+        if not _configured:
+            try:
+                _cache = RenderCache()
+            except sqlite3.Error:
+                _cache = None
+            _configured = True
+        return _cache
+
+
+def render(content, extensions=(), extension_configs=None, cached=True):
+    """
+    Renders a markdown body to HTML, reusing the HTML cached by this or an earlier run.
+
+    Args:
+        content (str): The markdown body.
+        extensions (iterable): Markdown extensions, as names or Extension instances.
+        extension_configs (dict): Settings for extensions given by name.
+        cached (bool): False renders without the cache, e.g. for throwaway bodies.
+
+    Returns:
+        str: The rendered HTML.
+    """
+    import markdown
+    cache = get_cache() if cached else None
+    if cache is None:
+        return markdown.markdown(content, extensions=list(extensions), extension_configs=extension_configs or {})
+
+    key = hashlib.sha256(
+        f"{fingerprint(extensions, extension_configs)}\n{content}".encode('utf-8')
+    ).hexdigest()
+    try:
+        html = cache.get(key)
+    except sqlite3.Error:
+        html = None
+    if html is not None:
+        metrics.increment(metrics.RENDER_CACHE_LOOKUPS, result="hit")
+        return html
+
+    metrics.increment(metrics.RENDER_CACHE_LOOKUPS, result="miss")
+    html = markdown.markdown(content, extensions=list(extensions), extension_configs=extension_configs or {})
+    try:
+        cache.put(key, html)
+    except sqlite3.Error:
+        pass
+    return html
@@ -0,0 +1,219 @@
+"""
+Retry policy and per-host circuit breakers for the shared HTTP transport.
+
+Failed requests are retried with exponential backoff and full jitter, honoring
+the server's Retry-After header. Only requests that are safe to repeat are
+retried: idempotent methods, and for everything else only failures where the
+server cannot have acted on the request (429 responses and failed connects).
+
+Each API host also gets a circuit breaker. After several consecutive failures
+(server errors and failed requests, but not throttling) the breaker opens and
+requests to that host fail immediately for a cooldown period, so one flaky
+platform does not slow down the rest of a batch.
+"""
+import email.utils
+import random
+import threading
+import time
+
+import requests
+
+# Methods that can be repeated without changing the result.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# Statuses worth retrying for idempotent requests.
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit breaker is open."""
+
+
+class RetryPolicy:
+    """
+    How often and how long to retry a failed request.
+
+    Args:
+        max_attempts (int): Total attempts per request, including the first.
+        base_delay (float): Backoff before the first retry, doubled for each later one.
+        max_delay (float): Upper bound of the backoff between attempts.
+        max_retry_after (float): Longest Retry-After the policy is willing to wait;
+                                 longer waits fail the request instead.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=30.0, max_retry_after=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt):
+        """Returns the delay before retry number attempt (1-based), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def should_retry_status(self, status_code, idempotent):
+        """Returns True if a response with this status may be retried."""
+        if status_code == 429:
+            # The request was rejected before being processed, so it is always safe to resend.
+            return True
+        return idempotent and status_code in RETRY_STATUSES
+
+    def should_retry_exception(self, exc, idempotent):
+        """Returns True if a request that raised exc may be retried."""
+        if isinstance(exc, CircuitOpenError):
+            return False
+        if isinstance(exc, requests.exceptions.ConnectTimeout):
+            # Nothing was sent.
+            return True
+        if isinstance(exc, requests.exceptions.ConnectionError) and _is_connect_failure(exc):
+            return True
+        return idempotent and isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _is_connect_failure(exc):
+    """Returns True if a ConnectionError happened while connecting, before anything was sent."""
+    reason = exc.args[0] if exc.args else None
+    reason = getattr(reason, 'reason', reason)
+    return type(reason).__name__ in ('NewConnectionError', 'NameResolutionError', 'ConnectTimeoutError')
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header.
+
+    Args:
+        value (str): Either a number of seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after repeated failures.
+
+    The breaker is closed while the host is healthy. After failure_threshold
+    consecutive failures it opens for cooldown seconds, during which requests fail
+    immediately. Once the cooldown has passed, a single trial request is let through:
+    success closes the breaker, failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns True if a request may be sent now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+
+_policy = RetryPolicy()
+_breaker_settings = {"failure_threshold": 5, "cooldown": 60.0}
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def configure(max_attempts=None, base_delay=None, max_delay=None, max_retry_after=None,
+              failure_threshold=None, cooldown=None):
+    """
+    Updates the retry policy and circuit breaker settings. Existing breakers are reset.
+
+    Args:
+        max_attempts (int): Total attempts per request, including the first.
+        base_delay (float): Backoff before the first retry, in seconds.
+        max_delay (float): Upper bound of the backoff between attempts, in seconds.
+        max_retry_after (float): Longest Retry-After to honor, in seconds.
+        failure_threshold (int): Consecutive failures that open a host's breaker.
+        cooldown (float): Seconds an open breaker rejects requests before a trial.
+    """
+    for name, value in (("max_attempts", max_attempts), ("base_delay", base_delay),
+                        ("max_delay", max_delay), ("max_retry_after", max_retry_after)):
+        if value is not None:
+            setattr(_policy, name, value)
+    with _breakers_lock:
+        if failure_threshold is not None:
+            _breaker_settings["failure_threshold"] = failure_threshold
+        if cooldown is not None:
+            _breaker_settings["cooldown"] = cooldown
+        _breakers.clear()
+
+
+def get_policy():
+    """Returns the active RetryPolicy."""
+    return _policy
+
+
+def resend_delay(attempt, retry_after=None):
+    """
+    Returns how long to wait before resending throttled requests, e.g. the items of a batch.
+
+    Args:
+        attempt (int): The resend number, starting at 1.
+        retry_after (float): The longest Retry-After the server asked for, if any.
+
+    Returns:
+        float: Seconds to wait: the policy's backoff, or the Retry-After if that is longer
+               (capped at the policy's max_retry_after).
+    """
+    delay = _policy.backoff(attempt)
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, _policy.max_retry_after))
+    return delay
+
+
+def get_breaker(host):
+    """Returns the circuit breaker for a host, creating it on first use."""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(**_breaker_settings)
+        return breaker
+
+
+def is_failure(response):
+    """
+    Returns True if a final response means the host is unhealthy (a server error).
+
+    Throttling (429) is not a failure: the host is up and says when to come back,
+    which Retry-After and the rate limiter already handle.
+    """
+    return response.status_code >= 500
@@ -0,0 +1,248 @@
+"""
+Durable queue of posts scheduled for a future date.
+
+A post whose front-matter date lies in the future is not published right away.
+Instead one job per platform is stored in a SQLite table, in the same database
+file as the ledger, and a worker releases the jobs once they are due. Jobs are
+keyed by (source file, platform), so editing a scheduled post reschedules it.
+The queue survives restarts: a job claimed by a worker that died is handed out
+again once its lease expires.
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from blog_poster.ledger import DEFAULT_LEDGER_PATH
+
+# Seconds a claimed job is reserved for its worker before another worker may take it over.
+DEFAULT_LEASE = 15 * 60
+# Attempts per job before it is marked as failed.
+MAX_ATTEMPTS = 5
+# Seconds before a failed job is retried, doubled after each failed attempt.
+RETRY_DELAY = 60
+# Longest time the worker sleeps before checking the queue again.
+MAX_POLL_INTERVAL = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    source TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    due_at TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until TEXT,
+    last_error TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (source, platform)
+);
+CREATE INDEX IF NOT EXISTS scheduled_jobs_by_due_at ON scheduled_jobs (status, due_at);
+"""
+
+
+def format_time(value):
+    """Formats an aware datetime as an RFC 3339 UTC timestamp, the format used for due_at."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec='seconds') + 'Z'
+
+
+def _now():
+    return format_time(datetime.now(timezone.utc))
+
+
+def _in(seconds):
+    return format_time(datetime.now(timezone.utc) + timedelta(seconds=seconds))
+
+
+class Schedule:
+    """
+    A thread-safe handle on the scheduled-publish queue.
+
+    Args:
+        path (str): Path to the SQLite database file. Defaults to the ledger's database.
+        lease (float): Seconds a claimed job is reserved for the worker that claimed it.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, lease=DEFAULT_LEASE):
+        self.path = path
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, source, platform, content_hash, due_at):
+        """
+        Schedules a post for a platform, replacing any earlier schedule of the same file.
+
+        Args:
+            source (str): The markdown file of the post.
+            platform (str): The platform name.
+            content_hash (str): The PreparedPost.content_hash of the scheduled version.
+            due_at (str): RFC 3339 UTC timestamp at which the post is released.
+
+        Returns:
+            bool: True if the job is new or changed, False if it was already scheduled as is.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, due_at, status FROM scheduled_jobs WHERE source = ? AND platform = ?",
+                (source, platform)
+            ).fetchone()
+            if row and row["status"] == "pending" and row["content_hash"] == content_hash and row["due_at"] == due_at:
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scheduled_jobs"
+                " (source, platform, content_hash, due_at, status, attempts, lease_until, last_error, updated_at)"
+                " VALUES (?, ?, ?, ?, 'pending', 0, NULL, NULL, ?)",
+                (source, platform, content_hash, due_at, _now())
+            )
+        return True
+
+    def claim_due(self, limit=100):
+        """
+        Claims due jobs for this worker, including jobs whose previous worker's lease expired.
+
+        Returns:
+            list: The claimed jobs as dicts with 'source', 'platform', 'content_hash',
+                  'due_at' and 'attempts'.
+        """
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT source, platform, content_hash, due_at, attempts FROM scheduled_jobs"
+                    " WHERE (status = 'pending' AND due_at <= ?) OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY due_at LIMIT ?",
+                    (now, now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE scheduled_jobs SET status = 'running', lease_until = ?, updated_at = ?"
+                    " WHERE source = ? AND platform = ?",
+                    [(_in(self.lease), now, row["source"], row["platform"]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [dict(row) for row in rows]
+
+    def complete(self, source, platform):
+        """Removes a job that has been published."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM scheduled_jobs WHERE source = ? AND platform = ? AND status = 'running'",
+                (source, platform)
+            )
+
+    def fail(self, source, platform, error):
+        """
+        Records a failed attempt. The job is retried with exponential backoff until
+        MAX_ATTEMPTS is reached, after which it stays in the queue as 'failed'.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM scheduled_jobs WHERE source = ? AND platform = ? AND status = 'running'",
+                (source, platform)
+            ).fetchone()
+            if row is None:
+                # Rescheduled while it was running.
+                return
+            attempts = row["attempts"] + 1
+            status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+            self._conn.execute(
+                "UPDATE scheduled_jobs SET status = ?, attempts = ?, due_at = ?, lease_until = NULL,"
+                " last_error = ?, updated_at = ? WHERE source = ? AND platform = ?",
+                (status, attempts, _in(RETRY_DELAY * 2 ** (attempts - 1)), str(error), _now(), source, platform)
+            )
+
+    def next_due(self):
+        """Returns the due_at of the earliest pending job, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(due_at) AS due_at FROM scheduled_jobs WHERE status = 'pending'"
+            ).fetchone()
+        return row["due_at"] if row else None
+
+    def pending(self):
+        """Returns every job that is not yet published, ordered by due time."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, platform, due_at, status, attempts, last_error FROM scheduled_jobs ORDER BY due_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def run_due_jobs(schedule, publish, logger, max_posts=4):
+    """
+    Publishes every job that is due.
+
+    Jobs for the same file are published together, one file per worker thread.
+
+    Args:
+        schedule (Schedule): The queue.
+        publish (callable): Called as publish(source, platforms); returns a mapping of platform
+                            name to success, or None if the file could not be published at all.
+        logger (logging.Logger): The logger instance.
+        max_posts (int): Maximum number of files published at once.
+
+    Returns:
+        int: The number of jobs that were processed.
+    """
+    jobs = schedule.claim_due()
+    if not jobs:
+        return 0
+    by_source = {}
+    for job in jobs:
+        by_source.setdefault(job["source"], []).append(job["platform"])
+    logger.info(f"Releasing {len(jobs)} scheduled job(s) for {len(by_source)} post(s).")
+
+    def release(source, platforms):
+        try:
+            results = publish(source, platforms)
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while releasing {source}: {e}", exc_info=True)
+            results = None
+        for platform in platforms:
+            if results is not None and results.get(platform):
+                schedule.complete(source, platform)
+            else:
+                error = "could not read or parse the file" if results is None else "publish failed"
+                schedule.fail(source, platform, error)
+
+    with ThreadPoolExecutor(max_workers=max_posts, thread_name_prefix="scheduled") as executor:
+        for future in [executor.submit(release, source, platforms) for source, platforms in by_source.items()]:
+            future.result()
+    return len(jobs)
+
+
+def run_worker(schedule, publish, logger, max_posts=4, stop_event=None):
+    """
+    Releases scheduled jobs as they become due, until stop_event is set.
+
+    Args:
+        schedule (Schedule): The queue.
+        publish (callable): See run_due_jobs.
+        logger (logging.Logger): The logger instance.
+        max_posts (int): Maximum number of files published at once.
+        stop_event (threading.Event): Set it to stop the worker.
+    """
+    stop_event = stop_event or threading.Event()
+    logger.info("Scheduled-publish worker started.")
+    while not stop_event.is_set():
+        run_due_jobs(schedule, publish, logger, max_posts)
+        next_due = schedule.next_due()
+        wait_for = MAX_POLL_INTERVAL
+        if next_due:
+            due = datetime.fromisoformat(next_due.replace('Z', '+00:00'))
+            wait_for = min(wait_for, max(0.0, (due - datetime.now(timezone.utc)).total_seconds()))
+        # Wake at least every MAX_POLL_INTERVAL to pick up jobs added by other processes.
+        stop_event.wait(max(wait_for, 0.5))
+    logger.info("Scheduled-publish worker stopped.")
@@ -0,0 +1,192 @@
+"""
+Converts rendered HTML into Telegra.ph's Node JSON format.
+
+See https://telegra.ph/api#Node. Telegra.ph only accepts a small set of tags and
+the 'href' and 'src' attributes, so other tags are mapped to the closest allowed
+tag or unwrapped, keeping their text.
+"""
+import json
+from html.parser import HTMLParser
+
+# Tags Telegra.ph accepts as-is.
+ALLOWED_TAGS = {
+    'a', 'aside', 'b', 'blockquote', 'br', 'code', 'em', 'figcaption', 'figure',
+    'h3', 'h4', 'hr', 'i', 'iframe', 'img', 'li', 'ol', 'p', 'pre', 's',
+    'strong', 'u', 'ul', 'video',
+}
+# Tags that are renamed to an allowed equivalent.
+TAG_ALIASES = {
+    'h1': 'h3', 'h2': 'h3', 'h5': 'h4', 'h6': 'h4',
+    'del': 's', 'strike': 's', 'ins': 'u', 'kbd': 'code', 'samp': 'code', 'tt': 'code',
+    'dl': 'ul', 'dt': 'li', 'dd': 'li', 'tr': 'p',
+}
+ALLOWED_ATTRS = ('href', 'src')
+VOID_TAGS = {'br', 'hr', 'img', 'input', 'meta', 'link', 'source', 'wbr'}
+# Containers whose whitespace-only text between children is layout, not content.
+BLOCK_CONTAINERS = {None, 'ul', 'ol', 'blockquote', 'figure', 'aside'}
+TABLE_TAGS = {'table', 'thead', 'tbody', 'tfoot', 'tr'}
+TABLE_CELL_SEPARATOR = ' | '
+
+
+class _NodeBuilder(HTMLParser):
+    """Builds the Node tree incrementally as the HTML is fed in."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = []
+        # Each entry is (node or None for unwrapped tags, its children list, the source tag).
+        self.stack = [(None, self.root, None)]
+
+    @property
+    def _children(self):
+        return self.stack[-1][1]
+
+    def _parent_tag(self):
+        for node, _, _ in reversed(self.stack):
+            if node is not None:
+                return node['tag']
+        return None
+
+    def _in_pre(self):
+        return any(node is not None and node['tag'] == 'pre' for node, _, _ in self.stack)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('td', 'th') and self._children:
+            # Table rows become paragraphs with their cells separated by pipes.
+            self.handle_data(TABLE_CELL_SEPARATOR)
+        name = TAG_ALIASES.get(tag, tag)
+        if name not in ALLOWED_TAGS:
+            if tag not in VOID_TAGS:
+                # Unwrap unknown elements but keep their content.
+                self.stack.append((None, self._children, tag))
+            return
+        node = {'tag': name}
+        node_attrs = {key: value for key, value in attrs if key in ALLOWED_ATTRS and value}
+        if node_attrs:
+            node['attrs'] = node_attrs
+        self._children.append(node)
+        if tag not in VOID_TAGS:
+            node['children'] = []
+            self.stack.append((node, node['children'], tag))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.stack[-1][2] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index][2] == tag:
+                for node, _, _ in self.stack[index:]:
+                    if node is not None and not node['children']:
+                        del node['children']
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        if not data:
+            return
+        if not data.strip() and not self._in_pre() and (
+                self._parent_tag() in BLOCK_CONTAINERS or self.stack[-1][2] in TABLE_TAGS):
+            return
+        children = self._children
+        if children and isinstance(children[-1], str):
+            children[-1] += data
+        else:
+            children.append(data)
+
+    def close(self):
+        super().close()
+        # Close anything left open by truncated HTML.
+        while len(self.stack) > 1:
+            self.handle_endtag(self.stack[-1][2])
+        return self.root
+
+
+def html_to_nodes(html):
+    """
+    Converts an HTML fragment into a list of Telegra.ph Node objects.
+
+    Args:
+        html (str): The HTML to convert, e.g. the output of markdown.markdown().
+
+    Returns:
+        list: Node objects (strings or dicts with 'tag', 'attrs' and 'children').
+    """
+    builder = _NodeBuilder()
+    builder.feed(html)
+    return builder.close()
+
+
+def node_size(node):
+    """Returns the size in bytes of a node once serialized to compact JSON."""
+    return len(json.dumps(node, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _split_text(text, max_bytes):
+    """Splits a string into parts whose serialized JSON fits in max_bytes each."""
+    parts = []
+    current = []
+    current_size = 2  # The surrounding quotes.
+    for char in text:
+        # Size of the character once JSON-escaped and UTF-8 encoded.
+        size = len(json.dumps(char, ensure_ascii=False)[1:-1].encode('utf-8'))
+        if current and current_size + size > max_bytes:
+            parts.append(''.join(current))
+            current, current_size = [], 2
+        current.append(char)
+        current_size += size
+    if current:
+        parts.append(''.join(current))
+    return parts
+
+
+def _split_node(node, max_bytes):
+    """Splits a single oversized node into several nodes that each fit in max_bytes."""
+    if isinstance(node, str):
+        return _split_text(node, max_bytes)
+
+    children = node.get('children')
+    if not children:
+        # Nothing to split (e.g. an <img> with a huge src); keep it whole.
+        return [node]
+
+    shell = {key: value for key, value in node.items() if key != 'children'}
+    overhead = node_size(dict(shell, children=[]))
+    return [dict(shell, children=group) for group in split_nodes(children, max_bytes - overhead)]
+
+
+def split_nodes(nodes, max_bytes):
+    """
+    Splits a list of nodes into pages whose serialized JSON fits in max_bytes each.
+
+    Nodes are kept whole where possible; a node that is too large on its own is split
+    into several copies of the same element holding consecutive parts of its content.
+
+    Args:
+        nodes (list): Node objects, as returned by html_to_nodes().
+        max_bytes (int): The maximum serialized size of each page.
+
+    Returns:
+        list: A list of pages, each a list of nodes.
+    """
+    pages = []
+    current = []
+    current_size = 2  # The surrounding brackets.
+    queue = list(reversed(nodes))
+    while queue:
+        node = queue.pop()
+        size = node_size(node) + 1  # Plus the separating comma.
+        if size > max_bytes - 2:
+            pieces = _split_node(node, max_bytes - 3)
+            if len(pieces) > 1:
+                queue.extend(reversed(pieces))
+                continue
+        if current and current_size + size > max_bytes:
+            pages.append(current)
+            current, current_size = [], 2
+        current.append(node)
+        current_size += size
+    if current:
+        pages.append(current)
+    return pages
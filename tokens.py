@@ -0,0 +1,139 @@
+"""
+Caches OAuth access tokens and refreshes them before they expire.
+
+Tokens are kept in memory together with their expiry time and persisted to a
+separate JSON store (tokens.json by default, never config.py). Refreshes are
+serialized across threads with a lock and across processes with a lock file,
+and the store is replaced atomically, so concurrent batch workers share one
+fresh token instead of each refreshing it or hitting 401s.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+from blog_poster import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads in this process are serialized.
+    fcntl = None
+
+# Default location of the token store, next to publishing.jsonl.
+DEFAULT_TOKEN_STORE_PATH = os.path.join(os.path.dirname(__file__), 'tokens.json')
+# Refresh a token this many seconds before it expires.
+DEFAULT_REFRESH_MARGIN = 300
+
+
+class _FileLock:
+    """An exclusive advisory lock on a file, held for the duration of a with-block."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class TokenManager:
+    """
+    Hands out valid access tokens, refreshing them ahead of expiry.
+
+    Args:
+        path (str): Path of the JSON token store.
+        refresh_margin (float): Seconds before expiry at which a token is refreshed.
+    """
+
+    def __init__(self, path=DEFAULT_TOKEN_STORE_PATH, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry):
+        return bool(entry) and entry.get("expires_at", 0) - self.refresh_margin > time.time()
+
+    def _read_store(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_store(self, store):
+        """Writes the store atomically: a temporary file in the same directory is renamed over it."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix='.tokens-', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(store, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def get_token(self, key, refresh, rejected_token=None):
+        """
+        Returns a valid access token, refreshing it if it is missing, about to expire or rejected.
+
+        Args:
+            key (str): Identifies the credential, e.g. 'blogger:<client id>'.
+            refresh (callable): Called with no arguments to obtain a new token. Must return
+                                (access_token, expires_in_seconds), or None on failure.
+            rejected_token (str): A token the API just rejected with 401. It is refreshed
+                                  unless another worker has already replaced it.
+
+        Returns:
+            str: The access token, or None if no valid token could be obtained.
+        """
+        with self._lock:
+            entry = self._tokens.get(key)
+            if self._is_fresh(entry) and entry["access_token"] != rejected_token:
+                return entry["access_token"]
+
+            with _FileLock(self.path + '.lock'):
+                # Another process may have refreshed the token while we waited for the lock.
+                store = self._read_store()
+                entry = store.get(key)
+                if self._is_fresh(entry) and entry["access_token"] != rejected_token:
+                    self._tokens[key] = entry
+                    return entry["access_token"]
+
+                with metrics.timed("token_refresh", platform=key.split(':')[0]):
+                    result = refresh()
+                if not result:
+                    return None
+                access_token, expires_in = result
+                entry = {"access_token": access_token, "expires_at": time.time() + float(expires_in)}
+                store[key] = entry
+                self._write_store(store)
+                self._tokens[key] = entry
+                return access_token
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """Returns the process-wide TokenManager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TokenManager()
+        return _manager
@@ -0,0 +1,282 @@
+"""
+Shared HTTP transport used by every publisher in the platforms/ package.
+
+All publishers go through one requests.Session so that connections to the same
+API host are kept alive and reused between posts, and every request gets a
+default connect/read timeout instead of waiting forever. Requests are retried
+and guarded by per-host circuit breakers as described in blog_poster.retry, and
+paced by the current platform's rate limit as described in blog_poster.ratelimit.
+"""
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from blog_poster import metrics
+from blog_poster import ratelimit
+from blog_poster import retry
+
+# Seconds to wait for the TCP/TLS connection to be established.
+DEFAULT_CONNECT_TIMEOUT = 10
+# Seconds to wait for the server to send data once connected.
+DEFAULT_READ_TIMEOUT = 60
+# Number of per-host pools to keep, and keep-alive connections kept per host.
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+_settings = {
+    "connect_timeout": DEFAULT_CONNECT_TIMEOUT,
+    "read_timeout": DEFAULT_READ_TIMEOUT,
+    "pool_connections": DEFAULT_POOL_CONNECTIONS,
+    "pool_maxsize": DEFAULT_POOL_MAXSIZE,
+}
+_session = None
+_session_lock = threading.Lock()
+logger = logging.getLogger("BlogPoster")
+
+
+class _TimeoutSession(requests.Session):
+    """A Session that applies a default timeout to requests that do not set one."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class MultipartFile:
+    """
+    A multipart/form-data body that streams a file from disk instead of reading it into memory.
+
+    Pass it as the data argument of a request together with its content_type header.
+    The Content-Length is known up front, so no chunked encoding is needed.
+
+    Args:
+        field_name (str): The form field the file is sent in, e.g. 'media[]'.
+        file_path (str): Path of the file to send.
+        mime_type (str): The file's MIME type.
+        file_name (str): The file name reported to the server. Defaults to the path's base name.
+    """
+
+    def __init__(self, field_name, file_path, mime_type, file_name=None):
+        boundary = uuid.uuid4().hex
+        file_name = (file_name or os.path.basename(file_path)).replace('"', '')
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._head = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{file_name}"\r\n'
+            f'Content-Type: {mime_type}\r\n\r\n'
+        ).encode('utf-8')
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        self._file_path = file_path
+        self._length = len(self._head) + os.path.getsize(file_path) + len(self._tail)
+        self._parts = None
+        self.seek(0)
+
+    def __len__(self):
+        return self._length
+
+    def seek(self, offset, whence=0):
+        """Rewinds the body so it can be sent again. Only seeking to the start is supported."""
+        if offset != 0 or whence != 0:
+            raise io.UnsupportedOperation("MultipartFile can only be rewound to the start")
+        self.close()
+        self._parts = [io.BytesIO(self._head), open(self._file_path, 'rb'), io.BytesIO(self._tail)]
+        return 0
+
+    def read(self, size=-1):
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            chunk = self._parts[0].read(size)
+            if not chunk:
+                self._parts.pop(0).close()
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b''.join(chunks)
+
+    def close(self):
+        for part in self._parts or []:
+            part.close()
+        self._parts = []
+
+
+def configure(connect_timeout=None, read_timeout=None, pool_connections=None, pool_maxsize=None):
+    """
+    Updates the transport settings. If any of them changed, the shared session is rebuilt on next use.
+
+    Changing a setting closes the current session, so call this before worker threads
+    start sending requests. Calls that change nothing leave the session alone.
+
+    Args:
+        connect_timeout (float): Seconds to wait for a connection to be established.
+        read_timeout (float): Seconds to wait for the server to send data.
+        pool_connections (int): Number of distinct hosts to keep connection pools for.
+        pool_maxsize (int): Maximum number of keep-alive connections kept per host.
+                            Should be at least the number of concurrent publishers.
+    """
+    global _session
+    updates = {
+        "connect_timeout": connect_timeout,
+        "read_timeout": read_timeout,
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+    }
+    with _session_lock:
+        updates = {key: value for key, value in updates.items() if value is not None and _settings[key] != value}
+        if not updates:
+            # Keep the warm session (and its open connections) when nothing changes.
+            return
+        _settings.update(updates)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """Returns the shared Session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = _TimeoutSession((_settings["connect_timeout"], _settings["read_timeout"]))
+                adapter = HTTPAdapter(
+                    pool_connections=_settings["pool_connections"],
+                    pool_maxsize=_settings["pool_maxsize"],
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def close():
+    """Closes all pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _body_size(body):
+    """Returns the size of a prepared request body in bytes, or 0 if it is unknown."""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return len(body)
+    except TypeError:
+        return 0
+
+
+def _record_attempt(method, host, elapsed, response=None, stream=False):
+    """Records the latency and transferred bytes of one request attempt."""
+    status = response.status_code if response is not None else "error"
+    metrics.observe(metrics.HTTP_REQUEST_SECONDS, elapsed, host=host, method=method, status=status)
+    if response is None:
+        return
+    metrics.increment(metrics.HTTP_BYTES_SENT, _body_size(response.request.body), host=host)
+    if not stream:
+        metrics.increment(metrics.HTTP_BYTES_RECEIVED, len(response.content), host=host)
+
+
+def request(method, url, idempotent=None, **kwargs):
+    """
+    Sends a request through the shared session, retrying it where that is safe.
+
+    Accepts the same arguments as requests.request. The final response is returned
+    even if it is an error, so callers can keep using raise_for_status().
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL to send the request to.
+        idempotent (bool): Whether the request may be repeated after an ambiguous failure
+                           (5xx, read timeout, dropped connection). Defaults to True for
+                           GET, HEAD, OPTIONS, PUT and DELETE.
+
+    Raises:
+        retry.CircuitOpenError: If the host's circuit breaker is open.
+        requests.exceptions.RequestException: If the request fails and cannot be retried.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in retry.IDEMPOTENT_METHODS
+    host = urlsplit(url).netloc
+    breaker = retry.get_breaker(host)
+    policy = retry.get_policy()
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if not breaker.allow():
+            raise retry.CircuitOpenError(f"Circuit breaker for {host} is open; not sending {method} {url}")
+        body = kwargs.get("data")
+        if attempt > 1 and hasattr(body, "seek"):
+            body.seek(0)
+        ratelimit.acquire()
+
+        started = time.perf_counter()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            _record_attempt(method, host, time.perf_counter() - started)
+            breaker.record_failure()
+            if (attempt >= policy.max_attempts or breaker.is_open
+                    or not policy.should_retry_exception(e, idempotent)):
+                raise
+            delay = policy.backoff(attempt)
+            metrics.increment(metrics.HTTP_RETRIES, host=host)
+            logger.warning(f"{method} {host} failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 1} of {policy.max_attempts}).")
+            time.sleep(delay)
+            continue
+
+        _record_attempt(method, host, time.perf_counter() - started, response, kwargs.get("stream", False))
+        ratelimit.observe(response)
+        if retry.is_failure(response):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if (attempt >= policy.max_attempts or breaker.is_open
+                or not policy.should_retry_status(response.status_code, idempotent)):
+            return response
+
+        retry_after = retry.parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None and retry_after > policy.max_retry_after:
+            return response
+        delay = max(retry_after or 0, policy.backoff(attempt))
+        metrics.increment(metrics.HTTP_RETRIES, host=host)
+        logger.warning(f"{method} {host} returned {response.status_code}; retrying in {delay:.1f}s (attempt {attempt + 1} of {policy.max_attempts}).")
+        response.close()
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    """Sends a GET request through the shared session."""
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    """Sends a POST request through the shared session."""
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    """Sends a PUT request through the shared session."""
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    """Sends a PATCH request through the shared session."""
+    return request("PATCH", url, **kwargs)
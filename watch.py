@@ -0,0 +1,198 @@
+"""
+Watches content directories and publishes markdown files as they change.
+
+The watcher runs in one long-lived process, so the HTTP connection pool, OAuth
+tokens, loaded platform modules and parsed-file cache stay warm between saves.
+File events come from inotify when the optional inotify_simple package is
+installed (Linux), and from polling file modification times otherwise. Bursts
+of events for a file are debounced, and a file is only published when its
+content hash differs from the last version the watcher saw.
+"""
+import os
+import threading
+import time
+
+from blog_poster.images import hash_file
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+# Seconds a file must be quiet after its last change before it is published.
+DEFAULT_DEBOUNCE = 2.0
+# Seconds between scans when polling.
+DEFAULT_POLL_INTERVAL = 5.0
+
+
+class _PollingSource:
+    """Finds changed files by comparing modification times and sizes between scans."""
+
+    def __init__(self, scan, interval, stop_event):
+        self._scan = scan
+        self._interval = interval
+        self._stop_event = stop_event
+        self._snapshot = self._stat_all()
+        self._next_poll = time.monotonic() + interval
+
+    def _stat_all(self):
+        snapshot = {}
+        for path in self._scan():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        """Waits up to timeout seconds (or until the next scan) and returns the changed paths."""
+        remaining = max(0, self._next_poll - time.monotonic())
+        if timeout is not None and timeout < remaining:
+            self._stop_event.wait(timeout)
+            return set()
+        self._stop_event.wait(remaining)
+        self._next_poll = time.monotonic() + self._interval
+        snapshot = self._stat_all()
+        changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class _InotifySource:
+    """Receives change events for markdown files from inotify."""
+
+    def __init__(self, directories, files, extensions):
+        self._inotify = inotify_simple.INotify()
+        self._mask = (inotify_simple.flags.CLOSE_WRITE | inotify_simple.flags.MOVED_TO
+                      | inotify_simple.flags.CREATE)
+        self._directories = {}
+        self._recursive_roots = [os.path.join(directory, '') for directory in directories]
+        self._files = set(files)
+        self._extensions = extensions
+        for directory in directories:
+            for root, _, _ in os.walk(directory):
+                self._add_watch(root)
+        for path in files:
+            self._add_watch(os.path.dirname(path))
+
+    def _add_watch(self, directory):
+        if directory not in self._directories.values():
+            self._directories[self._inotify.add_watch(directory, self._mask)] = directory
+
+    def _is_watched_file(self, path):
+        if path in self._files:
+            return True
+        return path.endswith(self._extensions) and any(path.startswith(root) for root in self._recursive_roots)
+
+    def wait(self, timeout=None):
+        """Waits up to timeout seconds (forever if None) and returns the changed paths."""
+        changed = set()
+        events = self._inotify.read(timeout=None if timeout is None else int(timeout * 1000))
+        for event in events:
+            directory = self._directories.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & inotify_simple.flags.ISDIR:
+                # New subdirectories of a watched tree are watched too, and files
+                # written before the watch was added are picked up by a scan.
+                if any(path.startswith(root) for root in self._recursive_roots):
+                    for root, _, filenames in os.walk(path):
+                        self._add_watch(root)
+                        changed.update(os.path.join(root, name) for name in filenames if name.endswith(self._extensions))
+                continue
+            if event.mask & inotify_simple.flags.CREATE:
+                # The content arrives with the CLOSE_WRITE that follows.
+                continue
+            if self._is_watched_file(path):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        self._inotify.close()
+
+
+def _make_source(paths, scan, extensions, poll_interval, stop_event, use_inotify, logger):
+    """Returns an inotify source when possible, a polling source otherwise."""
+    if use_inotify and inotify_simple is not None and not any(char in entry for entry in paths for char in '*?['):
+        directories = [os.path.abspath(path) for path in paths if os.path.isdir(path)]
+        files = [os.path.abspath(path) for path in paths if not os.path.isdir(path)]
+        try:
+            source = _InotifySource(directories, files, extensions)
+            logger.info("Watching for changes with inotify.")
+            return source
+        except OSError as e:
+            logger.warning(f"Could not set up inotify ({e}); falling back to polling.")
+    logger.info(f"Watching for changes by polling every {poll_interval}s.")
+    return _PollingSource(scan, poll_interval, stop_event)
+
+
+def watch(paths, scan, publish, logger, extensions=('.md', '.markdown'), debounce=DEFAULT_DEBOUNCE,
+          poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=True, stop_event=None):
+    """
+    Publishes the markdown files under paths now, and again whenever they change.
+
+    Runs until stop_event is set or the process is interrupted.
+
+    Args:
+        paths (list): Markdown files and directories to watch. Glob patterns are
+                      supported, but force polling.
+        scan (callable): Returns the absolute paths of all markdown files currently under paths.
+        publish (callable): Called with a list of changed paths; returns a mapping of path
+                            to its per-platform results (None if it failed to parse).
+        logger (logging.Logger): The logger instance.
+        extensions (tuple): File name extensions of markdown files in watched directories.
+        debounce (float): Seconds a file must be unchanged before it is published.
+        poll_interval (float): Seconds between scans when polling.
+        use_inotify (bool): Use inotify if the inotify_simple package is available.
+        stop_event (threading.Event): Set it to stop watching.
+    """
+    stop_event = stop_event or threading.Event()
+    source = _make_source(paths, scan, extensions, poll_interval, stop_event, use_inotify, logger)
+    published_hashes = {}
+
+    def publish_changed(candidates):
+        changed = []
+        for path in candidates:
+            try:
+                content_hash = hash_file(path)
+            except OSError:
+                # Deleted or renamed away before we got to it.
+                continue
+            if published_hashes.get(path) != content_hash:
+                published_hashes[path] = content_hash
+                changed.append(path)
+        if not changed:
+            return
+        logger.info(f"Publishing {len(changed)} changed file(s): {', '.join(os.path.basename(path) for path in changed)}")
+        results = publish(changed)
+        for path in changed:
+            path_results = results.get(path)
+            if path_results is None or not all(path_results.values()):
+                # Try again on the next change.
+                published_hashes.pop(path, None)
+
+    try:
+        # Catch up on anything that changed while the watcher was not running;
+        # the ledger skips posts that are already published.
+        publish_changed(scan())
+        pending = {}
+        while not stop_event.is_set():
+            if pending:
+                timeout = max(0, min(pending.values()) + debounce - time.monotonic())
+            else:
+                timeout = poll_interval
+            for path in source.wait(timeout):
+                pending[path] = time.monotonic()
+            now = time.monotonic()
+            ready = [path for path, changed_at in pending.items() if now - changed_at >= debounce]
+            for path in ready:
+                del pending[path]
+            if ready:
+                publish_changed(ready)
+    finally:
+        source.close()